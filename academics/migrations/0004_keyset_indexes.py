@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0003_alter_subject_code'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['date', 'id'], name='lesson_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['teacher', 'date', 'id'], name='lesson_teacher_date_id_idx'),
+        ),
+    ]
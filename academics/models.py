@@ -160,6 +160,11 @@ class Lesson(models.Model):
         verbose_name = "Урок"
         verbose_name_plural = "Уроки"
         ordering = ["-date"]
+        indexes = [
+            # Постраничная выдача уроков и посещаемости по (дата урока, id), см. api.pagination.
+            models.Index(fields=["date", "id"], name="lesson_date_id_idx"),
+            models.Index(fields=["teacher", "date", "id"], name="lesson_teacher_date_id_idx"),
+        ]
 
     def __str__(self):
         """Возвращает строку вида '2025-03-12 — 5А — Математика'."""
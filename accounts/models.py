@@ -26,6 +26,8 @@ class User(AbstractUser):
         role (CharField): роль в системе (Ученик, Учитель, Администратор).
         first_name (CharField): имя пользователя с валидацией.
         last_name (CharField): фамилия пользователя с валидацией.
+        token_version (PositiveIntegerField): версия выданных JWT; увеличивается
+            при смене роли, и токены с прежней версией перестают приниматься.
 
     Методы:
         __str__(): возвращает строковое представление пользователя.
@@ -54,6 +56,7 @@ class User(AbstractUser):
         validators=[name_validator],
         verbose_name="Фамилия"
     )
+    token_version = models.PositiveIntegerField("Версия токенов", default=0, editable=False)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
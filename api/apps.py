@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        """Подключает обработчики сигналов, публикующие события журнала (см. api.events)."""
+        from . import signals  # noqa: F401
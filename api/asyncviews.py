@@ -0,0 +1,80 @@
+"""
+Асинхронное чтение API (list и retrieve) для запуска под ASGI.
+
+AsyncReadView обслуживает GET по правилам обычного viewset'а: та же
+аутентификация, права, ?fields=/?expand=, план запроса, постраничная
+выдача по ключу и ETag. Записи и версии данных читаются асинхронным ORM
+(aiterator(), aget()), так что на время ожидания базы цикл событий
+обслуживает другие запросы, а не держит отдельный поток сервера на
+каждого клиента. Аутентификация и проверка прав выполняются через
+sync_to_async, как и прочий синхронный код.
+
+Сериализация идёт в цикле событий: всё, что выводит сериализатор,
+загружено запросом по плану (см. api.queryplan), и обращение к базе
+при сериализации завершилось бы ошибкой SynchronousOnlyOperation.
+"""
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from django.views import View
+from rest_framework.response import Response
+
+from reports.conditional import aversioned_response
+from .columnar import ColumnarRenderer
+from .pagination import KeysetPagination
+
+# Записей в одной порции aiterator() при выдаче списка без постраничной разбивки.
+CHUNK_SIZE = 2000
+
+
+class AsyncReadView(View):
+    """
+    Асинхронный GET списка (без pk) или записи (с pk) через viewset_class.
+
+    Колоночный формат и пагинаторы, отличные от KeysetPagination,
+    обрабатываются синхронным действием viewset'а в потоке.
+    """
+    viewset_class = None
+
+    async def get(self, request, pk=None):
+        action = "list" if pk is None else "retrieve"
+        viewset = self.viewset_class()
+        viewset.action_map = {"get": action}
+        kwargs = {} if pk is None else {viewset.lookup_url_kwarg or viewset.lookup_field: pk}
+        viewset.args, viewset.kwargs = (), kwargs
+        drf_request = viewset.initialize_request(request, **kwargs)
+        viewset.request = drf_request
+        viewset.headers = viewset.default_response_headers
+
+        try:
+            await sync_to_async(viewset.initial)(drf_request, **kwargs)
+            if drf_request.accepted_renderer.format == ColumnarRenderer.format or not (
+                viewset.paginator is None or isinstance(viewset.paginator, KeysetPagination)
+            ):
+                response = await sync_to_async(getattr(viewset, action))(drf_request, **kwargs)
+            else:
+                handler = self.list if pk is None else self.retrieve
+                response = await aversioned_response(
+                    drf_request, viewset.get_version_scopes(), lambda: handler(viewset),
+                )
+        except Exception as exc:
+            response = viewset.handle_exception(exc)
+        return viewset.finalize_response(drf_request, response, **kwargs)
+
+    async def list(self, viewset):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        if viewset.paginator is None:
+            rows = [obj async for obj in queryset.aiterator(chunk_size=CHUNK_SIZE)]
+            return Response(viewset.get_serializer(rows, many=True).data)
+        page = await viewset.paginator.apaginate_queryset(queryset, viewset.request, view=viewset)
+        return viewset.get_paginated_response(viewset.get_serializer(page, many=True).data)
+
+    async def retrieve(self, viewset):
+        queryset = viewset.filter_queryset(viewset.get_queryset())
+        lookup = viewset.kwargs[viewset.lookup_url_kwarg or viewset.lookup_field]
+        try:
+            obj = await queryset.aget(**{viewset.lookup_field: lookup})
+        except (queryset.model.DoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        viewset.check_object_permissions(viewset.request, obj)
+        return Response(viewset.get_serializer(obj).data)
@@ -0,0 +1,215 @@
+"""
+Аутентификация API без лишней работы на каждый запрос.
+
+JWT. Токены содержат роль и версию токенов пользователя (User.token_version).
+ClaimsJWTAuthentication собирает пользователя из утверждений токена:
+экземпляр User с одними id, ролью и версией, остальные поля отложены и
+читаются из базы только при обращении к ним. Отзыв проверяется по
+текущей версии, которая хранится в кэше API_AUTH_CACHE_TTL секунд;
+revoke_tokens() увеличивает версию и сбрасывает кэш, поэтому токены,
+выданные до смены роли, перестают приниматься.
+
+Basic. CachedBasicAuthentication запоминает успешную проверку пароля:
+ключ кэша — HMAC логина и пароля на SECRET_KEY, значение — id пользователя
+и HMAC хэша его пароля. Повторный запрос с теми же данными стоит одного
+чтения пользователя по первичному ключу вместо PBKDF2, а после смены
+пароля запись перестаёт подходить.
+"""
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import login
+from django.core.cache import cache
+from django.db.models import F
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.decorators import sync_and_async_middleware
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+
+ROLE_CLAIM = "role"
+VERSION_CLAIM = "ver"
+CACHE_PREFIX = "api:auth:version:"
+BASIC_CACHE_PREFIX = "api:auth:basic:"
+
+# Версия в кэше для удалённого или отключённого пользователя.
+INACTIVE = -1
+
+
+def _cache_key(user_id):
+    return f"{CACHE_PREFIX}{user_id}"
+
+
+def current_token_version(user_id):
+    """
+    Возвращает действующую версию токенов пользователя.
+
+    Значение берётся из кэша, а при промахе читается из базы и кэшируется
+    на API_AUTH_CACHE_TTL секунд.
+
+    Возвращает:
+        int: версия или INACTIVE, если пользователя нет или он отключён.
+    """
+    key = _cache_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            User.objects.filter(pk=user_id, is_active=True).values_list("token_version", flat=True).first()
+        )
+        version = INACTIVE if version is None else version
+        cache.set(key, version, timeout=settings.API_AUTH_CACHE_TTL)
+    return version
+
+
+def revoke_tokens(user):
+    """
+    Отзывает все выданные пользователю JWT: увеличивает версию и сбрасывает кэш.
+
+    Вызывается при смене роли или отключении пользователя (см. api.signals).
+
+    Другие процессы с собственным кэшем (locmem) узнают о новой версии не
+    позже чем через API_AUTH_CACHE_TTL секунд.
+    """
+    User.objects.filter(pk=user.pk).update(token_version=F("token_version") + 1)
+    cache.delete(_cache_key(user.pk))
+    # Иначе следующий save() этого экземпляра вернул бы прежнюю версию.
+    user.refresh_from_db(fields=["token_version"])
+
+
+def check_token_version(token):
+    """
+    Проверяет, что токен не отозван.
+
+    Исключения:
+        InvalidToken: в токене нет нужных утверждений.
+        AuthenticationFailed: версия устарела или пользователь отключён.
+    """
+    try:
+        user_id, version = token[api_settings.USER_ID_CLAIM], token[VERSION_CLAIM]
+    except KeyError:
+        raise InvalidToken("В токене нет идентификатора пользователя или версии.")
+    current = current_token_version(user_id)
+    if current == INACTIVE:
+        raise AuthenticationFailed("Пользователь не найден или отключён.", code="user_inactive")
+    if current != version:
+        raise AuthenticationFailed("Токен отозван, войдите заново.", code="token_revoked")
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh-токен с ролью и версией токенов пользователя; access-токен наследует их."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[ROLE_CLAIM] = user.role
+        token[VERSION_CLAIM] = user.token_version
+        return token
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Выдача пары токенов с утверждениями role и ver (SIMPLE_JWT['TOKEN_OBTAIN_SERIALIZER'])."""
+    token_class = ClaimsRefreshToken
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Обновление access-токена; отозванный refresh-токен отклоняется."""
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        check_token_version(self.token_class(attrs["refresh"]))
+        return super().validate(attrs)
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWT-аутентификация, которая не читает пользователя из базы.
+
+    request.user — экземпляр User с полями id, role и token_version из токена;
+    остальные поля отложены (как после only()) и загружаются при первом
+    обращении. Отзыв проверяется по версии через current_token_version().
+    """
+
+    def get_user(self, validated_token):
+        check_token_version(validated_token)
+        try:
+            role = validated_token[ROLE_CLAIM]
+        except KeyError:
+            raise InvalidToken("В токене нет роли пользователя.")
+        return User.from_db(
+            User.objects.db, ["id", "role", "token_version"],
+            [validated_token[api_settings.USER_ID_CLAIM], role, validated_token[VERSION_CLAIM]],
+        )
+
+
+def _hmac(purpose, value):
+    return salted_hmac(f"api.authentication.{purpose}", value, algorithm="sha256").hexdigest()
+
+
+class CachedBasicAuthentication(BasicAuthentication):
+    """
+    Basic-аутентификация с кэшем проверенных логина и пароля.
+
+    Проверка пароля (PBKDF2) выполняется при первом запросе, затем
+    API_BASIC_AUTH_CACHE_TTL секунд запрос проверяется по кэшу. Сами логин и
+    пароль в кэш не попадают. Если API_BASIC_AUTH_ISSUE равен 'session' или
+    'jwt', после проверки пароля пользователь входит в сессию или получает
+    пару JWT в заголовках X-Access-Token и X-Refresh-Token
+    (см. issued_tokens_middleware), чтобы дальше обходиться без пароля.
+    """
+
+    def authenticate_credentials(self, userid, password, request=None):
+        key = BASIC_CACHE_PREFIX + _hmac("basic", f"{userid}\n{password}")
+        cached = cache.get(key)
+        if cached is not None:
+            user_id, password_mark = cached
+            user = User.objects.filter(pk=user_id, is_active=True).first()
+            if user is not None and constant_time_compare(password_mark, _hmac("password", user.password)):
+                return user, None
+            cache.delete(key)
+
+        user, auth = super().authenticate_credentials(userid, password, request)
+        cache.set(key, (user.pk, _hmac("password", user.password)), timeout=settings.API_BASIC_AUTH_CACHE_TTL)
+        if request is not None:
+            self.issue(request, user)
+        return user, auth
+
+    def issue(self, request, user):
+        """Выдаёт сессию или JWT после проверки пароля (настройка API_BASIC_AUTH_ISSUE)."""
+        if settings.API_BASIC_AUTH_ISSUE == "session":
+            login(request._request, user)
+        elif settings.API_BASIC_AUTH_ISSUE == "jwt":
+            refresh = ClaimsRefreshToken.for_user(user)
+            request._request.issued_tokens = {"access": str(refresh.access_token), "refresh": str(refresh)}
+
+
+def attach_issued_tokens(request, response):
+    tokens = getattr(request, "issued_tokens", None)
+    if tokens is not None:
+        response.headers["X-Access-Token"] = tokens["access"]
+        response.headers["X-Refresh-Token"] = tokens["refresh"]
+
+
+@sync_and_async_middleware
+def issued_tokens_middleware(get_response):
+    """
+    Middleware: передаёт клиенту JWT, выданные CachedBasicAuthentication, в заголовках ответа.
+
+    Работает и синхронно, и асинхронно, чтобы под ASGI запрос не переводился
+    из-за него в поток.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            response = await get_response(request)
+            attach_issued_tokens(request, response)
+            return response
+    else:
+        def middleware(request):
+            response = get_response(request)
+            attach_issued_tokens(request, response)
+            return response
+    return middleware
@@ -0,0 +1,108 @@
+"""
+Пакетное выполнение GET-запросов к API за один HTTP-запрос (POST /api/batch/).
+
+Вложенный запрос выполняется тем же представлением, что обслуживает его
+адрес (через resolve()), с пользователем пакета: аутентификация делается
+один раз, а вложенным запросам результат передаётся так же, как
+force_authenticate() в тестах DRF. Ответ вложенного запроса берётся из
+response.data, без отрисовки в JSON и повторного разбора.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+# Заголовки вложенного запроса, которые передаются представлению.
+FORWARDED_HEADERS = {"accept": "HTTP_ACCEPT", "if-none-match": "HTTP_IF_NONE_MATCH"}
+
+# Заголовки ответа, которые возвращаются клиенту.
+RESPONSE_HEADERS = ("ETag", "Last-Modified")
+
+# Заголовки пакета, которые не должны попасть во вложенные запросы.
+DROPPED_META = ("HTTP_IF_NONE_MATCH", "HTTP_IF_MODIFIED_SINCE", "CONTENT_TYPE", "CONTENT_LENGTH")
+
+
+def _sub_request(request, path, headers):
+    url = urlsplit(path)
+    sub = HttpRequest()
+    sub.method = "GET"
+    sub.path = sub.path_info = url.path
+    sub.META = {key: value for key, value in request.META.items() if key not in DROPPED_META}
+    sub.META.update(REQUEST_METHOD="GET", PATH_INFO=url.path, QUERY_STRING=url.query)
+    for name, value in headers.items():
+        if name.lower() in FORWARDED_HEADERS:
+            sub.META[FORWARDED_HEADERS[name.lower()]] = value
+    sub.GET = QueryDict(url.query)
+    sub.COOKIES = request.COOKIES
+    sub.user = request.user
+    # Результат аутентификации пакета (см. rest_framework.request.Request).
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def run_one(request, item):
+    """
+    Выполняет один вложенный запрос.
+
+    Аргументы:
+        request (rest_framework.request.Request): запрос пакета.
+        item (dict): {'path', 'headers'} из BatchItemSerializer.
+
+    Возвращает:
+        dict: {'path', 'status', 'headers', 'body', 'time_ms'}.
+    """
+    started = time.perf_counter()
+    path = item["path"]
+    try:
+        match = resolve(urlsplit(path).path)
+    except Resolver404:
+        match = None
+    if match is None or match.url_name == "batch":
+        status, headers, body = 404, {}, {"detail": "Страница не найдена."}
+    else:
+        # Асинхронные представления (/api/async/) вызываются через async_to_sync.
+        view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+        response = view(_sub_request(request, path, item["headers"]), *match.args, **match.kwargs)
+        status = response.status_code
+        headers = {name: response[name] for name in RESPONSE_HEADERS if response.has_header(name)}
+        body = getattr(response, "data", None)
+    return {
+        "path": path,
+        "status": status,
+        "headers": headers,
+        "body": body,
+        "time_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+def _run_in_thread(request, item):
+    try:
+        return run_one(request, item)
+    finally:
+        # У потока пула своё соединение с базой; закрываем его, чтобы не копить подключения.
+        connections.close_all()
+
+
+def run_batch(request, items, parallel=False):
+    """
+    Выполняет вложенные запросы пакета.
+
+    Аргументы:
+        request (rest_framework.request.Request): запрос пакета.
+        items (list[dict]): вложенные запросы.
+        parallel (bool): выполнять ли их одновременно в API_BATCH_MAX_WORKERS
+            потоках (каждый со своим соединением с базой) вместо поочерёдного.
+
+    Возвращает:
+        list[dict]: результаты run_one() в порядке items.
+    """
+    if not parallel or len(items) == 1:
+        return [run_one(request, item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(settings.API_BATCH_MAX_WORKERS, len(items))) as pool:
+        return list(pool.map(lambda item: _run_in_thread(request, item), items))
@@ -0,0 +1,43 @@
+"""
+Условные GET-запросы к API по версиям данных (см. reports.conditional).
+
+Ответ списка или записи зависит от справочников (ACADEMICS_SCOPE) и от
+данных пользователя: у ученика — его оценок и посещаемости, у учителя —
+записей его уроков. Опрос без изменений получает 304 после одного запроса
+версий, без выборки и сериализации.
+"""
+from reports.conditional import versioned_response
+from reports.versioning import student_scope, teacher_scope
+
+
+class ConditionalGetMixin:
+    """
+    Миксин viewset'а: ETag и Last-Modified для list и retrieve.
+
+    Атрибуты:
+        versioned_for_director (bool): проверять ли версии для директора. Его
+            списки оценок и посещаемости зависят от записей всех учеников,
+            а общей области версий для них нет, поэтому там он получает
+            обычный ответ.
+    """
+    versioned_for_director = True
+
+    def get_version_scopes(self):
+        """Возвращает области, от которых зависит ответ пользователю, или None."""
+        user = self.request.user
+        if user.role == 'STUDENT':
+            return [student_scope(user.pk)]
+        if user.role == 'TEACHER':
+            return [teacher_scope(user.pk)]
+        return [] if self.versioned_for_director else None
+
+    def list(self, request, *args, **kwargs):
+        return versioned_response(
+            request, self.get_version_scopes(), lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs),
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return versioned_response(
+            request, self.get_version_scopes(),
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs),
+        )
@@ -0,0 +1,461 @@
+"""
+Поток событий журнала (Server-Sent Events) вместо опроса API.
+
+После фиксации транзакции, в которой сохранены или удалены оценки и
+отметки посещаемости (в том числе массово — grades_bulk_saved,
+attendance_bulk_saved), публикуется сообщение об уроке и учениках, чьи
+записи изменились (см. api.signals). Хаб процесса (EventHub) рассылает его
+подписчикам каналов classroom:<id> и student:<id>; клиент, получив
+событие, перечитывает нужные данные — с If-None-Match это дёшево.
+
+Поток обслуживает EventStreamApplication — ASGI-приложение, которое
+smartgrade.asgi ставит перед обработчиком Django: тот держал бы для
+каждого запроса поток asgiref до конца ответа. Подписчик — сопрограмма и
+очередь asyncio в цикле событий ASGI-сервера, без потока ОС и соединения
+с базой, поэтому простаивающие соединения дёшевы.
+Доставка между процессами задаётся API_EVENTS_BACKPLANE:
+
+    'local'    — подписчикам своего процесса (один воркер ASGI, запись
+                 через него же);
+    'postgres' — через NOTIFY/LISTEN PostgreSQL: каждый процесс держит
+                 одно слушающее соединение, а публиковать может любой —
+                 воркеры WSGI, ASGI, команды manage.py.
+"""
+import asyncio
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+import psycopg2
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.handlers.asgi import ASGIRequest
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+from psycopg2 import sql
+from rest_framework import permissions, status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import APIException, NotFound, PermissionDenied, ValidationError
+from rest_framework.views import APIView
+
+from academics.models import ClassRoom
+from accounts.models import User
+from .authentication import CachedBasicAuthentication, ClaimsJWTAuthentication, attach_issued_tokens
+from .serializers import EventStreamSerializer
+
+logger = logging.getLogger(__name__)
+
+# Наибольшее число учеников в одном сообщении: NOTIFY принимает не более 8000 байт.
+MAX_STUDENTS = 500
+
+# Пауза перед повторным подключением слушателя PostgreSQL (секунды).
+RECONNECT_DELAY = 5
+
+# Через сколько миллисекунд EventSource переподключается после обрыва.
+RETRY_MS = 3000
+
+# Потоков для проверки пользователя при открытии потока событий.
+AUTH_WORKERS = 4
+
+# Событие для подписчика, который мог пропустить сообщения: данные нужно перечитать целиком.
+RESET = {"kind": "reset"}
+
+
+def student_channel(student_id):
+    return f"student:{student_id}"
+
+
+def classroom_channel(classroom_id):
+    return f"classroom:{classroom_id}"
+
+
+def journal_messages(kind, lesson, student_ids):
+    """
+    Собирает сообщения об изменении записей урока.
+
+    Аргументы:
+        kind (str): 'grades' или 'attendance'.
+        lesson (Lesson): урок, записи которого изменились.
+        student_ids (Iterable[int]): ученики с изменёнными записями.
+
+    Возвращает:
+        list[dict]: {'kind', 'lesson', 'classroom', 'subject', 'date', 'students'},
+        не более MAX_STUDENTS учеников в каждом.
+    """
+    students = sorted(set(student_ids))
+    return [
+        {
+            "kind": kind,
+            "lesson": lesson.pk,
+            "classroom": lesson.classroom_id,
+            "subject": lesson.subject_id,
+            "date": lesson.date.isoformat(),
+            "students": students[start:start + MAX_STUDENTS],
+        }
+        for start in range(0, len(students), MAX_STUDENTS)
+    ]
+
+
+def publish(messages):
+    """
+    Публикует сообщения после фиксации текущей транзакции (сразу, если её нет).
+
+    При откате транзакции сообщения не отправляются.
+    """
+    if messages:
+        transaction.on_commit(lambda: send(messages))
+
+
+def send(messages):
+    """Передаёт сообщения хабам: своему процессу или всем процессам через NOTIFY."""
+    if settings.API_EVENTS_BACKPLANE == "postgres":
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_notify(%s, message) FROM unnest(%s::text[]) AS message",
+                [settings.API_EVENTS_CHANNEL, [json.dumps(message) for message in messages]],
+            )
+    else:
+        hub.deliver(messages)
+
+
+class Subscription:
+    """Подписка одного клиента на канал: очередь ещё не отправленных событий."""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.queue = asyncio.Queue(maxsize=settings.API_EVENTS_QUEUE_SIZE)
+
+    def push(self, event):
+        """Кладёт событие в очередь; если клиент не успевает читать, заменяет очередь одним RESET."""
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+
+class PostgresListener:
+    """
+    Слушающее соединение процесса: уведомления канала API_EVENTS_CHANNEL
+    читаются в цикле событий (add_reader) и передаются хабу.
+
+    После обрыва соединение восстанавливается через RECONNECT_DELAY секунд,
+    а подписчики получают RESET — сообщения за время обрыва потеряны.
+    """
+
+    def __init__(self, hub, loop):
+        self.hub = hub
+        self.loop = loop
+        self.connection = None
+        self.closed = False
+
+    def start(self):
+        try:
+            connection = psycopg2.connect(**connections[DEFAULT_DB_ALIAS].get_connection_params())
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(sql.SQL("LISTEN {}").format(sql.Identifier(settings.API_EVENTS_CHANNEL)))
+        except psycopg2.Error:
+            logger.exception("Не удалось подписаться на уведомления PostgreSQL.")
+            self.loop.call_later(RECONNECT_DELAY, self.restart)
+            return False
+        self.connection = connection
+        self.loop.add_reader(connection.fileno(), self.read)
+        return True
+
+    def restart(self):
+        if not self.closed and self.start():
+            self.hub.dispatch([RESET])
+
+    def read(self):
+        try:
+            self.connection.poll()
+        except psycopg2.Error:
+            logger.warning("Соединение для уведомлений PostgreSQL потеряно, переподключение.")
+            self.disconnect()
+            self.loop.call_later(RECONNECT_DELAY, self.restart)
+            return
+        notifies, self.connection.notifies[:] = list(self.connection.notifies), []
+        self.hub.dispatch([json.loads(notify.payload) for notify in notifies])
+
+    def disconnect(self):
+        if self.connection is None:
+            return
+        if not self.loop.is_closed():
+            self.loop.remove_reader(self.connection.fileno())
+        self.connection.close()
+        self.connection = None
+
+    def close(self):
+        self.closed = True
+        self.disconnect()
+
+
+class EventHub:
+    """
+    Рассылка событий журнала подписчикам процесса.
+
+    Подписки живут в цикле событий ASGI-сервера и меняются только в нём;
+    deliver() можно вызывать из любого потока.
+    """
+
+    def __init__(self):
+        self.loop = None
+        self.listener = None
+        self.channels = {}
+
+    def bind(self, loop):
+        """Привязывает хаб к циклу событий; подписки прежнего цикла сбрасываются."""
+        if self.loop is loop:
+            return
+        self.close()
+        self.loop = loop
+        if settings.API_EVENTS_BACKPLANE == "postgres":
+            self.listener = PostgresListener(self, loop)
+            self.listener.start()
+
+    def close(self):
+        """Отключает хаб от цикла событий и закрывает слушающее соединение."""
+        if self.listener is not None:
+            self.listener.close()
+        self.loop, self.listener, self.channels = None, None, {}
+
+    async def subscribe(self, channel):
+        self.bind(asyncio.get_running_loop())
+        subscription = Subscription(channel)
+        self.channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscriptions = self.channels.get(subscription.channel)
+        if subscriptions is not None:
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                del self.channels[subscription.channel]
+
+    def deliver(self, messages):
+        """Передаёт сообщения в цикл событий хаба; без подписчиков ничего не делает."""
+        loop = self.loop
+        if loop is None or not self.channels:
+            return
+        try:
+            loop.call_soon_threadsafe(self.dispatch, messages)
+        except RuntimeError:
+            # Цикл событий уже закрыт.
+            pass
+
+    def dispatch(self, messages):
+        """Раскладывает сообщения по очередям подписчиков (вызывается в цикле событий хаба)."""
+        for message in messages:
+            if message["kind"] == RESET["kind"]:
+                for subscriptions in self.channels.values():
+                    for subscription in subscriptions:
+                        subscription.push(RESET)
+                continue
+            for subscription in self.channels.get(classroom_channel(message["classroom"]), ()):
+                subscription.push(message)
+            for student_id in message["students"]:
+                subscriptions = self.channels.get(student_channel(student_id))
+                if subscriptions:
+                    event = {**message, "students": [student_id]}
+                    for subscription in subscriptions:
+                        subscription.push(event)
+
+
+hub = EventHub()
+
+# Пользователь проверяется в общем пуле потоков; соединения с базой, открытые
+# в нём, закрываются сразу после проверки.
+auth_executor = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="events-auth")
+
+AUTHENTICATION_CLASSES = [SessionAuthentication, ClaimsJWTAuthentication, CachedBasicAuthentication]
+
+
+class StreamUnavailable(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Поток событий доступен только через ASGI-приложение smartgrade.asgi."
+    default_code = "asgi_required"
+
+
+class JournalEventsView(APIView):
+    """
+    Маршрут /api/events/ в обработчике Django.
+
+    Поток событий обслуживает EventStreamApplication раньше обработчика
+    Django (см. smartgrade.asgi); сюда запрос попадает только под WSGI или
+    без этой обёртки и получает 503.
+    """
+    authentication_classes = AUTHENTICATION_CLASSES
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        raise StreamUnavailable
+
+
+def check_channel(view, request):
+    """Проверяет пользователя и параметры запроса и возвращает канал подписки."""
+    view.perform_authentication(request)
+    view.check_permissions(request)
+    user = request.user
+    if user.role == "STUDENT":
+        return student_channel(user.pk)
+
+    params = EventStreamSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    classroom_id, student_id = params.validated_data.get("classroom"), params.validated_data.get("student")
+    if user.role == "TEACHER":
+        if classroom_id is None:
+            raise ValidationError({"classroom": "Укажите класс."})
+        classrooms = ClassRoom.objects.filter(Q(curator=user) | Q(lessons__teacher=user), pk=classroom_id)
+        if not classrooms.exists():
+            raise PermissionDenied("Нет доступа к событиям этого класса.")
+        return classroom_channel(classroom_id)
+    if user.role != "ADMIN" and not user.is_superuser:
+        raise PermissionDenied("Нет доступа к событиям журнала.")
+    if classroom_id is not None:
+        if not ClassRoom.objects.filter(pk=classroom_id).exists():
+            raise NotFound("Класс не найден.")
+        return classroom_channel(classroom_id)
+    if student_id is not None:
+        if not User.objects.filter(pk=student_id, role="STUDENT").exists():
+            raise NotFound("Ученик не найден.")
+        return student_channel(student_id)
+    raise ValidationError("Укажите класс или ученика.")
+
+
+def authorize(request):
+    """
+    Проверяет запрос потока событий так же, как представления API (выполняется в auth_executor).
+
+    Сессия и пользователь подключаются к запросу, как это делают
+    SessionMiddleware и AuthenticationMiddleware; ответ проходит через их
+    обработку ответа и issued_tokens_middleware.
+
+    Аргументы:
+        request (ASGIRequest): запрос, собранный из scope.
+
+    Возвращает:
+        tuple[str | None, HttpResponse]: канал подписки и заголовки потока
+        или None и ответ с ошибкой.
+    """
+    request.session = import_module(settings.SESSION_ENGINE).SessionStore(
+        request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    )
+    request.user = SimpleLazyObject(lambda: get_user(request))
+    view = APIView(authentication_classes=AUTHENTICATION_CLASSES, permission_classes=[permissions.IsAuthenticated])
+    view.args, view.kwargs = (), {}
+    drf_request = view.initialize_request(request)
+    view.request, view.headers = drf_request, view.default_response_headers
+    try:
+        channel = check_channel(view, drf_request)
+        response = HttpResponse(content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Запрещает nginx буферизовать поток.
+        response["X-Accel-Buffering"] = "no"
+    except Exception as exc:
+        channel = None
+        response = view.finalize_response(drf_request, view.handle_exception(exc))
+        response.render()
+    finally:
+        # Не держим соединения потоков пула между подключениями клиентов.
+        connections.close_all()
+    attach_issued_tokens(request, response)
+    return channel, SessionMiddleware(lambda request: response).process_response(request, response)
+
+
+def response_start(response):
+    """Сообщение http.response.start ASGI со статусом, заголовками и cookie ответа Django."""
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in response.items()]
+    headers += [(b"Set-Cookie", cookie.output(header="").strip().encode("latin-1"))
+                for cookie in response.cookies.values()]
+    return {"type": "http.response.start", "status": response.status_code, "headers": headers}
+
+
+async def wait_disconnect(receive):
+    """Ждёт отключения клиента."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+class EventStreamApplication:
+    """
+    ASGI-приложение: GET /api/events/ (text/event-stream) обслуживается до
+    обработчика Django, остальные запросы передаются ему.
+
+    Обработчик Django держит для каждого запроса поток asgiref до конца
+    ответа. Здесь пользователь проверяется в пуле auth_executor, а открытый
+    поток событий — это сопрограмма и очередь подписки, без потока ОС и
+    соединения с базой.
+
+    Ученик получает события своих оценок и посещаемости. Учитель — события
+    класса ?classroom=<id>, который он курирует или в котором ведёт уроки.
+    Директор — любого класса (?classroom=) или ученика (?student=).
+
+    События grades и attendance: {"kind", "lesson", "classroom", "subject",
+    "date", "students"}; reset — клиент мог пропустить события и должен
+    перечитать данные. Раз в API_EVENTS_HEARTBEAT секунд отправляется
+    комментарий, чтобы прокси не закрывали простаивающее соединение.
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.path = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "GET" and self.is_events_path(scope):
+            await self.serve(scope, receive, send)
+        else:
+            await self.application(scope, receive, send)
+
+    def is_events_path(self, scope):
+        if self.path is None:
+            self.path = reverse("events")
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        return path == self.path
+
+    async def serve(self, scope, receive, send):
+        request = ASGIRequest(scope, io.BytesIO())
+        channel, response = await sync_to_async(authorize, thread_sensitive=False, executor=auth_executor)(request)
+        await send(response_start(response))
+        if channel is None:
+            await send({"type": "http.response.body", "body": response.content})
+            return
+
+        subscription = await hub.subscribe(channel)
+        try:
+            await self.stream(subscription, receive, send)
+        finally:
+            hub.unsubscribe(subscription)
+
+    async def stream(self, subscription, receive, send):
+        """Отправляет события подписки, пока клиент не отключится."""
+        await send({"type": "http.response.body", "body": f"retry: {RETRY_MS}\n\n".encode(), "more_body": True})
+        disconnect = asyncio.ensure_future(wait_disconnect(receive))
+        event = asyncio.ensure_future(subscription.queue.get())
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    {disconnect, event}, timeout=settings.API_EVENTS_HEARTBEAT, return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnect in done:
+                    return
+                if event in done:
+                    message = event.result()
+                    event = asyncio.ensure_future(subscription.queue.get())
+                    chunk = f"event: {message['kind']}\ndata: {json.dumps(message)}\n\n"
+                else:
+                    chunk = ": ping\n\n"
+                await send({"type": "http.response.body", "body": chunk.encode(), "more_body": True})
+        finally:
+            disconnect.cancel()
+            event.cancel()
@@ -0,0 +1,133 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+
+from accounts.models import User
+from api.authentication import ClaimsRefreshToken
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает пропускную способность чтения API при одновременных клиентах:
+    синхронный путь через WSGI-приложение (пул из --threads потоков, как
+    у gunicorn --threads) против /api/async/ через ASGI-приложение в одном цикле событий.
+
+    Оба приложения вызываются в этом процессе без сети, так что замер
+    показывает стоимость обработки запросов Django, а не HTTP-сервера.
+    Клиент аутентифицируется JWT пользователя --email (по умолчанию — первый
+    учитель с уроками).
+
+    Пример:
+        python manage.py bench_api_async --path "/api/grades/?page_size=50" --clients 32 --requests 20
+    """
+    help = "Бенчмарк одновременных клиентов: WSGI против ASGI (/api/async/)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--path", default="/api/grades/?page_size=50", help="Адрес синхронного списка API")
+        parser.add_argument("--clients", type=int, default=32, help="Одновременных клиентов")
+        parser.add_argument("--requests", type=int, default=20, help="Запросов на клиента")
+        parser.add_argument("--threads", type=int, help="Потоков WSGI (по умолчанию — по одному на клиента)")
+        parser.add_argument("--email", help="Пользователь, от имени которого идут запросы")
+
+    def handle(self, *args, **options):
+        users = User.objects.filter(email=options["email"]) if options["email"] else (
+            User.objects.filter(role="TEACHER", lessons__isnull=False).order_by("pk")
+        )
+        user = users.first()
+        if user is None:
+            raise CommandError("Пользователь не найден.")
+        if not options["path"].startswith("/api/"):
+            raise CommandError("Путь должен начинаться с /api/.")
+        host = next((host for host in settings.ALLOWED_HOSTS if host != "*" and not host.startswith(".")), "localhost")
+        token = str(ClaimsRefreshToken.for_user(user).access_token)
+        path, _, query = options["path"].partition("?")
+        async_path = "/api/async/" + path[len("/api/"):]
+        clients, count = options["clients"], options["requests"]
+
+        self.stdout.write(f"{clients} клиентов × {count} запросов, {options['path']}")
+        wsgi = self.run_wsgi(host, token, path, query, clients, count, options["threads"] or clients)
+        asgi = self.run_asgi(host, token, async_path, query, clients, count)
+        for label, (rate, latency) in (("WSGI, потоки", wsgi), ("ASGI, /api/async/", asgi)):
+            self.stdout.write(f"{label:<18} | {rate:>8.1f} запросов/с | медиана {latency:>7.1f} мс")
+        self.stdout.write(self.style.SUCCESS(f"ASGI / WSGI: ×{asgi[0] / wsgi[0]:.2f}"))
+
+    def run_wsgi(self, host, token, path, query, clients, count, threads):
+        """Возвращает (запросов в секунду, медиана времени ответа в мс) для WSGI-приложения."""
+        application = get_wsgi_application()
+        environ = {
+            "REQUEST_METHOD": "GET", "PATH_INFO": path, "QUERY_STRING": query, "SCRIPT_NAME": "",
+            "SERVER_NAME": host, "SERVER_PORT": "80", "SERVER_PROTOCOL": "HTTP/1.1", "HTTP_HOST": host,
+            "HTTP_AUTHORIZATION": f"Bearer {token}", "wsgi.url_scheme": "http",
+        }
+
+        def call():
+            statuses = []
+            body = application({**environ, "wsgi.input": BytesIO()}, lambda status, headers: statuses.append(status))
+            b"".join(body)
+            body.close()
+            if not statuses[0].startswith("200"):
+                raise CommandError(f"WSGI: {statuses[0]}")
+
+        call()  # прогрев
+        # Клиенты ждут ответа на каждый запрос; время ответа включает ожидание свободного потока сервера.
+        with ThreadPoolExecutor(max_workers=threads) as server, ThreadPoolExecutor(max_workers=clients) as users:
+            def client():
+                latencies = []
+                for _ in range(count):
+                    started = time.perf_counter()
+                    server.submit(call).result()
+                    latencies.append(time.perf_counter() - started)
+                return latencies
+
+            started = time.perf_counter()
+            latencies = sum(users.map(lambda _: client(), range(clients)), [])
+            elapsed = time.perf_counter() - started
+        return clients * count / elapsed, statistics.median(latencies) * 1000
+
+    def run_asgi(self, host, token, path, query, clients, count):
+        """Возвращает (запросов в секунду, медиана времени ответа в мс) для ASGI-приложения."""
+        application = get_asgi_application()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": path, "raw_path": path.encode(), "query_string": query.encode(), "root_path": "",
+            "headers": [(b"host", host.encode()), (b"authorization", f"Bearer {token}".encode())],
+            "server": (host, 80), "client": ("127.0.0.1", 0),
+        }
+
+        async def call():
+            sent = []
+            received = asyncio.Event()
+
+            async def receive():
+                # Тело запроса пустое; дальше клиент не отключается до конца ответа.
+                if not received.is_set():
+                    received.set()
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await asyncio.Future()
+
+            async def send(message):
+                sent.append(message)
+
+            started = time.perf_counter()
+            await application(dict(scope), receive, send)
+            if sent[0]["status"] != 200:
+                raise CommandError(f"ASGI: {sent[0]['status']}")
+            return time.perf_counter() - started
+
+        async def client():
+            return [await call() for _ in range(count)]
+
+        async def run():
+            await call()  # прогрев
+            started = time.perf_counter()
+            latencies = sum(await asyncio.gather(*(client() for _ in range(clients))), [])
+            return clients * count / (time.perf_counter() - started), statistics.median(latencies) * 1000
+
+        return asyncio.run(run())
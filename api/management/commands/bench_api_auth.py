@@ -0,0 +1,60 @@
+import base64
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authentication import BasicAuthentication
+from rest_framework.test import APIRequestFactory
+
+from accounts.models import User
+from api.authentication import CachedBasicAuthentication
+from api.views import SubjectViewSet
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает пропускную способность одного процесса для запросов API
+    с Basic-аутентификацией: BasicAuthentication (PBKDF2 на каждый запрос)
+    против CachedBasicAuthentication.
+
+    Запросы идут подряд к списку предметов (?fields=id), так что время
+    определяется аутентификацией, а не выборкой.
+
+    Пример:
+        python manage.py bench_api_auth --email teacher@example.com --password secret --requests 20
+    """
+    help = "Бенчмарк Basic-аутентификации API: запросов в секунду на процесс"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", required=True, help="E-mail пользователя")
+        parser.add_argument("--password", required=True, help="Пароль пользователя")
+        parser.add_argument("--requests", type=int, default=20, help="Запросов на каждый замер")
+
+    def measure(self, authentication, credentials, count):
+        """Возвращает число обработанных запросов в секунду."""
+        view = SubjectViewSet.as_view({"get": "list"}, authentication_classes=[authentication])
+        host = next((host for host in settings.ALLOWED_HOSTS if host != "*" and not host.startswith(".")), "localhost")
+        factory = APIRequestFactory(HTTP_HOST=host, HTTP_AUTHORIZATION=f"Basic {credentials}")
+
+        def call():
+            response = view(factory.get("/", {"fields": "id", "page_size": 1}))
+            if response.status_code != 200:
+                raise CommandError(f"Запрос отклонён: {response.status_code}.")
+
+        call()  # прогрев (и заполнение кэша для CachedBasicAuthentication)
+        started = time.perf_counter()
+        for _ in range(count):
+            call()
+        return count / (time.perf_counter() - started)
+
+    def handle(self, *args, **options):
+        if not User.objects.filter(email=options["email"]).exists():
+            raise CommandError("Пользователь не найден.")
+        credentials = base64.b64encode(f"{options['email']}:{options['password']}".encode()).decode()
+
+        results = {}
+        for authentication in (BasicAuthentication, CachedBasicAuthentication):
+            results[authentication] = self.measure(authentication, credentials, options["requests"])
+            self.stdout.write(f"{authentication.__name__:<26} | {results[authentication]:>8.1f} запросов/с")
+        speedup = results[CachedBasicAuthentication] / results[BasicAuthentication]
+        self.stdout.write(self.style.SUCCESS(f"ускорение ×{speedup:.1f}"))
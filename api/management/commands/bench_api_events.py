@@ -0,0 +1,114 @@
+import asyncio
+import statistics
+import threading
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+
+from academics.models import Lesson
+from api.authentication import ClaimsRefreshToken
+from api.events import EventStreamApplication, journal_messages, send
+
+
+class Command(BaseCommand):
+    """
+    Оценивает поток событий /api/events/ под ASGI: сколько памяти и потоков занимает
+    простаивающее соединение и за сколько событие доходит до всех подписчиков.
+
+    Открывает --connections потоков класса от имени учителя первого урока
+    (ASGI-приложение, как в smartgrade.asgi, вызывается в этом процессе без
+    сети), затем --events раз публикует событие урока из отдельного потока,
+    как после записи оценки.
+
+    Пример:
+        python manage.py bench_api_events --connections 2000 --events 20
+    """
+    help = "Бенчмарк потока событий журнала: память на соединение и время рассылки"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=1000, help="Одновременных соединений")
+        parser.add_argument("--events", type=int, default=20, help="Публикуемых событий")
+
+    def handle(self, *args, **options):
+        lesson = Lesson.objects.select_related("teacher").filter(classroom__enrollments__isnull=False).first()
+        if lesson is None:
+            raise CommandError("Нет уроков в классах с учениками.")
+        student_id = lesson.classroom.enrollments.values_list("student_id", flat=True).first()
+        host = next((host for host in settings.ALLOWED_HOSTS if host != "*" and not host.startswith(".")), "localhost")
+        token = str(ClaimsRefreshToken.for_user(lesson.teacher).access_token)
+        messages = journal_messages("grades", lesson, [student_id])
+        count = options["connections"]
+
+        opened, memory, threads, latencies = asyncio.run(
+            self.run(host, token, lesson.classroom_id, messages, count, options["events"])
+        )
+        self.stdout.write(f"{count} соединений открыто за {opened:.2f} с, "
+                          f"память на соединение ≈ {memory / count / 1024:.1f} КиБ, потоков процесса: {threads}")
+        self.stdout.write(self.style.SUCCESS(
+            f"рассылка всем: медиана {statistics.median(latencies) * 1000:.1f} мс, "
+            f"максимум {max(latencies) * 1000:.1f} мс"
+        ))
+
+    async def run(self, host, token, classroom_id, messages, count, events):
+        application = EventStreamApplication(get_asgi_application())
+        query = f"classroom={classroom_id}".encode()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": "/api/events/", "raw_path": b"/api/events/", "query_string": query, "root_path": "",
+            "headers": [(b"host", host.encode()), (b"authorization", f"Bearer {token}".encode())],
+            "server": (host, 80), "client": ("127.0.0.1", 0),
+        }
+        disconnect = asyncio.Event()
+        subscribed = asyncio.Semaphore(0)
+        received = {"count": 0, "done": None}
+
+        async def connection():
+            started = False
+
+            async def receive():
+                nonlocal started
+                if not started:
+                    started = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                await disconnect.wait()
+                return {"type": "http.disconnect"}
+
+            async def send_message(message):
+                if message["type"] == "http.response.start" and message["status"] != 200:
+                    raise CommandError(f"Поток не открыт: {message['status']}.")
+                body = message.get("body", b"")
+                if body.startswith(b"retry:"):
+                    subscribed.release()
+                elif body.startswith(b"event:"):
+                    received["count"] += 1
+                    if received["count"] == count:
+                        received["done"].set()
+
+            await application(dict(scope), receive, send_message)
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        tasks = [asyncio.create_task(connection()) for _ in range(count)]
+        for _ in range(count):
+            await subscribed.acquire()
+        opened = time.perf_counter() - started
+        memory = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        threads = threading.active_count()
+
+        latencies = []
+        for _ in range(events):
+            received["count"], received["done"] = 0, asyncio.Event()
+            started = time.perf_counter()
+            # Публикация из потока, как из синхронного представления после фиксации транзакции.
+            await asyncio.to_thread(send, messages)
+            await received["done"].wait()
+            latencies.append(time.perf_counter() - started)
+
+        disconnect.set()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return opened, memory, threads, latencies
@@ -0,0 +1,69 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from accounts.models import User
+from api.views import AttendanceRecordViewSet, GradeRecordViewSet
+
+VIEWSETS = {"grades": GradeRecordViewSet, "attendance": AttendanceRecordViewSet}
+
+# Раскрытия, при которых ответ совпадает с прежним форматом (полные вложенные объекты).
+FULL_EXPAND = "lesson.subject.teacher,lesson.classroom.curator,lesson.teacher,student"
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает размер ответа и время построения страницы списка API
+    в обычном JSON и в колоночном формате (?format=columnar) на данных текущей базы.
+
+    Пример:
+        python manage.py bench_api_formats --page-size 500 --repeat 5
+    """
+    help = "Бенчмарк форматов ответа API: JSON против ?format=columnar"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--endpoint", choices=sorted(VIEWSETS), default="grades", help="Список API")
+        parser.add_argument("--page-size", type=int, default=500, help="Записей на странице")
+        parser.add_argument("--repeat", type=int, default=5, help="Повторов на каждый замер")
+
+    def measure(self, view, user, params, repeat):
+        """Возвращает медиану времени (мс) запроса с отрисовкой ответа и размер ответа (КиБ)."""
+        # Ссылки на страницы строятся по Host запроса — берём разрешённый в настройках.
+        host = next((host for host in settings.ALLOWED_HOSTS if host != "*" and not host.startswith(".")), "localhost")
+        factory = APIRequestFactory(HTTP_HOST=host)
+
+        def call():
+            request = factory.get("/", params)
+            force_authenticate(request, user=user)
+            response = view(request)
+            response.render()
+            return response
+
+        call()  # прогрев
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = call()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), len(response.content) / 1024
+
+    def handle(self, *args, **options):
+        user = User.objects.filter(role="ADMIN").first()
+        if user is None:
+            raise CommandError("Нужен пользователь с ролью ADMIN.")
+        view = VIEWSETS[options["endpoint"]].as_view({"get": "list"})
+
+        self.stdout.write(f"{'раскрытие':<10} | {'формат':<9} | {'время, мс':>10} | {'размер, КиБ':>11}")
+        for label, expand in (("нет", ""), ("полное", FULL_EXPAND)):
+            results = {}
+            for file_format in ("json", "columnar"):
+                params = {"page_size": options["page_size"], "expand": expand, "format": file_format}
+                results[file_format] = self.measure(view, user, params, options["repeat"])
+                elapsed, size = results[file_format]
+                self.stdout.write(f"{label:<10} | {file_format:<9} | {elapsed:>10.1f} | {size:>11.1f}")
+            speedup = results["json"][0] / results["columnar"][0]
+            ratio = results["json"][1] / results["columnar"][1]
+            self.stdout.write(self.style.SUCCESS(f"{label:<10} | ускорение ×{speedup:.2f}, размер меньше в {ratio:.1f} раза"))
@@ -0,0 +1,242 @@
+"""
+Постраничная выдача списков API по ключу (keyset).
+
+Страница выбирается не смещением, а условием «строго после последней
+записи предыдущей страницы» по полям сортировки, например
+ROW(date, id) < ROW(2025-09-01, 1234). При индексе по этим полям база начинает
+чтение сразу с нужного места, поэтому дальние страницы стоят столько же,
+сколько первая. Курсор — непрозрачная строка со значениями полей
+сортировки граничной записи и направлением.
+"""
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Field, Func, Q, Value
+from django.db.models.constants import LOOKUP_SEP
+from django.db.models.lookups import GreaterThan, LessThan
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(values, backwards=False):
+    """Кодирует значения полей сортировки граничной записи в курсор."""
+    payload = json.dumps({"v": values, "b": int(backwards)}, cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, length):
+    """
+    Разбирает курсор.
+
+    Аргументы:
+        cursor (str): строка из параметра запроса.
+        length (int): число полей сортировки.
+
+    Возвращает:
+        tuple[list, bool]: значения полей и признак движения назад.
+
+    Исключения:
+        NotFound: курсор повреждён или от другой сортировки.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        values, backwards = payload["v"], bool(payload["b"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise NotFound("Неверный курсор.")
+    if not isinstance(values, list) or len(values) != length:
+        raise NotFound("Неверный курсор.")
+    # Поля сортировки не NULL, поэтому в курсоре допустимы только строки и числа.
+    if not all(isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in values):
+        raise NotFound("Неверный курсор.")
+    return values, backwards
+
+
+def cursor_values(model, fields, values):
+    """
+    Приводит значения из курсора к типам полей сортировки.
+
+    Аргументы:
+        model (type[Model]): модель queryset.
+        fields (Sequence[str]): пути полей сортировки без «-».
+        values (Sequence): значения из decode_cursor().
+
+    Возвращает:
+        list: значения полей (date, int, ...).
+
+    Исключения:
+        NotFound: значение не подходит полю, например дата «abc».
+    """
+    try:
+        return [_model_field(model, field).to_python(value) for field, value in zip(fields, values)]
+    except (ValidationError, TypeError, ValueError):
+        raise NotFound("Неверный курсор.")
+
+
+def _model_field(model, path):
+    *relations, name = path.split(LOOKUP_SEP)
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def keyset_filter(model, ordering, values):
+    """
+    Строит условие «после записи со значениями values» для сортировки ordering.
+
+    Если все поля — столбцы самой модели и сортируются в одну сторону,
+    условие записывается сравнением строк ROW(date, id) < ROW(d, i): его база
+    выполняет одним проходом по составному индексу, даже когда у многих
+    записей одинаковая дата. Иначе (поле связанной модели, разные
+    направления) — date < d OR (date = d AND id < i) с добавочным date <= d,
+    чтобы просмотр индекса начинался с нужного места.
+
+    Аргументы:
+        model (type[Model]): модель queryset.
+        ordering (Sequence[str]): поля сортировки, «-» в начале — по убыванию.
+        values (Sequence): значения этих полей у граничной записи.
+
+    Возвращает:
+        Q | Lookup: условие для filter().
+    """
+    fields = [(name.lstrip("-"), name.startswith("-")) for name in ordering]
+    directions = {descending for _, descending in fields}
+    if len(directions) == 1 and not any(LOOKUP_SEP in field for field, _ in fields):
+        lookup = LessThan if directions.pop() else GreaterThan
+        row = Func(*(F(field) for field, _ in fields), function="ROW", output_field=Field())
+        bound = Func(
+            *(Value(_model_field(model, field).to_python(value), output_field=_model_field(model, field))
+              for (field, _), value in zip(fields, values)),
+            function="ROW", output_field=Field(),
+        )
+        return lookup(row, bound)
+
+    condition = Q()
+    equal = Q()
+    for (field, descending), value in zip(fields, values):
+        condition |= equal & Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+        equal &= Q(**{field: value})
+    first, descending = fields[0]
+    return condition & Q(**{f"{first}__{'lte' if descending else 'gte'}": values[0]})
+
+
+def _reverse(ordering):
+    return [name[1:] if name.startswith("-") else f"-{name}" for name in ordering]
+
+
+class KeysetPagination(BasePagination):
+    """
+    Постраничная выдача по ключу сортировки view.keyset_ordering (по умолчанию ('-id',)).
+
+    Последнее поле сортировки должно быть уникальным (обычно id), а все
+    поля — не NULL. Поля связанных моделей (lesson__date) допустимы, но
+    условие по ним не сводится к сравнению строк по одному индексу: база
+    соединяет таблицы и отбирает строки по индексу связанной модели, поэтому
+    дальние страницы там дороже, чем при сортировке по столбцам самой модели. Параметры запроса: cursor — курсор из ссылок next и
+    previous, page_size — размер страницы (не больше API_MAX_PAGE_SIZE).
+    Ответ: {"next": url, "previous": url, "results": [...]}.
+    """
+    ordering = ("-id",)
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+
+    def get_page_size(self, request):
+        """Возвращает размер страницы из запроса, ограниченный API_MAX_PAGE_SIZE."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+        return min(max(page_size, 1), settings.API_MAX_PAGE_SIZE)
+
+    def paginate_queryset(self, queryset, request, view=None, values=None):
+        """
+        Возвращает строки страницы.
+
+        Аргументы:
+            values (Sequence[str] | None): пути для values_list(named=True) — тогда
+                строки страницы не объекты моделей, а именованные кортежи этих
+                путей (и ключей сортировки после них).
+        """
+        queryset = self._page_queryset(queryset, request, view, values)
+        return self._finish_page(list(queryset[:self.page_size + 1]))
+
+    async def apaginate_queryset(self, queryset, request, view=None, values=None):
+        """Асинхронный вариант paginate_queryset(): строки читаются через aiterator()."""
+        queryset = self._page_queryset(queryset, request, view, values)
+        # chunk_size обязателен для aiterator() после prefetch_related().
+        rows = [row async for row in queryset[:self.page_size + 1].aiterator(chunk_size=self.page_size + 1)]
+        return self._finish_page(rows)
+
+    def _page_queryset(self, queryset, request, view, values):
+        ordering = list(getattr(view, "keyset_ordering", self.ordering))
+        fields = [name.lstrip("-") for name in ordering]
+        self.request = request
+        self.page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        self.cursor_values, self.backwards = decode_cursor(cursor, len(ordering)) if cursor else (None, False)
+        if self.cursor_values is not None:
+            self.cursor_values = cursor_values(queryset.model, fields, self.cursor_values)
+        page_ordering = _reverse(ordering) if self.backwards else ordering
+        # Значения полей сортировки читаются из аннотаций, чтобы не обращаться к связанным объектам.
+        # Имена без «_» в начале: это и поля именованных кортежей values_list(named=True).
+        self.keys = {f"keyset_{position}": F(field) for position, field in enumerate(fields)}
+        queryset = queryset.annotate(**self.keys).order_by(*page_ordering)
+        if values is not None:
+            queryset = queryset.values_list(*values, *self.keys, named=True)
+        if self.cursor_values is not None:
+            queryset = queryset.filter(keyset_filter(queryset.model, page_ordering, self.cursor_values))
+        return queryset
+
+    def _finish_page(self, rows):
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.backwards:
+            rows.reverse()
+
+        def row_keys(row):
+            return [getattr(row, key) for key in self.keys]
+
+        self.next_cursor = self.previous_cursor = None
+        if rows:
+            if has_more or self.backwards:
+                self.next_cursor = encode_cursor(row_keys(rows[-1]))
+            if (has_more and self.backwards) or (self.cursor_values is not None and not self.backwards):
+                self.previous_cursor = encode_cursor(row_keys(rows[0]), backwards=True)
+        return rows
+
+    def _link(self, cursor):
+        if cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
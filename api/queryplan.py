@@ -0,0 +1,151 @@
+"""
+План загрузки данных для API по дереву полей сериализатора.
+
+Вложенные сериализаторы и связанные поля ходят по связям объекта, и без
+подготовки queryset каждый такой переход — отдельный запрос на каждую
+запись. plan_queryset() обходит поля сериализатора и строит для queryset:
+
+- select_related() для прямых связей (ForeignKey, OneToOne), выводимых
+  вложенным сериализатором или связанным полем, отличным от первичного ключа;
+- prefetch_related() с собственным планом для обратных связей и
+  многие-ко-многим (many=True);
+- only() со столбцами, которые действительно нужны сериализатору.
+
+Если поле сериализатора не соответствует полю модели (свойство,
+SerializerMethodField, source='*' или путь через точку), для этой модели
+загружаются все столбцы: какие из них понадобятся, заранее неизвестно.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+LOOKUP_SEP = "__"
+
+
+def _concrete_fields(model):
+    return {field.name for field in model._meta.concrete_fields}
+
+
+class QueryPlan:
+    """
+    Собранный план загрузки: пути select_related, prefetch и столбцы для only().
+
+    Атрибуты:
+        select (list[str]): пути для select_related().
+        prefetch (list[Prefetch]): предзагрузки для prefetch_related().
+        only (set[str]): пути столбцов для only().
+    """
+
+    def __init__(self):
+        self.select = []
+        self.prefetch = []
+        self.only = set()
+
+    def apply(self, queryset):
+        """Применяет план к queryset."""
+        if self.select:
+            queryset = queryset.select_related(*self.select)
+        if self.prefetch:
+            queryset = queryset.prefetch_related(*self.prefetch)
+        return queryset.only(*self.only)
+
+    def walk(self, serializer, model, prefix=""):
+        """
+        Добавляет в план поля сериализатора модели model.
+
+        Аргументы:
+            serializer (Serializer): сериализатор одного объекта.
+            model (type[Model]): модель объекта.
+            prefix (str): путь от модели queryset до model (с разделителем на конце).
+        """
+        columns = {model._meta.pk.name}
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.BaseSerializer) and field.source == "*":
+                self.walk(field, model, prefix)
+                continue
+            if len(field.source_attrs) != 1:
+                columns |= _concrete_fields(model)
+                continue
+            name = field.source_attrs[0]
+            try:
+                model_field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                columns |= _concrete_fields(model)
+                continue
+
+            if not model_field.is_relation:
+                columns.add(name)
+            elif model_field.many_to_many or model_field.one_to_many:
+                self.prefetch.append(self._prefetch(field, model_field, prefix + name))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                # Значение берётся из столбца внешнего ключа без загрузки связанного объекта.
+                if model_field.concrete:
+                    columns.add(name)
+                else:
+                    self._select(model_field, prefix + name, None)
+            else:
+                if model_field.concrete:
+                    columns.add(name)
+                nested = field if isinstance(field, serializers.BaseSerializer) else None
+                self._select(model_field, prefix + name, nested)
+        self.only |= {prefix + column for column in columns}
+
+    def _select(self, model_field, path, nested):
+        self.select.append(path)
+        if nested is None:
+            # Связанное поле (например, SlugRelatedField) читает произвольные атрибуты объекта.
+            self.only |= {path + LOOKUP_SEP + column for column in _concrete_fields(model_field.related_model)}
+        else:
+            self.walk(nested, model_field.related_model, path + LOOKUP_SEP)
+
+    def _prefetch(self, field, model_field, path):
+        related_model = model_field.related_model
+        plan = QueryPlan()
+        if isinstance(field, serializers.ListSerializer):
+            plan.walk(field.child, related_model)
+        elif isinstance(field, serializers.ManyRelatedField) and isinstance(
+            field.child_relation, serializers.PrimaryKeyRelatedField
+        ):
+            plan.only.add(related_model._meta.pk.name)
+        else:
+            plan.only |= _concrete_fields(related_model)
+        if model_field.one_to_many:
+            # Для раскладки по объектам нужен внешний ключ на родителя.
+            plan.only.add(model_field.field.name)
+        return Prefetch(path, queryset=plan.apply(related_model._default_manager.all()))
+
+
+def plan_queryset(queryset, serializer):
+    """
+    Дополняет queryset связями и столбцами, которые выводит сериализатор.
+
+    Аргументы:
+        queryset (QuerySet): исходный queryset.
+        serializer (Serializer): сериализатор одного объекта (или ListSerializer).
+
+    Возвращает:
+        QuerySet: queryset с select_related(), prefetch_related() и only();
+        если сериализатор не ModelSerializer той же модели — queryset без изменений.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    meta = getattr(serializer, "Meta", None)
+    if not isinstance(serializer, serializers.ModelSerializer) or getattr(meta, "model", None) is not queryset.model:
+        return queryset
+    plan = QueryPlan()
+    plan.walk(serializer, queryset.model)
+    return plan.apply(queryset)
+
+
+class QueryPlanMixin:
+    """
+    Миксин viewset'а: применяет plan_queryset() с сериализатором текущего действия.
+
+    План применяется в filter_queryset(), поэтому действует и для списка, и для
+    get_object(), а get_queryset() в viewset'ах остаётся фильтрацией по ролям.
+    """
+
+    def filter_queryset(self, queryset):
+        return plan_queryset(super().filter_queryset(queryset), self.get_serializer())
@@ -1,11 +1,70 @@
+from django.conf import settings
 from rest_framework import serializers
 from accounts.models import User
 from academics.models import Subject, ClassRoom, Lesson, Enrollment
 from journal.models import GradeRecord, AttendanceRecord
 
 
+def parse_field_paths(value):
+    """
+    Разбирает список путей через запятую («id,lesson.date») в дерево.
+
+    Возвращает:
+        dict: {'id': {}, 'lesson': {'date': {}}}.
+    """
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for part in filter(None, (part.strip() for part in path.split('.'))):
+            node = node.setdefault(part, {})
+    return tree
+
+
+class DynamicFieldsMixin:
+    """
+    Выбор полей (?fields=) и раскрытие вложенных объектов (?expand=) для ModelSerializer.
+
+    Связи из expandable_fields по умолчанию выводятся (и принимаются при записи)
+    идентификаторами; связь, указанная в expand, выводится вложенным
+    сериализатором только для чтения. Пути вложенных объектов пишутся через
+    точку: ?fields=id,value,lesson.date&expand=lesson.subject. Путь внутрь
+    связи в fields раскрывает её так же, как expand. Неизвестные имена
+    пропускаются.
 
-class UserSerializer(serializers.ModelSerializer):
+    Корневой сериализатор берёт параметры из запроса в context, вложенные
+    получают свою часть деревьев через аргументы fields и expand.
+    """
+    # {имя поля: класс сериализатора связанного объекта}
+    expandable_fields = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._field_tree = fields
+        self._expand_tree = expand
+
+    def _field_options(self):
+        if self._expand_tree is not None:
+            return self._field_tree, self._expand_tree
+        request = self.context.get('request')
+        params = getattr(request, 'query_params', {})
+        fields = parse_field_paths(params['fields']) if params.get('fields') else None
+        return fields, parse_field_paths(params.get('expand'))
+
+    def get_fields(self):
+        fields = super().get_fields()
+        only, expand = self._field_options()
+        for name, serializer_class in self.expandable_fields.items():
+            if name not in fields:
+                continue
+            nested_only = only.get(name) if only is not None else None
+            if name in expand or nested_only:
+                fields[name] = serializer_class(read_only=True, fields=nested_only or None, expand=expand.get(name, {}))
+        if only is not None:
+            fields = {name: field for name, field in fields.items() if name in only}
+        return fields
+
+
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор пользователя.
     Используется для отображения основной информации о пользователях системы.
@@ -16,78 +75,127 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'email', 'first_name', 'last_name', 'role']
 
 
-class SubjectSerializer(serializers.ModelSerializer):
+class SubjectSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор предмета.
-    Включает информацию о преподавателе (teacher) через вложенный UserSerializer.
+    Преподаватель (teacher) выводится идентификатором, с ?expand=teacher — через UserSerializer.
     """
-    teacher = UserSerializer(read_only=True)
+    expandable_fields = {'teacher': UserSerializer}
 
     class Meta:
         model = Subject
         fields = ['id', 'name', 'code', 'teacher']
 
 
-class ClassRoomSerializer(serializers.ModelSerializer):
+class ClassRoomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор школьного класса.
     Отображает базовую информацию и куратора (curator).
     """
-    curator = UserSerializer(read_only=True)
+    expandable_fields = {'curator': UserSerializer}
 
     class Meta:
         model = ClassRoom
         fields = ['id', 'grade_level', 'name', 'curator']
 
 
-class EnrollmentSerializer(serializers.ModelSerializer):
+class EnrollmentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор зачисления ученика в класс.
     Используется для отображения связей между учеником и классом.
     """
-    student = UserSerializer(read_only=True)
-    classroom = ClassRoomSerializer(read_only=True)
+    expandable_fields = {'student': UserSerializer, 'classroom': ClassRoomSerializer}
 
     class Meta:
         model = Enrollment
         fields = ['id', 'student', 'classroom', 'date_enrolled']
 
 
-class LessonSerializer(serializers.ModelSerializer):
+class LessonSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор урока.
-    Включает вложенные данные о предмете, классе и учителе.
+    Предмет, класс и учитель выводятся идентификаторами и раскрываются через ?expand=.
     """
-    subject = SubjectSerializer(read_only=True)
-    classroom = ClassRoomSerializer(read_only=True)
-    teacher = UserSerializer(read_only=True)
+    expandable_fields = {'subject': SubjectSerializer, 'classroom': ClassRoomSerializer, 'teacher': UserSerializer}
 
     class Meta:
         model = Lesson
         fields = ['id', 'subject', 'classroom', 'teacher', 'date', 'topic']
 
 
-class GradeRecordSerializer(serializers.ModelSerializer):
+class GradeRecordSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор оценок учеников.
     Используется для отображения и создания записей об успеваемости.
     """
-    student = UserSerializer(read_only=True)
-    lesson = LessonSerializer(read_only=True)
+    expandable_fields = {'lesson': LessonSerializer, 'student': UserSerializer}
 
     class Meta:
         model = GradeRecord
         fields = ['id', 'lesson', 'student', 'value', 'max_value', 'note', 'date']
 
 
-class AttendanceRecordSerializer(serializers.ModelSerializer):
+class AttendanceRecordSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     """
     Сериализатор посещаемости учеников.
     Показывает статус посещения для конкретного урока.
     """
-    student = UserSerializer(read_only=True)
-    lesson = LessonSerializer(read_only=True)
+    expandable_fields = {'lesson': LessonSerializer, 'student': UserSerializer}
 
     class Meta:
         model = AttendanceRecord
         fields = ['id', 'lesson', 'student', 'status', 'comment']
+
+
+class GradeBulkItemSerializer(serializers.Serializer):
+    """
+    Элемент массового сохранения оценок (POST /api/grades/bulk/).
+    Урок и ученик передаются идентификаторами; их проверка — в check_lesson_marks().
+    """
+    lesson_id = serializers.IntegerField()
+    student_id = serializers.IntegerField()
+    value = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0)
+    max_value = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, default=100)
+    note = serializers.CharField(max_length=255, allow_blank=True, default='')
+
+
+class AttendanceBulkItemSerializer(serializers.Serializer):
+    """
+    Элемент массового сохранения посещаемости (POST /api/attendance/bulk/).
+    Урок и ученик передаются идентификаторами; их проверка — в check_lesson_marks().
+    """
+    lesson_id = serializers.IntegerField()
+    student_id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=AttendanceRecord.Status.choices)
+    comment = serializers.CharField(max_length=255, allow_blank=True, default='')
+
+
+class BatchItemSerializer(serializers.Serializer):
+    """
+    Вложенный запрос пакета (POST /api/batch/): GET-адрес API и заголовки.
+    Из заголовков учитываются только Accept и If-None-Match.
+    """
+    path = serializers.RegexField(r'^/api/', max_length=2000)
+    headers = serializers.DictField(child=serializers.CharField(max_length=1000), required=False, default=dict)
+
+
+class BatchSerializer(serializers.Serializer):
+    """Пакет запросов: список вложенных запросов и признак параллельного выполнения."""
+    requests = BatchItemSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, items):
+        if len(items) > settings.API_BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f'Не больше {settings.API_BATCH_MAX_REQUESTS} запросов в пакете.')
+        return items
+
+
+class EventStreamSerializer(serializers.Serializer):
+    """Параметры потока событий журнала (GET /api/events/): класс или ученик."""
+    classroom = serializers.IntegerField(required=False, min_value=1)
+    student = serializers.IntegerField(required=False, min_value=1)
+
+    def validate(self, attrs):
+        if 'classroom' in attrs and 'student' in attrs:
+            raise serializers.ValidationError('Укажите класс или ученика, но не оба сразу.')
+        return attrs
@@ -0,0 +1,58 @@
+"""
+Публикация событий журнала для потока /api/events/ (см. api.events) и отзыв
+JWT пользователя при смене роли или отключении (см. api.authentication).
+"""
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from journal.bulk import attendance_bulk_saved, grades_bulk_saved
+from journal.models import AttendanceRecord, GradeRecord
+from .authentication import revoke_tokens
+from .events import journal_messages, publish
+
+KINDS = {GradeRecord: "grades", AttendanceRecord: "attendance"}
+
+# Поля пользователя, на которых основаны утверждения JWT.
+TOKEN_FIELDS = {"role", "is_active"}
+
+
+@receiver(post_save, sender=GradeRecord)
+@receiver(post_delete, sender=GradeRecord)
+@receiver(post_save, sender=AttendanceRecord)
+@receiver(post_delete, sender=AttendanceRecord)
+def publish_journal_event(sender, instance, raw=False, **kwargs):
+    """Сообщает подписчикам ученика и класса об изменении оценки или отметки."""
+    if not raw:
+        publish(journal_messages(KINDS[sender], instance.lesson, [instance.student_id]))
+
+
+@receiver(grades_bulk_saved, sender=GradeRecord)
+@receiver(attendance_bulk_saved, sender=AttendanceRecord)
+def publish_bulk_journal_event(sender, lesson, student_ids, **kwargs):
+    """Сообщает о массовом сохранении оценок или переклички урока одним сообщением."""
+    publish(journal_messages(KINDS[sender], lesson, student_ids))
+
+
+@receiver(pre_save, sender=User)
+def remember_token_claims(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Запоминает прежние роль и активность пользователя, чтобы после сохранения сравнить их."""
+    if raw or instance.pk is None or (update_fields is not None and not TOKEN_FIELDS & set(update_fields)):
+        return
+    previous = User.objects.filter(pk=instance.pk).values_list("role", "is_active").first()
+    if previous is not None:
+        instance._token_claims_previous = previous
+
+
+@receiver(post_save, sender=User)
+def revoke_tokens_on_claims_change(sender, instance, raw=False, **kwargs):
+    """
+    Отзывает JWT пользователя, если изменились его роль или активность —
+    через любой путь сохранения: кабинет директора, админку, shell.
+    """
+    previous = getattr(instance, "_token_claims_previous", None)
+    if raw or previous is None:
+        return
+    del instance._token_claims_previous
+    if previous != (instance.role, instance.is_active):
+        revoke_tokens(instance)
@@ -1,3 +1,891 @@
-from django.test import TestCase
+import asyncio
+import base64
+import datetime
+import json
+import threading
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from academics.models import ClassRoom, Enrollment, Lesson, Subject
+from journal.bulk import upsert_grades
+from journal.models import AttendanceRecord, GradeRecord
+from .authentication import ClaimsRefreshToken
+from .events import AUTH_WORKERS, RESET, EventStreamApplication, Subscription, hub
+from .pagination import encode_cursor
+
+
+class QueryPlanTests(TestCase):
+    """Число запросов списков API не зависит от количества записей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.director = User.objects.create_user(
+            username='director', email='director@example.com', password='pw', role='ADMIN',
+        )
+        cls.next_number = 0
+
+    def add_lessons(self, count):
+        """Создаёт count уроков в новом классе по новому предмету с оценкой и отметкой ученика."""
+        teacher = User.objects.create_user(
+            username=f'teacher{self.next_number}', email=f'teacher{self.next_number}@example.com',
+            password='pw', role='TEACHER',
+        )
+        subject = Subject.objects.create(name=f'Предмет {self.next_number}', teacher=teacher)
+        classroom = ClassRoom.objects.create(grade_level=5, name=f'К{self.next_number}', curator=teacher)
+        self.next_number += 1
+        for day in range(count):
+            student = User.objects.create_user(
+                username=f'student{self.next_number}_{day}', email=f'student{self.next_number}_{day}@example.com',
+                password='pw', role='STUDENT',
+            )
+            Enrollment.objects.create(student=student, classroom=classroom)
+            lesson = Lesson.objects.create(
+                subject=subject, classroom=classroom, teacher=teacher,
+                date=datetime.date(2025, 9, 1) + datetime.timedelta(days=day),
+            )
+            GradeRecord.objects.create(lesson=lesson, student=student, value=80)
+            AttendanceRecord.objects.create(lesson=lesson, student=student, status=AttendanceRecord.Status.PRESENT)
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'page_size': 500, **(params or {})})
+        self.assertEqual(response.status_code, 200)
+        return len(queries), len(response.json()['results'])
+
+    def test_list_query_count_is_constant(self):
+        self.client.force_login(self.director)
+        expand = {'expand': 'lesson.subject.teacher,lesson.classroom.curator,lesson.teacher,student'}
+        for url, params in (
+            ('/api/grades/', None),
+            ('/api/grades/', expand),
+            ('/api/attendance/', expand),
+            ('/api/lessons/', {'expand': 'subject.teacher,classroom.curator,teacher'}),
+            ('/api/classes/', {'expand': 'curator'}),
+            ('/api/subjects/', {'expand': 'teacher'}),
+        ):
+            with self.subTest(url=url, params=params):
+                self.add_lessons(2)
+                small, small_size = self.count_queries(url, params)
+                self.add_lessons(20)
+                large, large_size = self.count_queries(url, params)
+                self.assertGreater(large_size, small_size)
+                self.assertEqual(small, large)
+
+    def test_detail_uses_single_query(self):
+        self.add_lessons(1)
+        grade = GradeRecord.objects.get()
+        self.client.force_login(self.director)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/grades/{grade.pk}/', {'expand': 'lesson.subject.teacher'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['lesson']['subject']['teacher']['id'], grade.lesson.subject.teacher_id)
+        grade_queries = [query for query in queries.captured_queries if 'journal_graderecord' in query['sql']]
+        self.assertEqual(len(grade_queries), 1)
+
+
+class DynamicFieldsTests(TestCase):
+    """Параметры ?fields= и ?expand= и следующий за ними план запроса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.director = User.objects.create_user(
+            username='director', email='director@example.com', password='pw', role='ADMIN',
+        )
+        teacher = User.objects.create_user(username='teacher', email='teacher@example.com', password='pw', role='TEACHER')
+        student = User.objects.create_user(username='student', email='student@example.com', password='pw', role='STUDENT')
+        subject = Subject.objects.create(name='Математика', teacher=teacher)
+        classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=teacher)
+        cls.lesson = Lesson.objects.create(subject=subject, classroom=classroom, teacher=teacher,
+                                           date=datetime.date(2025, 9, 1))
+        cls.grade = GradeRecord.objects.create(lesson=cls.lesson, student=student, value=80, note='хорошо')
+
+    def setUp(self):
+        self.client.force_login(self.director)
+
+    def get_grades(self, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/grades/', params)
+        self.assertEqual(response.status_code, 200)
+        grade_sql = [query['sql'] for query in queries.captured_queries if 'journal_graderecord' in query['sql']]
+        return response.json()['results'], grade_sql[0]
+
+    def test_relations_are_ids_by_default(self):
+        data, sql = self.get_grades()
+        self.assertEqual(data[0]['lesson'], self.lesson.pk)
+        self.assertEqual(data[0]['student'], self.grade.student_id)
+        self.assertNotIn('academics_lesson', sql)
+
+    def test_fields_trim_output_and_columns(self):
+        data, sql = self.get_grades({'fields': 'id,value,unknown'})
+        self.assertEqual(set(data[0]), {'id', 'value'})
+        self.assertNotIn('"note"', sql)
+
+    def test_expand_inlines_nested_objects(self):
+        data, sql = self.get_grades({'expand': 'lesson.subject', 'fields': 'id,lesson.date,lesson.subject'})
+        self.assertEqual(set(data[0]), {'id', 'lesson'})
+        self.assertEqual(set(data[0]['lesson']), {'date', 'subject'})
+        self.assertEqual(data[0]['lesson']['subject']['teacher'], self.lesson.teacher_id)
+        self.assertIn('academics_subject', sql)
+        self.assertNotIn('"topic"', sql)
+
+    def test_nested_field_path_expands_relation(self):
+        data, _ = self.get_grades({'fields': 'lesson.topic'})
+        self.assertEqual(data[0], {'lesson': {'topic': ''}})
+
+
+class KeysetPaginationTests(TestCase):
+    """Постраничная выдача по курсору."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.director = User.objects.create_user(
+            username='director', email='director@example.com', password='pw', role='ADMIN',
+        )
+        teacher = User.objects.create_user(username='teacher', email='teacher@example.com', password='pw', role='TEACHER')
+        subject = Subject.objects.create(name='Математика', teacher=teacher)
+        classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=teacher)
+        students = [
+            User.objects.create_user(username=f's{number}', email=f's{number}@example.com', password='pw', role='STUDENT')
+            for number in range(4)
+        ]
+        for day in range(3):
+            lesson = Lesson.objects.create(subject=subject, classroom=classroom, teacher=teacher,
+                                           date=datetime.date(2025, 9, 1) + datetime.timedelta(days=day))
+            for student in students:
+                GradeRecord.objects.create(lesson=lesson, student=student, value=day)
+                AttendanceRecord.objects.create(lesson=lesson, student=student, status=AttendanceRecord.Status.PRESENT)
+
+    def setUp(self):
+        self.client.force_login(self.director)
+
+    def walk(self, url):
+        """Проходит все страницы вперёд, затем назад; возвращает id в обоих порядках."""
+        forward, backward = [], []
+        page = self.client.get(url, {'page_size': 5}).json()
+        self.assertIsNone(page['previous'])
+        while True:
+            forward += [item['id'] for item in page['results']]
+            if page['next'] is None:
+                break
+            page = self.client.get(page['next']).json()
+        while True:
+            backward = [item['id'] for item in page['results']] + backward
+            if page['previous'] is None:
+                break
+            page = self.client.get(page['previous']).json()
+        return forward, backward
+
+    def test_grades_pages_follow_date_and_id(self):
+        forward, backward = self.walk('/api/grades/')
+        expected = list(GradeRecord.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, expected)
+
+    def test_attendance_pages_follow_lesson_date_and_id(self):
+        forward, backward = self.walk('/api/attendance/')
+        expected = list(AttendanceRecord.objects.order_by('-lesson__date', '-id').values_list('id', flat=True))
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, expected)
+
+    def test_deep_page_uses_keyset_without_offset(self):
+        last = GradeRecord.objects.order_by('date', 'id').first()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/grades/', {'cursor': encode_cursor([last.date, last.id + 1])})
+        self.assertEqual([item['id'] for item in response.json()['results']], [last.id])
+        grade_sql = [query['sql'] for query in queries.captured_queries if 'journal_graderecord' in query['sql']]
+        self.assertEqual(len(grade_sql), 1)
+        self.assertNotIn('OFFSET', grade_sql[0])
+
+    def test_page_size_is_capped_and_bad_cursor_rejected(self):
+        with self.settings(API_MAX_PAGE_SIZE=2):
+            response = self.client.get('/api/grades/', {'page_size': 100})
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertEqual(self.client.get('/api/grades/', {'cursor': 'zzz'}).status_code, 404)
+        for values in ([[1], 1], [{'a': 1}, 1], [None, 1], ['2025-09-01', True], ['abc', 1], ['2025-09-01', 'x']):
+            with self.subTest(values=values):
+                for url in ('/api/grades/', '/api/attendance/'):
+                    response = self.client.get(url, {'cursor': encode_cursor(values)})
+                    self.assertEqual(response.status_code, 404)
+
+
+class SingleRecordWriteTests(TestCase):
+    """Одиночные POST/PATCH оценок и посещаемости проверяются так же, как пачки, и доступны только учителям."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='teacher', email='teacher@example.com', password='pw',
+                                               role='TEACHER')
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw', role='TEACHER')
+        subject = Subject.objects.create(name='Математика', teacher=cls.teacher)
+        classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=cls.teacher)
+        cls.student = User.objects.create_user(username='s', email='s@example.com', password='pw', role='STUDENT')
+        cls.outsider = User.objects.create_user(username='o', email='o@example.com', password='pw', role='STUDENT')
+        Enrollment.objects.create(student=cls.student, classroom=classroom)
+        cls.lesson = Lesson.objects.create(subject=subject, classroom=classroom, teacher=cls.teacher,
+                                           date=datetime.date(2025, 9, 1))
+        cls.foreign_lesson = Lesson.objects.create(subject=subject, classroom=classroom, teacher=other,
+                                                   date=datetime.date(2025, 9, 2))
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_create_and_update(self):
+        response = self.client.post('/api/grades/', {'lesson': self.lesson.pk, 'student': self.student.pk,
+                                                     'value': 85}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        grade = GradeRecord.objects.get(pk=response.json()['id'])
+        self.assertEqual((grade.lesson, grade.student, grade.value), (self.lesson, self.student, 85))
+        response = self.client.patch(f'/api/grades/{grade.pk}/', {'value': 90}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        grade.refresh_from_db()
+        self.assertEqual(grade.value, 90)
+
+        response = self.client.post('/api/attendance/', {'lesson': self.lesson.pk, 'student': self.student.pk,
+                                                         'status': 'A'}, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+
+    def test_rejects_foreign_lesson_and_unenrolled_student(self):
+        for payload, field in (
+            ({'lesson': self.foreign_lesson.pk, 'student': self.student.pk}, 'lesson'),
+            ({'lesson': self.lesson.pk, 'student': self.outsider.pk}, 'student'),
+        ):
+            with self.subTest(field=field):
+                response = self.client.post('/api/grades/', {**payload, 'value': 50}, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(field, response.json())
+        grade = GradeRecord.objects.create(lesson=self.lesson, student=self.student, value=70)
+        response = self.client.patch(f'/api/grades/{grade.pk}/', {'lesson': self.foreign_lesson.pk},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(GradeRecord.objects.exclude(lesson=self.lesson).exists())
+
+    def test_only_teachers_write(self):
+        director = User.objects.create_user(username='d', email='d@example.com', password='pw', role='ADMIN')
+        grade = GradeRecord.objects.create(lesson=self.lesson, student=self.student, value=70)
+        mark = AttendanceRecord.objects.create(lesson=self.lesson, student=self.student, status='P')
+        for user in (self.student, director):
+            self.client.force_login(user)
+            for url, payload in ((f'/api/grades/{grade.pk}/', {'value': 100}),
+                                 (f'/api/attendance/{mark.pk}/', {'status': 'A'})):
+                with self.subTest(user=user.username, url=url):
+                    self.assertEqual(self.client.patch(url, payload, content_type='application/json').status_code,
+                                     403)
+                    self.assertEqual(self.client.delete(url).status_code, 403)
+            response = self.client.post('/api/grades/', {'lesson': self.lesson.pk, 'student': self.student.pk,
+                                                         'value': 100}, content_type='application/json')
+            self.assertEqual(response.status_code, 403)
+        grade.refresh_from_db()
+        mark.refresh_from_db()
+        self.assertEqual((grade.value, mark.status), (70, 'P'))
+
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.delete(f'/api/grades/{grade.pk}/').status_code, 204)
+
+
+class ConditionalGetTests(TestCase):
+    """ETag и 304 для опросов API без изменений."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.director = User.objects.create_user(
+            username='director', email='director@example.com', password='pw', role='ADMIN',
+        )
+        cls.teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='pw', role='TEACHER',
+        )
+        cls.student = User.objects.create_user(
+            username='student', email='student@example.com', password='pw', role='STUDENT',
+        )
+        subject = Subject.objects.create(name='Математика', teacher=cls.teacher)
+        cls.classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=cls.teacher)
+        Enrollment.objects.create(student=cls.student, classroom=cls.classroom)
+        cls.lesson = Lesson.objects.create(subject=subject, classroom=cls.classroom, teacher=cls.teacher,
+                                           date=datetime.date(2025, 9, 1))
+        cls.grade = GradeRecord.objects.create(lesson=cls.lesson, student=cls.student, value=80)
+
+    def poll(self, url, etag):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        return response, queries
+
+    def test_unchanged_poll_gets_304_without_querying_records(self):
+        for user in (self.student, self.teacher):
+            with self.subTest(role=user.role):
+                self.client.force_login(user)
+                etag = self.client.get('/api/grades/')['ETag']
+                response, queries = self.poll('/api/grades/', etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                self.assertFalse(any('journal_graderecord' in query['sql'] for query in queries.captured_queries))
+
+    def test_journal_write_changes_etag(self):
+        for user in (self.student, self.teacher):
+            with self.subTest(role=user.role):
+                self.client.force_login(user)
+                etag = self.client.get('/api/grades/')['ETag']
+                self.grade.value += 1
+                self.grade.save()
+                response, _ = self.poll('/api/grades/', etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_depends_on_query_and_user(self):
+        self.client.force_login(self.student)
+        etag = self.client.get('/api/grades/')['ETag']
+        self.assertEqual(self.poll('/api/grades/?fields=id', etag)[0].status_code, 200)
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw', role='STUDENT')
+        self.client.force_login(other)
+        self.assertEqual(self.poll('/api/grades/', etag)[0].status_code, 200)
+
+    def test_director_journal_lists_are_not_conditional(self):
+        self.client.force_login(self.director)
+        self.assertNotIn('ETag', self.client.get('/api/grades/'))
+        etag = self.client.get('/api/lessons/')['ETag']
+        self.assertEqual(self.poll('/api/lessons/', etag)[0].status_code, 304)
+        self.lesson.topic = 'Дроби'
+        self.lesson.save()
+        self.assertEqual(self.poll('/api/lessons/', etag)[0].status_code, 200)
+
+
+class ColumnarFormatTests(TestCase):
+    """Колоночный формат списков (?format=columnar) совпадает с обычным JSON."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.director = User.objects.create_user(
+            username='director', email='director@example.com', password='pw', role='ADMIN',
+        )
+        teacher = User.objects.create_user(username='teacher', email='teacher@example.com', password='pw', role='TEACHER')
+        classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=teacher)
+        subjects = [Subject.objects.create(name=name, teacher=teacher) for name in ('Математика', 'Физика')]
+        students = [
+            User.objects.create_user(username=f's{number}', email=f's{number}@example.com', password='pw', role='STUDENT')
+            for number in range(3)
+        ]
+        for day in range(4):
+            lesson = Lesson.objects.create(subject=subjects[day % 2], classroom=classroom, teacher=teacher,
+                                           date=datetime.date(2025, 9, 1) + datetime.timedelta(days=day))
+            for student in students:
+                GradeRecord.objects.create(lesson=lesson, student=student, value=70 + day)
+
+    def setUp(self):
+        self.client.force_login(self.director)
+
+    def pages(self, params):
+        """Возвращает все страницы списка оценок с параметрами params."""
+        pages = [self.client.get('/api/grades/', {'page_size': 5, **params}).json()]
+        while pages[-1]['next'] is not None:
+            pages.append(self.client.get(pages[-1]['next']).json())
+        return pages
+
+    def test_columns_match_json_on_every_page(self):
+        params = {'expand': 'lesson.subject', 'fields': 'id,value,student,lesson.date,lesson.subject.name'}
+        plain = [item for page in self.pages(params) for item in page['results']]
+        columnar = self.pages({**params, 'format': 'columnar'})
+        self.assertGreater(len(columnar), 1)
+
+        rows = []
+        for page in columnar:
+            columns, objects = page['columns'], page['objects']
+            self.assertEqual(set(columns), {'id', 'value', 'student', 'lesson'})
+            lessons = {lesson_id: position for position, lesson_id in enumerate(objects['lesson']['id'])}
+            subjects = dict(zip(objects['lesson.subject']['id'], objects['lesson.subject']['name']))
+            self.assertEqual(len(lessons), len(set(columns['lesson'])))
+            for position, grade_id in enumerate(columns['id']):
+                lesson = lessons[columns['lesson'][position]]
+                rows.append({
+                    'id': grade_id,
+                    'value': columns['value'][position],
+                    'student': columns['student'][position],
+                    'lesson': {
+                        'date': objects['lesson']['date'][lesson],
+                        'subject': {'name': subjects[objects['lesson']['subject'][lesson]]},
+                    },
+                })
+        self.assertEqual(rows, plain)
+
+
+class GradebookTests(TestCase):
+    """Журнал класса /api/classes/{id}/gradebook/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='teacher', email='teacher@example.com', password='pw', role='TEACHER')
+        cls.classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=cls.teacher)
+        cls.math = Subject.objects.create(name='Математика', teacher=cls.teacher)
+        physics = Subject.objects.create(name='Физика', teacher=cls.teacher)
+        cls.students = []
+        for number, last_name in enumerate(('Борисов', 'Алексеев')):
+            student = User.objects.create_user(username=f's{number}', email=f's{number}@example.com', password='pw',
+                                               role='STUDENT', last_name=last_name, first_name='Иван')
+            Enrollment.objects.create(student=student, classroom=cls.classroom)
+            cls.students.append(student)
+        cls.lessons = [
+            Lesson.objects.create(subject=subject, classroom=cls.classroom, teacher=cls.teacher,
+                                  date=datetime.date(2025, 9, day))
+            for day, subject in ((2, cls.math), (1, cls.math), (3, physics), (20, cls.math))
+        ]
+        GradeRecord.objects.create(lesson=cls.lessons[0], student=cls.students[0], value=80)
+        GradeRecord.objects.create(lesson=cls.lessons[1], student=cls.students[1], value=4, max_value=5)
+        GradeRecord.objects.create(lesson=cls.lessons[2], student=cls.students[1], value=90)
+        AttendanceRecord.objects.create(lesson=cls.lessons[0], student=cls.students[1],
+                                        status=AttendanceRecord.Status.ABSENT)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.teacher)
+        self.url = f'/api/classes/{self.classroom.pk}/gradebook/'
+        self.params = {'subject': self.math.pk, 'start_date': '2025-09-01', 'end_date': '2025-09-10'}
+
+    def test_students_by_lessons_matrix(self):
+        data = self.client.get(self.url, self.params).json()
+        self.assertEqual(data['lessons']['id'], [self.lessons[1].pk, self.lessons[0].pk])
+        self.assertEqual(data['students']['id'], [self.students[1].pk, self.students[0].pk])
+        self.assertEqual(data['values'], [[4.0, None], [None, 80.0]])
+        self.assertEqual(data['max_values'], [[5.0, None], [None, 100.0]])
+        self.assertEqual(data['attendance'], ['-A', '--'])
+
+    def journal_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(self.url, self.params).status_code, 200)
+        return [query['sql'] for query in queries.captured_queries
+                if 'academics_lesson' in query['sql'] or 'journal_graderecord' in query['sql']]
+
+    def test_built_in_two_queries_then_cached(self):
+        self.assertEqual(len(self.journal_queries()), 2)
+        self.assertEqual(self.journal_queries(), [])
+
+        GradeRecord.objects.create(lesson=self.lessons[1], student=self.students[0], value=3, max_value=5)
+        self.assertEqual(self.client.get(self.url, self.params).json()['values'][1], [3.0, 80.0])
+
+    def test_only_curator_and_director(self):
+        self.client.force_login(self.students[0])
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.client.force_login(self.teacher)
+        self.assertEqual(self.client.get(self.url, {'subject': 0}).status_code, 400)
+
+
+class ClaimsJWTTests(TestCase):
+    """JWT с ролью и версией: пользователь не читается из базы, смена роли отзывает токены."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.director = User.objects.create_user(
+            username='director', email='director@example.com', password='pw', role='ADMIN',
+        )
+        cls.teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='pw', role='TEACHER',
+        )
+
+    def setUp(self):
+        cache.clear()
+        response = self.client.post('/api/token/', {'email': 'teacher@example.com', 'password': 'pw'})
+        self.tokens = response.json()
+        self.auth = {'HTTP_AUTHORIZATION': f"Bearer {self.tokens['access']}"}
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/lessons/', **self.auth)
+        return response, [query['sql'] for query in queries.captured_queries if 'accounts_user' in query['sql']]
+
+    def test_identity_comes_from_claims(self):
+        self.client.get('/api/lessons/', **self.auth)
+        response, user_sql = self.user_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(user_sql, [])
+
+    def test_role_change_revokes_tokens(self):
+        self.client.force_login(self.director)
+        self.client.post(f'/director/users/{self.teacher.pk}/role/', {'role': 'STUDENT'})
+        self.client.logout()
+        response = self.client.get('/api/lessons/', **self.auth)
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['detail'], 'Токен отозван, войдите заново.')
+        response = self.client.post('/api/token/refresh/', {'refresh': self.tokens['refresh']})
+        self.assertEqual(response.status_code, 401)
+
+    def test_any_save_path_revokes_tokens(self):
+        self.client.get('/api/lessons/', **self.auth)
+        teacher = User.objects.get(pk=self.teacher.pk)
+        teacher.save(update_fields=['last_login'])
+        teacher.first_name = 'Иван'
+        teacher.save()
+        self.assertEqual(self.client.get('/api/lessons/', **self.auth).status_code, 200)
+
+        for change in ({'role': 'STUDENT'}, {'is_active': False}):
+            with self.subTest(change=change):
+                teacher = User.objects.get(pk=self.teacher.pk)
+                version = teacher.token_version
+                for field, value in change.items():
+                    setattr(teacher, field, value)
+                teacher.save()
+                self.assertEqual(teacher.token_version, version + 1)
+                self.assertEqual(self.client.get('/api/lessons/', **self.auth).status_code, 403)
+        # Повторное сохранение того же экземпляра не возвращает прежнюю версию.
+        teacher.save()
+        self.assertEqual(User.objects.get(pk=self.teacher.pk).token_version, version + 1)
+
+
+class CachedBasicAuthTests(TestCase):
+    """Basic-аутентификация проверяет пароль один раз и забывает его после смены пароля."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='pw', role='TEACHER',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, password='pw', **headers):
+        credentials = base64.b64encode(f'teacher@example.com:{password}'.encode()).decode()
+        return self.client.get('/api/subjects/', HTTP_AUTHORIZATION=f'Basic {credentials}', **headers)
+
+    def test_password_is_hashed_once(self):
+        with mock.patch.object(User, 'check_password', autospec=True, side_effect=User.check_password) as check:
+            self.assertEqual(self.get().status_code, 200)
+            self.assertEqual(self.get().status_code, 200)
+            self.assertEqual(self.get('wrong').status_code, 403)
+        self.assertEqual(check.call_count, 2)
+
+    def test_password_change_invalidates_cache(self):
+        self.assertEqual(self.get().status_code, 200)
+        self.teacher.set_password('new')
+        self.teacher.save()
+        self.assertEqual(self.get().status_code, 403)
+        self.assertEqual(self.get('new').status_code, 200)
+
+    def test_jwt_issued_on_first_success(self):
+        with self.settings(API_BASIC_AUTH_ISSUE='jwt'):
+            response = self.get()
+            self.assertEqual(self.get().headers.get('X-Access-Token'), None)
+        token = response['X-Access-Token']
+        self.assertEqual(self.client.get('/api/subjects/', HTTP_AUTHORIZATION=f'Bearer {token}').status_code, 200)
+
+
+class AsyncReadTests(TestCase):
+    """Асинхронное чтение /api/async/ отвечает так же, как обычные viewset'ы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(
+            username='teacher', email='teacher@example.com', password='pw', role='TEACHER',
+        )
+        other = User.objects.create_user(username='other', email='other@example.com', password='pw', role='TEACHER')
+        subject = Subject.objects.create(name='Математика', teacher=cls.teacher)
+        classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=cls.teacher)
+        student = User.objects.create_user(username='s', email='s@example.com', password='pw', role='STUDENT')
+        for day in range(3):
+            for teacher in (cls.teacher, other):
+                lesson = Lesson.objects.create(subject=subject, classroom=classroom, teacher=teacher,
+                                               date=datetime.date(2025, 9, 1) + datetime.timedelta(days=day))
+                GradeRecord.objects.create(lesson=lesson, student=student, value=day)
+        cls.other_grade = GradeRecord.objects.filter(lesson__teacher=other).first()
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_lists_match_sync_views(self):
+        for url, params in (
+            ('grades/', {'page_size': 2, 'expand': 'lesson.subject'}),
+            ('lessons/', {'fields': 'id,date'}),
+            ('subjects/', None),
+            ('classes/', {'format': 'columnar'}),
+        ):
+            with self.subTest(url=url):
+                sync = self.client.get(f'/api/{url}', params).json()
+                response = self.client.get(f'/api/async/{url}', params)
+                self.assertEqual(response.status_code, 200)
+                data = response.json()
+                for link in ('next', 'previous'):
+                    self.assertEqual(data.pop(link) is None, sync.pop(link) is None)
+                self.assertEqual(data, sync)
+
+    def test_cursor_links_stay_async(self):
+        page = self.client.get('/api/async/grades/', {'page_size': 2}).json()
+        self.assertIn('/api/async/grades/', page['next'])
+        ids = [item['id'] for item in page['results']]
+        while page['next']:
+            page = self.client.get(page['next']).json()
+            ids += [item['id'] for item in page['results']]
+        self.assertEqual(ids, list(GradeRecord.objects.filter(lesson__teacher=self.teacher)
+                                   .order_by('-date', '-id').values_list('id', flat=True)))
+
+    def test_detail_etag_and_permissions(self):
+        grade = GradeRecord.objects.filter(lesson__teacher=self.teacher).first()
+        response = self.client.get(f'/api/async/grades/{grade.pk}/')
+        self.assertEqual(response.json()['id'], grade.pk)
+        self.assertEqual(
+            self.client.get(f'/api/async/grades/{grade.pk}/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304,
+        )
+        self.assertEqual(self.client.get(f'/api/async/grades/{self.other_grade.pk}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/async/grades/abc/').status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get('/api/async/grades/').status_code, 403)
+
+
+class BatchTests(TestCase):
+    """Пакет GET-запросов /api/batch/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.student = User.objects.create_user(
+            username='student', email='student@example.com', password='pw', role='STUDENT',
+        )
+        teacher = User.objects.create_user(username='teacher', email='teacher@example.com', password='pw', role='TEACHER')
+        subject = Subject.objects.create(name='Математика', teacher=teacher)
+        classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=teacher)
+        Enrollment.objects.create(student=cls.student, classroom=classroom)
+        lesson = Lesson.objects.create(subject=subject, classroom=classroom, teacher=teacher,
+                                       date=datetime.date(2025, 9, 1))
+        GradeRecord.objects.create(lesson=lesson, student=cls.student, value=80)
+
+    def setUp(self):
+        self.client.force_login(self.student)
+
+    def batch(self, paths, **extra):
+        requests = [{'path': path} if isinstance(path, str) else path for path in paths]
+        return self.client.post('/api/batch/', {'requests': requests, **extra}, content_type='application/json')
+
+    def test_responses_match_separate_calls(self):
+        paths = ['/api/lessons/', '/api/grades/?fields=id,value', '/api/attendance/', '/api/classes/']
+        response = self.batch(paths)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['responses']
+        self.assertEqual([result['path'] for result in results], paths)
+        for path, result in zip(paths, results):
+            with self.subTest(path=path):
+                self.assertEqual(result['status'], 200)
+                self.assertEqual(result['body'], self.client.get(path).json())
+                self.assertGreaterEqual(result['time_ms'], 0)
+
+    def test_authenticates_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.batch(['/api/lessons/', '/api/grades/', '/api/attendance/'])
+        session_sql = [query for query in queries.captured_queries if 'django_session' in query['sql']]
+        self.assertEqual(len(session_sql), 1)
+
+    def test_errors_stay_per_request(self):
+        etag = self.client.get('/api/grades/')['ETag']
+        results = self.batch([
+            {'path': '/api/grades/', 'headers': {'If-None-Match': etag}},
+            '/api/missing/', '/api/batch/', '/api/lessons/?cursor=zzz', '/api/async/grades/',
+        ]).json()['responses']
+        self.assertEqual([result['status'] for result in results], [304, 404, 404, 404, 200])
+        self.assertEqual(results[0]['headers']['ETag'], etag)
+
+    def test_validation(self):
+        self.assertEqual(self.batch([]).status_code, 400)
+        self.assertEqual(self.batch(['/admin/']).status_code, 400)
+        with self.settings(API_BATCH_MAX_REQUESTS=1):
+            self.assertEqual(self.batch(['/api/lessons/', '/api/grades/']).status_code, 400)
+        self.client.logout()
+        self.assertEqual(self.batch(['/api/lessons/']).status_code, 403)
+
+
+class ParallelBatchTests(TransactionTestCase):
+    """Параллельный пакет: потоки с отдельными соединениями видят те же данные."""
+
+    def test_parallel_matches_sequential(self):
+        student = User.objects.create_user(username='s', email='s@example.com', password='pw', role='STUDENT')
+        self.client.force_login(student)
+        paths = ['/api/lessons/', '/api/grades/', '/api/attendance/', '/api/classes/']
+        bodies = {}
+        for parallel in (False, True):
+            response = self.client.post('/api/batch/', {'requests': [{'path': path} for path in paths],
+                                                        'parallel': parallel}, content_type='application/json')
+            bodies[parallel] = [(result['status'], result['body']) for result in response.json()['responses']]
+        self.assertEqual(bodies[True], bodies[False])
+
+
+class EventStream:
+    """Ответ EventStreamApplication, вызванного без сети, как ASGI-сервером."""
+
+    def __init__(self, application, scope):
+        self.messages = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        self.requested = False
+        self.task = asyncio.create_task(application(scope, self.receive, self.messages.put))
+
+    async def receive(self):
+        if not self.requested:
+            self.requested = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def start(self):
+        message = await asyncio.wait_for(self.messages.get(), 5)
+        self.status_code = message['status']
+        self.headers = {name.decode().lower(): value.decode() for name, value in message['headers']}
+        return self
+
+    async def chunk(self):
+        return (await asyncio.wait_for(self.messages.get(), 5))['body']
+
+    async def close(self):
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, 5)
+
+
+async def get_events(params=None, headers=None):
+    """Открывает /api/events/ в EventStreamApplication и возвращает EventStream после заголовков ответа."""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': '/api/events/', 'raw_path': b'/api/events/', 'root_path': '',
+        'query_string': urlencode(params or {}).encode(),
+        'headers': [(b'host', b'testserver')] + [
+            (name.lower().encode(), value.encode()) for name, value in (headers or {}).items()
+        ],
+        'server': ('testserver', 80), 'client': ('127.0.0.1', 0),
+    }
+    return await EventStream(EventStreamApplication(get_asgi_application()), scope).start()
+
+
+async def next_event(response):
+    """Читает из потока SSE следующее событие (пропуская служебные строки) и возвращает (тип, данные)."""
+    while True:
+        chunk = (await response.chunk()).decode()
+        if chunk.startswith('event: '):
+            kind, data = chunk.split('\n')[:2]
+            return kind[len('event: '):], json.loads(data[len('data: '):])
+
+
+class JournalEventsTests(TransactionTestCase):
+    """Поток событий журнала /api/events/ (пользователь проверяется в отдельном потоке, поэтому без общей транзакции)."""
+
+    def setUp(self):
+        self.teacher = User.objects.create_user(username='teacher', email='teacher@example.com', password='pw',
+                                                role='TEACHER')
+        self.director = User.objects.create_user(username='director', email='director@example.com', password='pw',
+                                                 role='ADMIN')
+        self.student, self.other = [
+            User.objects.create_user(username=name, email=f'{name}@example.com', password='pw', role='STUDENT')
+            for name in ('student', 'other')
+        ]
+        subject = Subject.objects.create(name='Математика', teacher=self.teacher)
+        self.classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=self.teacher)
+        self.foreign = ClassRoom.objects.create(grade_level=6, name='Б')
+        for student in (self.student, self.other):
+            Enrollment.objects.create(student=student, classroom=self.classroom)
+        self.lesson = Lesson.objects.create(subject=subject, classroom=self.classroom, teacher=self.teacher,
+                                            date=datetime.date(2025, 9, 1))
+
+    def bearer(self, user):
+        return {'Authorization': f'Bearer {ClaimsRefreshToken.for_user(user).access_token}'}
+
+    async def open_stream(self, user=None, headers=None, **params):
+        response = await get_events(params, headers or self.bearer(user))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['content-type'], 'text/event-stream')
+        # Первая строка потока отправляется после подписки.
+        self.assertEqual(await response.chunk(), b'retry: 3000\n\n')
+        return response
+
+    async def test_student_receives_only_own_events(self):
+        response = await self.open_stream(self.student)
+        await GradeRecord.objects.acreate(lesson=self.lesson, student=self.other, value=70)
+        await AttendanceRecord.objects.acreate(lesson=self.lesson, student=self.student,
+                                               status=AttendanceRecord.Status.ABSENT)
+        kind, data = await next_event(response)
+        self.assertEqual(kind, 'attendance')
+        self.assertEqual(data, {'kind': 'attendance', 'lesson': self.lesson.pk, 'classroom': self.classroom.pk,
+                                'subject': self.lesson.subject_id, 'date': '2025-09-01',
+                                'students': [self.student.pk]})
+        await response.close()
+        self.assertFalse(hub.channels)
+
+    async def test_classroom_stream_gets_bulk_save_once(self):
+        response = await self.open_stream(self.teacher, classroom=self.classroom.pk)
+        await sync_to_async(upsert_grades)([
+            GradeRecord(lesson=self.lesson, student_id=student.pk, value=90)
+            for student in (self.student, self.other)
+        ])
+        kind, data = await next_event(response)
+        self.assertEqual(kind, 'grades')
+        self.assertEqual(data['students'], sorted([self.student.pk, self.other.pk]))
+        await response.close()
+
+    async def test_access(self):
+        for user, params, code in (
+            (self.teacher, {}, 400),
+            (self.teacher, {'classroom': self.foreign.pk}, 403),
+            (self.director, {'classroom': 0}, 400),
+            (self.director, {'student': self.teacher.pk}, 404),
+        ):
+            with self.subTest(user=user.username, params=params):
+                response = await get_events(params, self.bearer(user))
+                self.assertEqual(response.status_code, code)
+                self.assertEqual(response.headers['content-type'], 'application/json')
+        self.assertEqual((await get_events()).status_code, 403)
+        await (await self.open_stream(self.director, student=self.student.pk)).close()
+
+    async def test_session_cookie(self):
+        await sync_to_async(self.client.force_login)(self.student)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={self.client.cookies[settings.SESSION_COOKIE_NAME].value}'
+        await (await self.open_stream(headers={'Cookie': cookie})).close()
+
+    async def test_idle_streams_hold_no_threads(self):
+        streams = [await self.open_stream(self.student)]
+        threads = threading.active_count()
+        for _ in range(20):
+            streams.append(await self.open_stream(self.student))
+        # Потоки могут появиться только в пуле проверки пользователя.
+        self.assertLessEqual(threading.active_count(), threads + AUTH_WORKERS)
+        for stream in streams:
+            await stream.close()
+
+    def test_requires_asgi(self):
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get('/api/events/').status_code, 503)
+
+    def test_publishes_after_commit_only(self):
+        with mock.patch('api.events.send') as send:
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                GradeRecord.objects.create(lesson=self.lesson, student=self.student, value=50)
+                raise RuntimeError
+            send.assert_not_called()
+            GradeRecord.objects.create(lesson=self.lesson, student=self.student, value=50)
+        send.assert_called_once()
+
+    def test_slow_subscriber_gets_reset(self):
+        with self.settings(API_EVENTS_QUEUE_SIZE=2):
+            subscription = Subscription('student:1')
+        for value in range(3):
+            subscription.push({'kind': 'grades', 'value': value})
+        self.assertEqual(subscription.queue.qsize(), 1)
+        self.assertIs(subscription.queue.get_nowait(), RESET)
+
+
+class PostgresEventsTests(TransactionTestCase):
+    """События доходят до подписчиков через NOTIFY/LISTEN PostgreSQL."""
+
+    async def test_notify_reaches_stream(self):
+        def setup():
+            teacher = User.objects.create_user(username='t', email='t@example.com', password='pw', role='TEACHER')
+            student = User.objects.create_user(username='s', email='s@example.com', password='pw', role='STUDENT')
+            classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=teacher)
+            lesson = Lesson.objects.create(subject=Subject.objects.create(name='Физика', teacher=teacher),
+                                           classroom=classroom, teacher=teacher, date=datetime.date(2025, 9, 1))
+            return student, lesson
+
+        student, lesson = await sync_to_async(setup)()
+        self.addCleanup(hub.close)
+        token = ClaimsRefreshToken.for_user(student).access_token
+        with self.settings(API_EVENTS_BACKPLANE='postgres'):
+            response = await get_events(headers={'Authorization': f'Bearer {token}'})
+            await response.chunk()
+            await GradeRecord.objects.acreate(lesson=lesson, student=student, value=60)
+            kind, data = await next_event(response)
+            await response.close()
+        self.assertEqual((kind, data['lesson'], data['students']), ('grades', lesson.pk, [student.pk]))
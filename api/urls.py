@@ -1,7 +1,10 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
+from .asyncviews import AsyncReadView
+from .events import JournalEventsView
 from .views import (
     SubjectViewSet, ClassRoomViewSet, LessonViewSet,
-    GradeRecordViewSet, AttendanceRecordViewSet
+    GradeRecordViewSet, AttendanceRecordViewSet, BatchView
 )
 
 router = DefaultRouter()
@@ -11,4 +14,15 @@ router.register(r'lessons', LessonViewSet, basename='lesson')
 router.register(r'grades', GradeRecordViewSet, basename='grade')
 router.register(r'attendance', AttendanceRecordViewSet, basename='attendance')
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('events/', JournalEventsView.as_view(), name='events'),
+]
+
+# Асинхронное чтение тех же ресурсов для ASGI: /api/async/<ресурс>/ и /api/async/<ресурс>/<pk>/.
+for prefix, viewset, basename in router.registry:
+    view = AsyncReadView.as_view(viewset_class=viewset)
+    urlpatterns += [
+        path(f'async/{prefix}/', view, name=f'async-{basename}-list'),
+        path(f'async/{prefix}/<pk>/', view, name=f'async-{basename}-detail'),
+    ]
@@ -1,16 +1,39 @@
-from rest_framework import viewsets, permissions
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from rest_framework.authentication import SessionAuthentication, BasicAuthentication
+from rest_framework.views import APIView
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.exceptions import ValidationError
 
 from accounts.models import User
 from academics.models import Subject, ClassRoom, Lesson, Enrollment
+from journal.bulk import check_lesson_marks, upsert_attendance, upsert_grades
 from journal.models import GradeRecord, AttendanceRecord
+from reports.attendance import class_attendance_days, class_attendance_totals, student_attendance_stats
+from reports.conditional import versioned_response
+from reports.forms import MatrixFilterForm, PeriodForm
+from reports.gradebook import cached_gradebook
+from reports.versioning import LESSONS_SCOPE, classroom_scope, student_scope, teacher_scope
+from .authentication import CachedBasicAuthentication, ClaimsJWTAuthentication
+from .batch import run_batch
+from .columnar import ColumnarListMixin
+from .conditional import ConditionalGetMixin
+from .queryplan import QueryPlanMixin
 from .serializers import (
     UserSerializer, SubjectSerializer, ClassRoomSerializer, LessonSerializer,
-    EnrollmentSerializer, GradeRecordSerializer, AttendanceRecordSerializer
+    EnrollmentSerializer, GradeRecordSerializer, AttendanceRecordSerializer,
+    GradeBulkItemSerializer, AttendanceBulkItemSerializer, BatchSerializer
 )
 
+# Максимальное число записей в одном запросе массового сохранения.
+BULK_MAX_ITEMS = 1000
+
+# Действия viewset'ов журнала, изменяющие записи (см. BulkUpsertMixin.get_permissions).
+WRITE_ACTIONS = {'create', 'update', 'partial_update', 'destroy'}
+
 
 class IsDirector(permissions.BasePermission):
     """Разрешение: доступ только для пользователей с ролью директора (ADMIN)."""
@@ -21,6 +44,7 @@ class IsDirector(permissions.BasePermission):
 
 class IsTeacher(permissions.BasePermission):
     """Разрешение: доступ только для пользователей с ролью учителя (TEACHER)."""
+    message = "Доступно только учителям."
 
     def has_permission(self, request, view):
         return request.user.is_authenticated and request.user.role == 'TEACHER'
@@ -34,18 +58,98 @@ class IsStudent(permissions.BasePermission):
 
 
 
-class SubjectViewSet(viewsets.ReadOnlyModelViewSet):
+class BulkUpsertMixin:
+    """
+    Действие POST <ресурс>/bulk/: массовое сохранение записей по урокам учителя.
+
+    Тело запроса — список записей вида {lesson_id, student_id, ...}. Каждая
+    запись проверяется bulk_serializer_class, затем вся пачка —
+    check_lesson_marks(). Если хотя бы одна запись не прошла проверку,
+    ничего не сохраняется и возвращается 400; иначе все записи сохраняются
+    одной вставкой с обновлением в одной транзакции.
+
+    Класс-наследник задаёт bulk_serializer_class и метод bulk_save(items):
+    items — данные проверенных записей с объектом урока в ключе 'lesson',
+    результат — сохранённые объекты в порядке items.
+
+    Ответ: {"saved": N, "results": [...]} — по элементу на запись в порядке
+    запроса: {"index", "status": "ok", "id"} после сохранения,
+    {"index", "status": "error", "errors"} для ошибочной записи и
+    {"index", "status": "valid"} для верной записи отклонённой пачки.
+
+    Одиночные записи (POST и PUT/PATCH) проверяются так же: check_mark().
+    Создавать, изменять и удалять записи могут только учителя: директор видит
+    все записи журнала, но правит их учитель урока. Остальным отвечает 403 до
+    проверки данных.
+    """
+    bulk_serializer_class = None
+
+    def get_permissions(self):
+        checks = super().get_permissions()
+        if self.action in WRITE_ACTIONS:
+            checks.append(IsTeacher())
+        return checks
+
+    def check_mark(self, serializer):
+        """Проверяет, что урок записи — урок учителя, а ученик зачислен в класс урока."""
+        instance = serializer.instance
+        lesson = serializer.validated_data.get('lesson', instance.lesson if instance else None)
+        student = serializer.validated_data.get('student', instance.student if instance else None)
+        _, errors = check_lesson_marks(self.request.user, [{'lesson_id': lesson.pk, 'student_id': student.pk}])
+        if errors:
+            raise ValidationError({field.removesuffix('_id'): messages for field, messages in errors[0].items()})
+
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[IsTeacher])
+    def bulk(self, request):
+        """Массовое сохранение записей с результатом по каждой записи."""
+        if self.bulk_serializer_class is None or not hasattr(self, 'bulk_save'):
+            raise ImproperlyConfigured(f'{type(self).__name__} должен задать bulk_serializer_class и bulk_save().')
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'non_field_errors': ['Ожидается непустой список записей.']})
+        if len(items) > BULK_MAX_ITEMS:
+            raise ValidationError({'non_field_errors': [f'Не больше {BULK_MAX_ITEMS} записей за запрос.']})
+
+        errors = {}
+        valid = []
+        for index, item in enumerate(items):
+            serializer = self.bulk_serializer_class(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                errors[index] = serializer.errors
+
+        lessons, mark_errors = check_lesson_marks(request.user, [data for _, data in valid])
+        for position, item_errors in mark_errors.items():
+            errors[valid[position][0]] = item_errors
+
+        if errors:
+            results = [
+                {'index': index, 'status': 'error', 'errors': errors[index]} if index in errors
+                else {'index': index, 'status': 'valid'}
+                for index in range(len(items))
+            ]
+            return Response({'saved': 0, 'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        saved = self.bulk_save([{**data, 'lesson': lessons[data['lesson_id']]} for _, data in valid])
+        return Response({
+            'saved': len(saved),
+            'results': [{'index': index, 'status': 'ok', 'id': obj.pk} for index, obj in enumerate(saved)],
+        })
+
+
+class SubjectViewSet(ConditionalGetMixin, ColumnarListMixin, QueryPlanMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint: Список и детальная информация о предметах.
     Доступно только аутентифицированным пользователям.
     """
     queryset = Subject.objects.all()
     serializer_class = SubjectSerializer
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    authentication_classes = [SessionAuthentication, ClaimsJWTAuthentication, CachedBasicAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
 
-class ClassRoomViewSet(viewsets.ReadOnlyModelViewSet):
+class ClassRoomViewSet(ConditionalGetMixin, ColumnarListMixin, QueryPlanMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint: Список и детали классов.
     - Учитель видит только свои классы.
@@ -54,7 +158,7 @@ class ClassRoomViewSet(viewsets.ReadOnlyModelViewSet):
     """
     queryset = ClassRoom.objects.all()
     serializer_class = ClassRoomSerializer
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    authentication_classes = [SessionAuthentication, ClaimsJWTAuthentication, CachedBasicAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -66,8 +170,53 @@ class ClassRoomViewSet(viewsets.ReadOnlyModelViewSet):
             return ClassRoom.objects.filter(enrollments__student=user)
         return super().get_queryset()
 
+    @action(detail=True, methods=['get'], permission_classes=[IsTeacher | IsDirector])
+    def attendance(self, request, pk=None):
+        """
+        Статистика посещаемости класса за период (?start_date=&end_date=).
+
+        Возвращает итоги, строки по ученикам (с самой длинной серией пропусков)
+        и по дням; данные читаются из дневных сводок посещаемости.
+        """
+        classroom = self.get_object()
+        form = PeriodForm(request.query_params)
+        if not form.is_valid():
+            raise ValidationError(form.errors)
+        period = form.cleaned_data
+
+        students = []
+        for row in student_attendance_stats(classroom, **period):
+            student = row.pop('student')
+            students.append({'student': student.id, 'student_name': student.get_full_name(), **row})
+
+        return Response({
+            'classroom': classroom.id,
+            'totals': class_attendance_totals(classroom, **period),
+            'students': students,
+            'days': class_attendance_days(classroom, **period),
+        })
 
-class LessonViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=True, methods=['get'], permission_classes=[IsTeacher | IsDirector])
+    def gradebook(self, request, pk=None):
+        """
+        Журнал класса (?subject=&start_date=&end_date=): ученики × уроки.
+
+        Уроки и ученики отдаются столбцами, ячейки — плотными массивами по
+        ученикам: values и max_values (null — нет оценки) и строка кодов
+        посещаемости attendance. Журнал кэшируется по версиям класса, а опрос
+        без изменений получает 304.
+        """
+        classroom = self.get_object()
+        form = MatrixFilterForm(request.query_params)
+        if not form.is_valid():
+            raise ValidationError(form.errors)
+        return versioned_response(
+            request, [classroom_scope(classroom.pk)],
+            lambda: Response({'classroom': classroom.id, **cached_gradebook(classroom, **form.cleaned_data)}),
+        )
+
+
+class LessonViewSet(ConditionalGetMixin, ColumnarListMixin, QueryPlanMixin, viewsets.ReadOnlyModelViewSet):
     """
     API endpoint: Просмотр уроков.
     - Учитель видит только свои уроки.
@@ -76,7 +225,8 @@ class LessonViewSet(viewsets.ReadOnlyModelViewSet):
     """
     queryset = Lesson.objects.all()
     serializer_class = LessonSerializer
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    keyset_ordering = ('-date', '-id')
+    authentication_classes = [SessionAuthentication, ClaimsJWTAuthentication, CachedBasicAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -88,17 +238,31 @@ class LessonViewSet(viewsets.ReadOnlyModelViewSet):
             return Lesson.objects.filter(classroom__enrollments__student=user)
         return super().get_queryset()
 
+    def get_version_scopes(self):
+        """Уроки учителя зависят от его области, уроки ученика и директора — от области всех уроков."""
+        user = self.request.user
+        if user.role == 'TEACHER':
+            return [teacher_scope(user.pk)]
+        if user.role == 'STUDENT':
+            # Зачисление в класс меняет область ученика.
+            return [student_scope(user.pk), LESSONS_SCOPE]
+        return [LESSONS_SCOPE]
+
 
-class GradeRecordViewSet(viewsets.ModelViewSet):
+class GradeRecordViewSet(BulkUpsertMixin, ConditionalGetMixin, ColumnarListMixin, QueryPlanMixin,
+                         viewsets.ModelViewSet):
     """
     API endpoint: Управление оценками (чтение, создание, редактирование).
-    - Учитель может выставлять оценки своим ученикам.
+    - Учитель может выставлять оценки своим ученикам, в том числе пачкой (POST bulk/).
     - Ученик может просматривать только свои оценки.
     - Директор видит все записи.
     """
     queryset = GradeRecord.objects.all()
     serializer_class = GradeRecordSerializer
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    bulk_serializer_class = GradeBulkItemSerializer
+    versioned_for_director = False
+    keyset_ordering = ('-date', '-id')
+    authentication_classes = [SessionAuthentication, ClaimsJWTAuthentication, CachedBasicAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -112,22 +276,40 @@ class GradeRecordViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Создание записи об оценке (только учитель)."""
-        user = self.request.user
-        if user.role != 'TEACHER':
-            raise permissions.PermissionDenied("Только учителя могут ставить оценки.")
+        self.check_mark(serializer)
+        serializer.save()
+
+    def perform_update(self, serializer):
+        """Изменение оценки: урок должен быть уроком учителя, ученик — зачислен в класс урока."""
+        self.check_mark(serializer)
         serializer.save()
 
+    def bulk_save(self, items):
+        """Сохраняет оценки пачки одной вставкой с обновлением."""
+        return upsert_grades([
+            GradeRecord(lesson=item['lesson'], student_id=item['student_id'], value=item['value'],
+                        max_value=item['max_value'], note=item['note'])
+            for item in items
+        ])
 
-class AttendanceRecordViewSet(viewsets.ModelViewSet):
+
+class AttendanceRecordViewSet(BulkUpsertMixin, ConditionalGetMixin, ColumnarListMixin, QueryPlanMixin,
+                         viewsets.ModelViewSet):
     """
     API endpoint: Управление посещаемостью (чтение, создание, редактирование).
-    - Учитель может отмечать посещаемость своих учеников.
+    - Учитель может отмечать посещаемость своих учеников, в том числе пачкой (POST bulk/).
     - Ученик видит только свои отметки.
     - Директор видит все записи.
     """
     queryset = AttendanceRecord.objects.all()
     serializer_class = AttendanceRecordSerializer
-    authentication_classes = [SessionAuthentication, BasicAuthentication]
+    bulk_serializer_class = AttendanceBulkItemSerializer
+    versioned_for_director = False
+    # Дата хранится в уроке, поэтому страница выбирается через соединение с уроками
+    # (см. KeysetPagination); своего столбца даты, который можно было бы
+    # проиндексировать вместе с id, у отметки нет.
+    keyset_ordering = ('-lesson__date', '-id')
+    authentication_classes = [SessionAuthentication, ClaimsJWTAuthentication, CachedBasicAuthentication]
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -141,7 +323,41 @@ class AttendanceRecordViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Создание записи о посещаемости (только учитель)."""
-        user = self.request.user
-        if user.role != 'TEACHER':
-            raise permissions.PermissionDenied("Только учителя могут отмечать посещаемость.")
+        self.check_mark(serializer)
         serializer.save()
+
+    def perform_update(self, serializer):
+        """Изменение отметки: урок должен быть уроком учителя, ученик — зачислен в класс урока."""
+        self.check_mark(serializer)
+        serializer.save()
+
+    def bulk_save(self, items):
+        """Сохраняет отметки пачки одной вставкой с обновлением."""
+        records = [
+            AttendanceRecord(lesson=item['lesson'], student_id=item['student_id'], status=item['status'],
+                             comment=item['comment'])
+            for item in items
+        ]
+        upsert_attendance(records)
+        return records
+
+
+class BatchView(APIView):
+    """
+    API endpoint: несколько GET-запросов к API за один вызов (POST /api/batch/).
+
+    Тело: {"requests": [{"path": "/api/lessons/?page_size=20", "headers": {...}}, ...],
+    "parallel": false}. Пользователь аутентифицируется один раз, вложенные
+    запросы выполняются представлениями своих адресов с его правами.
+    Ответ: {"responses": [{"path", "status", "headers", "body", "time_ms"}, ...],
+    "time_ms"} в порядке запросов; ошибка вложенного запроса не прерывает пакет.
+    """
+    authentication_classes = [SessionAuthentication, ClaimsJWTAuthentication, CachedBasicAuthentication]
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        started = time.perf_counter()
+        responses = run_batch(request, serializer.validated_data['requests'], serializer.validated_data['parallel'])
+        return Response({'responses': responses, 'time_ms': round((time.perf_counter() - started) * 1000, 1)})
@@ -13,6 +13,8 @@ urlpatterns = [
     path("classes/<int:pk>/students/", views.ClassStudentListView.as_view(), name="class_students"),
     path("classes/<int:pk>/add-student/", views.ClassAddStudentView.as_view(), name="class_add_student"),
 
+    path("attendance/", views.AttendanceOverviewView.as_view(), name="attendance_overview"),
+
     path("subjects/", views.SubjectListView.as_view(), name="subject_list"),
     path("subjects/new/", views.SubjectCreateView.as_view(), name="subject_create"),
 
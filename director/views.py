@@ -2,7 +2,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
-from django.views.generic import ListView, UpdateView, CreateView
+from django.views.generic import ListView, UpdateView, CreateView, TemplateView
 from django.urls import reverse_lazy
 from academics.models import ClassRoom, Subject, Enrollment, Lesson
 from django.shortcuts import render, get_object_or_404, redirect
@@ -11,6 +11,8 @@ from django.db.models import Q
 from django.contrib import messages
 
 from accounts.models import User
+from reports.attendance import school_attendance_stats
+from reports.forms import PeriodForm
 from .forms import LessonForm
 
 
@@ -49,7 +51,8 @@ class UserListView(AdminRequiredMixin, ListView):
 class UserRoleUpdateView(AdminRequiredMixin, UpdateView):
     """
     Позволяет директору изменить роль пользователя.
-    После сохранения — автоматически добавляет пользователя в группу по роли.
+    После сохранения — автоматически добавляет пользователя в группу по роли;
+    выданные ему JWT с прежней ролью отзываются обработчиком сигнала (api.signals).
     """
     model = User
     fields = ["role"]
@@ -83,6 +86,29 @@ class ClassListView(AdminRequiredMixin, ListView):
     ordering = ["grade_level", "name"]
 
 
+class AttendanceOverviewView(AdminRequiredMixin, TemplateView):
+    """
+    Посещаемость всех классов школы за период: итог по школе и классы,
+    отсортированные от самой низкой посещаемости. Данные берутся из дневных
+    сводок посещаемости классов.
+    """
+    template_name = "director/attendance.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = PeriodForm(self.request.GET)
+        period = form.cleaned_data if form.is_valid() else {}
+        rows, school = school_attendance_stats(**period)
+
+        classes = ClassRoom.objects.in_bulk([row["classroom_id"] for row in rows])
+        for row in rows:
+            row["classroom"] = classes[row["classroom_id"]]
+        rows.sort(key=lambda row: (row["rate"] is None, row["rate"] or 0))
+
+        context.update(form=form, classes=rows, school=school)
+        return context
+
+
 class SubjectCreateView(AdminRequiredMixin, CreateView):
     """
     Создание нового предмета с привязкой к преподавателю.
@@ -0,0 +1,277 @@
+"""
+Массовое выставление оценок и отметок посещаемости за урок.
+
+Журнал урока и перекличка читаются одним запросом от зачислений класса с
+LEFT JOIN на записи этого урока, а сохраняются одной вставкой с
+обновлением при конфликте по ключу (lesson, student). Такая вставка не
+вызывает сигналы post_save, поэтому после неё отправляются
+grades_bulk_saved и attendance_bulk_saved — по ним обновляются сводки и
+версии данных отчётов (см. reports.signals).
+
+Те же функции сохраняют пачки записей сразу по нескольким урокам из
+REST API; принадлежность уроков учителю и зачисление учеников для всей
+пачки проверяет check_lesson_marks() двумя запросами.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import FilteredRelation, Q
+from django.dispatch import Signal
+
+from academics.models import Enrollment, Lesson
+from .models import AttendanceRecord, GradeRecord
+
+# Отправляется после массового сохранения оценок урока.
+# Аргументы: lesson (Lesson), student_ids (set[int]) — ученики, чьи оценки записаны.
+grades_bulk_saved = Signal()
+
+# Отправляется после массового сохранения отметок урока.
+# Аргументы: lesson (Lesson), student_ids (set[int]) — ученики, чьи отметки записаны,
+# changes (list[tuple]) — (student_id, прежний статус или None, новый статус) для изменённых статусов.
+attendance_bulk_saved = Signal()
+
+GRADE_FIELDS = ("value", "max_value", "note")
+
+
+def _by_lesson(records):
+    """Группирует записи по урокам: {урок: множество id учеников}."""
+    lessons = {}
+    students = defaultdict(set)
+    for record in records:
+        lessons.setdefault(record.lesson_id, record.lesson)
+        students[record.lesson_id].add(record.student_id)
+    return [(lessons[lesson_id], student_ids) for lesson_id, student_ids in students.items()]
+
+
+def check_lesson_marks(teacher, items):
+    """
+    Проверяет пачку записей по урокам: урок существует и принадлежит учителю,
+    ученик зачислен в класс урока, пара (урок, ученик) в пачке не повторяется.
+
+    Проверка делается двумя запросами на всю пачку, независимо от её размера.
+
+    Аргументы:
+        teacher (User): учитель, сохраняющий записи.
+        items (list[dict]): записи с ключами 'lesson_id' и 'student_id'.
+
+    Возвращает:
+        tuple[dict, dict]: уроки пачки {id: Lesson} и ошибки {номер записи: {поле: [сообщения]}}.
+    """
+    lessons = Lesson.objects.in_bulk({item["lesson_id"] for item in items})
+    enrolled = set(
+        Enrollment.objects
+        .filter(
+            classroom_id__in={lesson.classroom_id for lesson in lessons.values()},
+            student_id__in={item["student_id"] for item in items},
+        )
+        .values_list("classroom_id", "student_id")
+    )
+
+    errors = {}
+    seen = set()
+    for position, item in enumerate(items):
+        lesson = lessons.get(item["lesson_id"])
+        key = (item["lesson_id"], item["student_id"])
+        if lesson is None:
+            errors[position] = {"lesson_id": ["Урок не найден."]}
+        elif lesson.teacher_id != teacher.pk:
+            errors[position] = {"lesson_id": ["Можно изменять только записи своих уроков."]}
+        elif (lesson.classroom_id, item["student_id"]) not in enrolled:
+            errors[position] = {"student_id": ["Ученик не зачислен в класс урока."]}
+        elif key in seen:
+            errors[position] = {"non_field_errors": ["Запись для этого ученика и урока уже есть в пачке."]}
+        seen.add(key)
+    return lessons, errors
+
+
+def upsert_grades(grades):
+    """
+    Записывает оценки одной вставкой с обновлением при конфликте по (lesson, student).
+
+    После вставки для каждого урока отправляется grades_bulk_saved. Пары
+    (урок, ученик) в пачке не должны повторяться.
+
+    Аргументы:
+        grades (list[GradeRecord]): несохранённые оценки с заполненным lesson.
+
+    Возвращает:
+        list[GradeRecord]: те же оценки с заполненным pk.
+    """
+    if not grades:
+        return grades
+    with transaction.atomic():
+        GradeRecord.objects.bulk_create(
+            grades,
+            update_conflicts=True,
+            unique_fields=["lesson", "student"],
+            update_fields=list(GRADE_FIELDS),
+        )
+        for lesson, student_ids in _by_lesson(grades):
+            grades_bulk_saved.send(sender=GradeRecord, lesson=lesson, student_ids=student_ids)
+    return grades
+
+
+def upsert_attendance(records):
+    """
+    Записывает отметки посещаемости одной вставкой с обновлением при конфликте по (lesson, student).
+
+    Уроки пачки блокируются до конца транзакции, чтобы одновременные
+    сохранения отметок одного урока не исказили сводки посещаемости. После
+    вставки для каждого урока отправляется attendance_bulk_saved. Пары
+    (урок, ученик) в пачке не должны повторяться.
+
+    Аргументы:
+        records (list[AttendanceRecord]): несохранённые отметки с заполненным lesson.
+
+    Возвращает:
+        list[AttendanceRecord]: отметки, у которых изменился статус; у всех
+        переданных отметок заполнен pk.
+    """
+    if not records:
+        return []
+    lesson_ids = {record.lesson_id for record in records}
+    with transaction.atomic():
+        list(Lesson.objects.select_for_update().filter(pk__in=lesson_ids).order_by("pk").values_list("pk"))
+        previous = {
+            (lesson_id, student_id): status
+            for lesson_id, student_id, status in AttendanceRecord.objects
+            .filter(lesson_id__in=lesson_ids, student_id__in={record.student_id for record in records})
+            .values_list("lesson_id", "student_id", "status")
+        }
+        AttendanceRecord.objects.bulk_create(
+            records,
+            update_conflicts=True,
+            unique_fields=["lesson", "student"],
+            update_fields=["status", "comment"],
+        )
+        changed = [
+            record for record in records
+            if previous.get((record.lesson_id, record.student_id)) != record.status
+        ]
+        for lesson, student_ids in _by_lesson(records):
+            changes = [
+                (record.student_id, previous.get((record.lesson_id, record.student_id)), record.status)
+                for record in changed if record.lesson_id == lesson.pk
+            ]
+            attendance_bulk_saved.send(sender=AttendanceRecord, lesson=lesson, student_ids=student_ids, changes=changes)
+    return changed
+
+
+def gradebook_rows(lesson):
+    """
+    Возвращает журнал урока: всех учеников класса с их оценками за урок.
+
+    Аргументы:
+        lesson (Lesson): урок.
+
+    Возвращает:
+        list[dict]: {'student_id', 'name', 'grade_id', 'value', 'max_value', 'note'}
+        в порядке фамилий; для ученика без оценки grade_id и value — None.
+    """
+    rows = (
+        Enrollment.objects
+        .filter(classroom_id=lesson.classroom_id)
+        .annotate(grade=FilteredRelation("student__grades", condition=Q(student__grades__lesson=lesson)))
+        .order_by("student__last_name", "student__first_name", "student_id")
+        .values_list(
+            "student_id", "student__last_name", "student__first_name",
+            "grade__id", "grade__value", "grade__max_value", "grade__note",
+        )
+    )
+    return [
+        {
+            "student_id": student_id,
+            "name": f"{last_name} {first_name}",
+            "grade_id": grade_id,
+            "value": value,
+            "max_value": max_value,
+            "note": note or "",
+        }
+        for student_id, last_name, first_name, grade_id, value, max_value, note in rows
+    ]
+
+
+def save_gradebook(lesson, changes):
+    """
+    Сохраняет изменённые строки журнала урока в одной транзакции.
+
+    Оценки записываются одной вставкой с обновлением при конфликте по
+    (lesson, student); строки с пустой оценкой удаляют оценку ученика.
+
+    Аргументы:
+        lesson (Lesson): урок.
+        changes (Iterable[dict]): изменённые строки {'student_id', 'value', 'max_value', 'note'}.
+
+    Возвращает:
+        tuple[int, int]: количество записанных и удалённых оценок.
+    """
+    grades = []
+    removed = set()
+    for row in changes:
+        if row["value"] is None:
+            removed.add(row["student_id"])
+        else:
+            grades.append(GradeRecord(
+                lesson=lesson, student_id=row["student_id"],
+                **{field: row[field] for field in GRADE_FIELDS},
+            ))
+
+    deleted = 0
+    with transaction.atomic():
+        upsert_grades(grades)
+        if removed:
+            # Удаление по одной записи вызывает post_delete, по которому пересчитываются сводки.
+            deleted, _ = GradeRecord.objects.filter(lesson=lesson, student_id__in=removed).delete()
+    return len(grades), deleted
+
+
+def roll_call_rows(lesson):
+    """
+    Возвращает перекличку урока: всех учеников класса с их отметками за урок.
+
+    Аргументы:
+        lesson (Lesson): урок.
+
+    Возвращает:
+        list[dict]: {'student_id', 'name', 'recorded', 'status', 'comment'} в порядке
+        фамилий; ученику без отметки предлагается статус «Был».
+    """
+    rows = (
+        Enrollment.objects
+        .filter(classroom_id=lesson.classroom_id)
+        .annotate(mark=FilteredRelation("student__attendance", condition=Q(student__attendance__lesson=lesson)))
+        .order_by("student__last_name", "student__first_name", "student_id")
+        .values_list("student_id", "student__last_name", "student__first_name", "mark__status", "mark__comment")
+    )
+    return [
+        {
+            "student_id": student_id,
+            "name": f"{last_name} {first_name}",
+            "recorded": status is not None,
+            "status": status or AttendanceRecord.Status.PRESENT,
+            "comment": comment or "",
+        }
+        for student_id, last_name, first_name, status, comment in rows
+    ]
+
+
+def save_roll_call(lesson, marks):
+    """
+    Сохраняет отметки посещаемости урока одной вставкой с обновлением.
+
+    Повторное сохранение тех же отметок ничего не меняет. Урок блокируется
+    до конца транзакции, чтобы одновременные переклички одного урока не
+    исказили сводки посещаемости.
+
+    Аргументы:
+        lesson (Lesson): урок.
+        marks (Iterable[dict]): {'student_id', 'status', 'comment'}.
+
+    Возвращает:
+        int: количество учеников, у которых изменился статус.
+    """
+    records = [
+        AttendanceRecord(lesson=lesson, student_id=mark["student_id"], status=mark["status"], comment=mark["comment"])
+        for mark in marks
+    ]
+    return len(upsert_attendance(records))
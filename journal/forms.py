@@ -6,10 +6,46 @@ from .models import GradeRecord, AttendanceRecord
 class GradeForm(forms.ModelForm):
     class Meta:
         model = GradeRecord
-        fields = ['student', 'subject', 'teacher', 'value', 'max_value', 'date', 'note']
+        fields = ['lesson', 'student', 'value', 'max_value', 'note']
 
 
 class AttendanceForm(forms.ModelForm):
     class Meta:
         model = AttendanceRecord
-        fields = ['lesson', 'student', 'status', 'comment']
\ No newline at end of file
+        fields = ['lesson', 'student', 'status', 'comment']
+
+class GradebookRowForm(forms.Form):
+    """
+    Строка журнала урока: оценка одного ученика.
+
+    Пустая оценка означает, что у ученика оценки за урок нет
+    (если оценка была, она удаляется).
+    """
+    student_id = forms.IntegerField(widget=forms.HiddenInput)
+    value = forms.DecimalField(label='Оценка', max_digits=5, decimal_places=2, min_value=0, required=False)
+    max_value = forms.DecimalField(label='Макс. балл', max_digits=5, decimal_places=2, min_value=0,
+                                   required=False, initial=100)
+    note = forms.CharField(label='Комментарий', max_length=255, required=False)
+
+    def clean(self):
+        """Требует оценку, если заполнен комментарий, и подставляет макс. балл по умолчанию."""
+        cleaned_data = super().clean()
+        if cleaned_data.get('value') is None and cleaned_data.get('note'):
+            self.add_error('value', 'Укажите оценку к комментарию.')
+        if cleaned_data.get('max_value') is None:
+            cleaned_data['max_value'] = GradeRecord._meta.get_field('max_value').default
+        return cleaned_data
+
+
+GradebookFormSet = forms.formset_factory(GradebookRowForm, extra=0)
+
+
+class RollCallRowForm(forms.Form):
+    """Строка переклички: отметка посещаемости одного ученика."""
+    student_id = forms.IntegerField(widget=forms.HiddenInput)
+    status = forms.ChoiceField(label='Статус', choices=AttendanceRecord.Status.choices,
+                               widget=forms.RadioSelect(attrs={'class': 'btn-check'}))
+    comment = forms.CharField(label='Комментарий', max_length=255, required=False)
+
+
+RollCallFormSet = forms.formset_factory(RollCallRowForm, extra=0)
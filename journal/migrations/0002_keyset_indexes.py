@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 07:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0004_keyset_indexes'),
+        ('journal', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='graderecord',
+            index=models.Index(fields=['date', 'id'], name='grade_date_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='graderecord',
+            index=models.Index(fields=['student', 'date', 'id'], name='grade_student_date_id_idx'),
+        ),
+    ]
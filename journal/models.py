@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from academics.models import Lesson
 
@@ -44,11 +44,21 @@ class GradeRecord(models.Model):
         verbose_name_plural = 'Оценки'
         unique_together = ('lesson', 'student')
         ordering = ['-date']
+        indexes = [
+            # Постраничная выдача оценок по (date, id), см. api.pagination.
+            models.Index(fields=['date', 'id'], name='grade_date_id_idx'),
+            models.Index(fields=['student', 'date', 'id'], name='grade_student_date_id_idx'),
+        ]
 
     def __str__(self):
         """Возвращает строку вида 'Иванов Иван · Математика 5А · 90/100'."""
         return f"{self.student} · {self.lesson} · {self.value}/{self.max_value}"
 
+    def save(self, *args, **kwargs):
+        """Сохраняет оценку в транзакции вместе с обновлением сводок (см. reports.signals)."""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
 
 class AttendanceRecord(models.Model):
     """
@@ -94,3 +104,8 @@ class AttendanceRecord(models.Model):
     def __str__(self):
         """Возвращает строку вида 'Иванов Иван · 5А Математика · Был'."""
         return f"{self.student} · {self.lesson} · {self.get_status_display()}"
+
+    def save(self, *args, **kwargs):
+        """Сохраняет отметку в транзакции вместе с обновлением сводок (см. reports.signals)."""
+        with transaction.atomic():
+            super().save(*args, **kwargs)
@@ -1,3 +1,146 @@
+import datetime
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.messages import get_messages
 from django.test import TestCase
+from django.urls import reverse
+
+from academics.models import ClassRoom, Enrollment, Lesson, Subject
+from accounts.models import User
+from .bulk import attendance_bulk_saved, grades_bulk_saved, upsert_attendance, upsert_grades
+from .models import AttendanceRecord, GradeRecord
+
+
+class LessonSheetTestCase(TestCase):
+    """Урок класса из двух учеников, его учитель и ученик другого класса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='t', email='t@example.com', password='pw', role='TEACHER')
+        cls.students = [
+            User.objects.create_user(username=f's{number}', email=f's{number}@example.com', password='pw',
+                                     role='STUDENT', last_name=last_name)
+            for number, last_name in enumerate(('Алексеев', 'Борисов'))
+        ]
+        cls.outsider = User.objects.create_user(username='o', email='o@example.com', password='pw', role='STUDENT')
+        subject = Subject.objects.create(name='Математика', teacher=cls.teacher)
+        classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=cls.teacher)
+        other_classroom = ClassRoom.objects.create(grade_level=5, name='Б', curator=cls.teacher)
+        for student in cls.students:
+            Enrollment.objects.create(student=student, classroom=classroom)
+        Enrollment.objects.create(student=cls.outsider, classroom=other_classroom)
+        cls.lesson = Lesson.objects.create(subject=subject, classroom=classroom, teacher=cls.teacher,
+                                           date=datetime.date(2025, 9, 1))
+
+    def receive(self, signal):
+        """Подключает к сигналу заглушку и возвращает её."""
+        receiver = mock.Mock()
+        signal.connect(receiver, weak=False)
+        self.addCleanup(signal.disconnect, receiver)
+        return receiver
+
+    def sheet_data(self, rows, initial):
+        """Данные формы листа урока: строки в порядке учеников."""
+        data = {'form-TOTAL_FORMS': len(rows), 'form-INITIAL_FORMS': initial}
+        for number, row in enumerate(rows):
+            data.update({f'form-{number}-{field}': value for field, value in row.items()})
+        return data
+
+
+class GradebookTests(LessonSheetTestCase):
+    """Журнал урока: оценки всего класса сохраняются одной вставкой с обновлением."""
+
+    def setUp(self):
+        self.url = reverse('journal:gradebook', args=[self.lesson.pk])
+        self.client.force_login(self.teacher)
+
+    def grades(self):
+        return dict(GradeRecord.objects.filter(lesson=self.lesson).values_list('student_id', 'value'))
+
+    def test_upsert_inserts_and_updates(self):
+        GradeRecord.objects.create(lesson=self.lesson, student=self.students[0], value=40)
+        receiver = self.receive(grades_bulk_saved)
+        upsert_grades([
+            GradeRecord(lesson=self.lesson, student=self.students[0], value=90),
+            GradeRecord(lesson=self.lesson, student=self.students[1], value=70),
+        ])
+        self.assertEqual(self.grades(), {self.students[0].pk: Decimal(90), self.students[1].pk: Decimal(70)})
+        receiver.assert_called_once()
+        self.assertEqual(receiver.call_args.kwargs['student_ids'], {student.pk for student in self.students})
+
+    def test_post_inserts_and_updates_in_one_request(self):
+        GradeRecord.objects.create(lesson=self.lesson, student=self.students[0], value=40)
+        receiver = self.receive(grades_bulk_saved)
+        response = self.client.post(self.url, self.sheet_data([
+            {'student_id': self.students[0].pk, 'value': '90', 'max_value': '100', 'note': ''},
+            {'student_id': self.students[1].pk, 'value': '70', 'max_value': '100', 'note': 'устно'},
+        ], initial=2))
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertEqual(self.grades(), {self.students[0].pk: Decimal(90), self.students[1].pk: Decimal(70)})
+        receiver.assert_called_once()
+        self.assertEqual(GradeRecord.objects.get(student=self.students[1]).note, 'устно')
+
+    def test_post_rejects_student_not_in_class(self):
+        receiver = self.receive(grades_bulk_saved)
+        response = self.client.post(self.url, self.sheet_data([
+            {'student_id': self.students[0].pk, 'value': '90', 'max_value': '100', 'note': ''},
+            {'student_id': self.outsider.pk, 'value': '70', 'max_value': '100', 'note': ''},
+        ], initial=2))
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertEqual(self.grades(), {})
+        receiver.assert_not_called()
+        [message] = get_messages(response.wsgi_request)
+        self.assertEqual(message.level_tag, 'error')
+
+
+class RollCallTests(LessonSheetTestCase):
+    """Перекличка: отметки всего класса перезаписываются одним запросом только учителем урока."""
+
+    def setUp(self):
+        self.url = reverse('journal:roll_call', args=[self.lesson.pk])
+        self.client.force_login(self.teacher)
+        AttendanceRecord.objects.create(lesson=self.lesson, student=self.students[0],
+                                        status=AttendanceRecord.Status.ABSENT)
+
+    def statuses(self):
+        return dict(AttendanceRecord.objects.filter(lesson=self.lesson).values_list('student_id', 'status'))
+
+    def roll_call(self, first, second):
+        return self.sheet_data([
+            {'student_id': self.students[0].pk, 'status': first, 'comment': ''},
+            {'student_id': self.students[1].pk, 'status': second, 'comment': ''},
+        ], initial=2)
+
+    def test_upsert_overwrites_earlier_marks(self):
+        receiver = self.receive(attendance_bulk_saved)
+        changed = upsert_attendance([
+            AttendanceRecord(lesson=self.lesson, student=self.students[0], status=AttendanceRecord.Status.LATE),
+            AttendanceRecord(lesson=self.lesson, student=self.students[1], status=AttendanceRecord.Status.PRESENT),
+        ])
+        self.assertEqual(len(changed), 2)
+        self.assertEqual(self.statuses(), {self.students[0].pk: 'L', self.students[1].pk: 'P'})
+        receiver.assert_called_once()
+        self.assertCountEqual(receiver.call_args.kwargs['changes'], [
+            (self.students[0].pk, 'A', 'L'), (self.students[1].pk, None, 'P'),
+        ])
+        # Повторная перекличка с теми же статусами ничего не меняет.
+        self.assertEqual(upsert_attendance([
+            AttendanceRecord(lesson=self.lesson, student=self.students[0], status=AttendanceRecord.Status.LATE),
+        ]), [])
+
+    def test_post_overwrites_earlier_marks(self):
+        response = self.client.post(self.url, self.roll_call('L', 'P'))
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+        self.assertEqual(self.statuses(), {self.students[0].pk: 'L', self.students[1].pk: 'P'})
+        [message] = get_messages(response.wsgi_request)
+        self.assertIn('статусов изменено — 2', message.message)
 
-# Create your tests here.
+    def test_only_lesson_teacher_can_take_roll_call(self):
+        other = User.objects.create_user(username='t2', email='t2@example.com', password='pw', role='TEACHER')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.assertEqual(self.client.post(self.url, self.roll_call('P', 'P')).status_code, 404)
+        self.client.force_login(self.students[0])
+        self.assertEqual(self.client.post(self.url, self.roll_call('P', 'P')).status_code, 403)
+        self.assertEqual(self.statuses(), {self.students[0].pk: 'A'})
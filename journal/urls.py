@@ -5,6 +5,8 @@ urlpatterns = [
     
     path("grades/new/", views.GradeCreateView.as_view(), name="grade_new"),
     path("attendance/new/", views.AttendanceCreateView.as_view(), name="attendance_new"),
+    path("lessons/<int:lesson_id>/gradebook/", views.GradebookView.as_view(), name="gradebook"),
+    path("lessons/<int:lesson_id>/roll-call/", views.RollCallView.as_view(), name="roll_call"),
 
 
     path("teacher/lessons/", views.TeacherLessonListView.as_view(), name="teacher_lessons"),
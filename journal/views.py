@@ -1,9 +1,14 @@
+from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
+from django.views import View
 from django.views.generic import CreateView, ListView
 from django.core.paginator import Paginator
 
+from .bulk import gradebook_rows, roll_call_rows, save_gradebook, save_roll_call
+from .forms import GradebookFormSet, RollCallFormSet
 from .models import GradeRecord, AttendanceRecord
 from academics.models import Lesson, Enrollment
 
@@ -168,6 +173,109 @@ class AttendanceCreateView(TeacherRequiredMixin, CreateView):
         return super().form_valid(form)
 
 
+class LessonSheetView(TeacherRequiredMixin, View):
+    """
+    Базовое представление листа урока (журнал оценок, перекличка): строка на
+    каждого ученика класса, сохранение всех строк одним запросом.
+    Доступно только учителю урока.
+
+    Подклассы задают template_name, formset_class и методы get_rows(),
+    get_initial(), save().
+    """
+    template_name = None
+    formset_class = None
+
+    def get_lesson(self):
+        return get_object_or_404(
+            Lesson.objects.select_related("subject", "classroom"),
+            pk=self.kwargs["lesson_id"], teacher=self.request.user,
+        )
+
+    def render_sheet(self, lesson, rows, formset):
+        return render(self.request, self.template_name, {
+            "lesson": lesson,
+            "formset": formset,
+            "rows": list(zip(rows, formset.forms)),
+        })
+
+    def get(self, request, lesson_id):
+        lesson = self.get_lesson()
+        rows = self.get_rows(lesson)
+        return self.render_sheet(lesson, rows, self.formset_class(initial=self.get_initial(rows)))
+
+    def post(self, request, lesson_id):
+        lesson = self.get_lesson()
+        rows = self.get_rows(lesson)
+        formset = self.formset_class(request.POST, initial=self.get_initial(rows))
+        if not formset.is_valid():
+            return self.render_sheet(lesson, rows, formset)
+
+        submitted = [form.cleaned_data["student_id"] for form in formset.forms]
+        if submitted != [row["student_id"] for row in rows]:
+            messages.error(request, "Состав класса изменился, пока страница была открыта. Проверьте данные и сохраните снова.")
+        else:
+            messages.success(request, self.save(lesson, rows, formset))
+        return redirect(request.path)
+
+
+class GradebookView(LessonSheetView):
+    """
+    Журнал урока: оценки всех учеников класса на одной странице.
+
+    Изменённые строки сохраняются одной транзакцией с одной массовой
+    вставкой с обновлением (см. journal.bulk).
+    """
+    template_name = "journal/gradebook.html"
+    formset_class = GradebookFormSet
+
+    def get_rows(self, lesson):
+        return gradebook_rows(lesson)
+
+    def get_initial(self, rows):
+        return [
+            {
+                "student_id": row["student_id"],
+                "value": row["value"],
+                "max_value": row["max_value"] if row["grade_id"] else None,
+                "note": row["note"],
+            }
+            for row in rows
+        ]
+
+    def save(self, lesson, rows, formset):
+        changes = [form.cleaned_data for form in formset.forms if form.has_changed()]
+        saved, deleted = save_gradebook(lesson, changes)
+        return f"Журнал сохранён: записано оценок — {saved}, удалено — {deleted}."
+
+
+class RollCallView(LessonSheetView):
+    """
+    Перекличка: отметка посещаемости всего класса за урок одним запросом.
+
+    Ученики без отметки предзаполнены статусом «Был»; учитель меняет только
+    исключения. Сохраняются строки без отметки и изменённые строки (см. journal.bulk).
+    """
+    template_name = "journal/roll_call.html"
+    formset_class = RollCallFormSet
+
+    def get_rows(self, lesson):
+        return roll_call_rows(lesson)
+
+    def get_initial(self, rows):
+        return [
+            {"student_id": row["student_id"], "status": row["status"], "comment": row["comment"]}
+            for row in rows
+        ]
+
+    def save(self, lesson, rows, formset):
+        marks = [
+            form.cleaned_data for row, form in zip(rows, formset.forms)
+            if not row["recorded"] or form.has_changed()
+        ]
+        changed = save_roll_call(lesson, marks)
+        return f"Посещаемость сохранена: отметок записано — {len(marks)}, статусов изменено — {changed}."
+
+
 class TeacherLessonListView(TeacherRequiredMixin, ListView):
     """
     Отображает список уроков, проведённых текущим учителем.
@@ -1,3 +1,52 @@
 from django.contrib import admin
+from .models import (
+    ClassAttendanceDay, DataVersion, GradeSummary, ReportJob, StudentAttendanceDay, StudentSearchEntry,
+)
 
-# Register your models here.
+
+@admin.register(DataVersion)
+class DataVersionAdmin(admin.ModelAdmin):
+    list_display = ("scope", "version", "updated_at")
+    search_fields = ("scope",)
+    ordering = ("scope",)
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "object_id", "status", "requested_by", "created_at", "finished_at")
+    list_filter = ("status", "kind")
+    search_fields = ("cache_key", "requested_by__email")
+    ordering = ("-created_at",)
+
+
+@admin.register(GradeSummary)
+class GradeSummaryAdmin(admin.ModelAdmin):
+    list_display = ("student", "subject", "classroom", "term", "count", "value_sum", "min_value", "max_value", "last_date")
+    list_filter = ("term", "classroom")
+    search_fields = ("student__last_name", "student__email")
+    list_select_related = ("student", "subject", "classroom")
+
+
+@admin.register(StudentAttendanceDay)
+class StudentAttendanceDayAdmin(admin.ModelAdmin):
+    list_display = ("student", "classroom", "date", "present", "absent", "late")
+    list_filter = ("classroom",)
+    search_fields = ("student__last_name", "student__email")
+    date_hierarchy = "date"
+    list_select_related = ("student", "classroom")
+
+
+@admin.register(ClassAttendanceDay)
+class ClassAttendanceDayAdmin(admin.ModelAdmin):
+    list_display = ("classroom", "date", "present", "absent", "late")
+    list_filter = ("classroom",)
+    date_hierarchy = "date"
+    list_select_related = ("classroom",)
+
+
+@admin.register(StudentSearchEntry)
+class StudentSearchEntryAdmin(admin.ModelAdmin):
+    list_display = ("student", "text")
+    search_fields = ("student__last_name", "student__email")
+    list_select_related = ("student",)
+    readonly_fields = ("vector",)
@@ -0,0 +1,165 @@
+from django.db.models import Avg, Count, DecimalField, ExpressionWrapper, FloatField, Max, Min, Q, Sum
+from django.db.models.functions import Cast, Coalesce, NullIf
+
+from accounts.models import User
+from journal.models import GradeRecord
+from .models import GradeSummary
+
+
+def grade_filter(prefix="", start_date=None, end_date=None, subject=None):
+    """
+    Строит условие отбора оценок по периоду и предмету.
+
+    Аргументы:
+        prefix (str): путь до модели GradeRecord (например, 'grades__').
+        start_date (str | date | None): начальная дата периода.
+        end_date (str | date | None): конечная дата периода.
+        subject (int | str | None): идентификатор предмета.
+
+    Возвращает:
+        Q: условие для filter() или для аргумента filter агрегатов.
+    """
+    condition = Q()
+    if start_date:
+        condition &= Q(**{f"{prefix}date__gte": start_date})
+    if end_date:
+        condition &= Q(**{f"{prefix}date__lte": end_date})
+    if subject:
+        condition &= Q(**{f"{prefix}lesson__subject__id": subject})
+    return condition
+
+
+def _grade_aggregates(prefix, condition):
+    """Возвращает набор агрегатов по оценкам с общим условием отбора."""
+    normalized = (
+        Cast(f"{prefix}value", FloatField())
+        / NullIf(Cast(f"{prefix}max_value", FloatField()), 0.0)
+    )
+    return {
+        "grade_count": Count(f"{prefix}id", filter=condition),
+        "grade_avg": Avg(f"{prefix}value", filter=condition),
+        "grade_min": Min(f"{prefix}value", filter=condition),
+        "grade_max": Max(f"{prefix}value", filter=condition),
+        "grade_normalized": Avg(normalized, filter=condition),
+    }
+
+
+def _summary_aggregates(prefix, condition):
+    """Те же агрегаты, что и _grade_aggregates(), но по сводкам GradeSummary."""
+    count = Sum(f"{prefix}count", filter=condition)
+    return {
+        "grade_count": Coalesce(count, 0),
+        "grade_avg": ExpressionWrapper(
+            Sum(f"{prefix}value_sum", filter=condition) / NullIf(count, 0),
+            output_field=DecimalField(),
+        ),
+        "grade_min": Min(f"{prefix}min_value", filter=condition),
+        "grade_max": Max(f"{prefix}max_value", filter=condition),
+        "grade_normalized": ExpressionWrapper(
+            Sum(f"{prefix}normalized_sum", filter=condition)
+            / NullIf(Cast(Sum(f"{prefix}normalized_count", filter=condition), FloatField()), 0.0),
+            output_field=FloatField(),
+        ),
+    }
+
+
+def _use_summaries(start_date, end_date):
+    """Сводки хранятся по четвертям, поэтому подходят, только если период не задан."""
+    return not start_date and not end_date
+
+
+def _stats(row):
+    """Приводит аннотированные значения к словарю статистики."""
+    return {
+        "count": row["grade_count"],
+        "average": round(row["grade_avg"], 2) if row["grade_avg"] is not None else None,
+        "min": row["grade_min"],
+        "max": row["grade_max"],
+        "normalized": (
+            round(row["grade_normalized"], 4) if row["grade_normalized"] is not None else None
+        ),
+    }
+
+
+def class_grade_stats(classroom, start_date=None, end_date=None, subject=None):
+    """
+    Считает статистику оценок по каждому ученику класса одним сгруппированным запросом.
+
+    Ученики без оценок за выбранный период также попадают в результат
+    (count = 0, остальные значения — None). Без фильтра по датам статистика
+    берётся из сводок GradeSummary (O(учеников × предметов) строк), иначе
+    считается по самим оценкам.
+
+    Аргументы:
+        classroom (ClassRoom): класс.
+        start_date, end_date, subject: фильтры, см. grade_filter().
+
+    Возвращает:
+        list[dict]: записи вида {'student', 'count', 'average', 'min', 'max', 'normalized'}
+        в порядке фамилий и имён учеников.
+    """
+    if _use_summaries(start_date, end_date):
+        condition = Q(grade_summaries__subject_id=subject) if subject else Q()
+        aggregates = _summary_aggregates("grade_summaries__", condition)
+    else:
+        condition = grade_filter("grades__", start_date, end_date, subject)
+        aggregates = _grade_aggregates("grades__", condition)
+    students = (
+        User.objects
+        .filter(enrollments__classroom=classroom)
+        .annotate(**aggregates)
+        .order_by("last_name", "first_name", "id")
+    )
+    result = []
+    for student in students:
+        row = _stats(vars(student))
+        row["student"] = student
+        result.append(row)
+    return result
+
+
+def student_grade_stats(student, start_date=None, end_date=None, subject=None):
+    """
+    Считает статистику оценок одного ученика одним агрегирующим запросом
+    (по сводкам GradeSummary, если период не задан).
+
+    Аргументы:
+        student (User): ученик.
+        start_date, end_date, subject: фильтры, см. grade_filter().
+
+    Возвращает:
+        dict: {'count', 'average', 'min', 'max', 'normalized'}.
+    """
+    if _use_summaries(start_date, end_date):
+        condition = Q(subject_id=subject) if subject else Q()
+        row = GradeSummary.objects.filter(student=student).aggregate(**_summary_aggregates("", condition))
+        return _stats(row)
+
+    condition = grade_filter("", start_date, end_date, subject)
+    row = (
+        GradeRecord.objects
+        .filter(student=student)
+        .aggregate(**_grade_aggregates("", condition))
+    )
+    return _stats(row)
+
+
+def class_grade_notes(classroom, start_date=None, end_date=None, subject=None):
+    """
+    Собирает непустые комментарии к оценкам учеников класса одним запросом.
+
+    Возвращает:
+        dict[int, list[str]]: комментарии, сгруппированные по id ученика.
+    """
+    rows = (
+        GradeRecord.objects
+        .filter(student__enrollments__classroom=classroom)
+        .filter(grade_filter("", start_date, end_date, subject))
+        .exclude(note="")
+        .order_by("student_id", "date", "id")
+        .values_list("student_id", "note")
+    )
+    notes = {}
+    for student_id, note in rows:
+        notes.setdefault(student_id, []).append(note)
+    return notes
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reports'
+
+    def ready(self):
+        """
+        Подключает обработчики сигналов, инвалидирующие кэш отчётов,
+        и один раз регистрирует шрифт PDF-движка.
+        """
+        from . import signals  # noqa: F401
+        from . import pdf
+        pdf.setup()
@@ -0,0 +1,270 @@
+"""
+Сводки посещаемости по дням: StudentAttendanceDay и ClassAttendanceDay.
+
+Каждая отметка AttendanceRecord увеличивает счётчик своего статуса у ученика
+и у класса за дату урока; при изменении или удалении отметки счётчики
+уменьшаются. Статистика за период читается из сводок — O(дней), а не
+O(отметок).
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+
+from academics.models import Enrollment
+from journal.models import AttendanceRecord
+from .models import ClassAttendanceDay, StudentAttendanceDay
+
+# Поле счётчика для каждого статуса посещаемости.
+STATUS_FIELDS = {
+    AttendanceRecord.Status.PRESENT: 'present',
+    AttendanceRecord.Status.ABSENT: 'absent',
+    AttendanceRecord.Status.LATE: 'late',
+}
+
+COUNT_FIELDS = tuple(STATUS_FIELDS.values())
+
+# Размер пачки при массовом создании сводок.
+REBUILD_BATCH_SIZE = 1000
+
+
+def attendance_key(record):
+    """
+    Возвращает ключ дневной сводки, к которой относится отметка.
+
+    Возвращает:
+        tuple: (student_id, classroom_id, date).
+    """
+    lesson = record.lesson
+    return record.student_id, lesson.classroom_id, lesson.date
+
+
+def apply_attendance(key, status, delta):
+    """
+    Изменяет счётчик статуса в сводках ученика и класса за день.
+
+    Аргументы:
+        key (tuple): ключ из attendance_key().
+        status (str): статус отметки, см. AttendanceRecord.Status.
+        delta (int): +1 для новой отметки, -1 для удалённой.
+    """
+    field = STATUS_FIELDS[status]
+    student_id, classroom_id, day = key
+    rollups = (
+        (StudentAttendanceDay, {'student_id': student_id, 'classroom_id': classroom_id, 'date': day}),
+        (ClassAttendanceDay, {'classroom_id': classroom_id, 'date': day}),
+    )
+    with transaction.atomic():
+        for model, lookup in rollups:
+            if delta > 0:
+                model.objects.bulk_create([model(**lookup)], ignore_conflicts=True)
+            model.objects.filter(**lookup).update(**{field: F(field) + delta})
+
+
+def apply_attendance_changes(classroom_id, day, changes):
+    """
+    Переносит счётчики в сводках за один день по нескольким изменённым отметкам сразу.
+
+    Выполняет фиксированное число запросов независимо от числа отметок:
+    создание недостающих сводок и по одному UPDATE для сводок учеников и класса.
+
+    Аргументы:
+        classroom_id (int): класс урока.
+        day (date): дата урока.
+        changes (Iterable[tuple]): (student_id, прежний статус или None, новый статус или None).
+    """
+    student_deltas = defaultdict(lambda: dict.fromkeys(COUNT_FIELDS, 0))
+    for student_id, previous, status in changes:
+        if previous == status:
+            continue
+        deltas = student_deltas[student_id]
+        if previous is not None:
+            deltas[STATUS_FIELDS[previous]] -= 1
+        if status is not None:
+            deltas[STATUS_FIELDS[status]] += 1
+    if not student_deltas:
+        return
+
+    class_deltas = {field: sum(deltas[field] for deltas in student_deltas.values()) for field in COUNT_FIELDS}
+    with transaction.atomic():
+        StudentAttendanceDay.objects.bulk_create(
+            [StudentAttendanceDay(student_id=student_id, classroom_id=classroom_id, date=day)
+             for student_id in student_deltas],
+            ignore_conflicts=True,
+        )
+        ClassAttendanceDay.objects.bulk_create(
+            [ClassAttendanceDay(classroom_id=classroom_id, date=day)], ignore_conflicts=True,
+        )
+        StudentAttendanceDay.objects.filter(
+            student_id__in=student_deltas, classroom_id=classroom_id, date=day,
+        ).update(**{
+            field: F(field) + Case(
+                *[When(student_id=student_id, then=Value(deltas[field]))
+                  for student_id, deltas in student_deltas.items() if deltas[field]],
+                default=Value(0),
+            )
+            for field in COUNT_FIELDS
+        })
+        ClassAttendanceDay.objects.filter(classroom_id=classroom_id, date=day).update(
+            **{field: F(field) + delta for field, delta in class_deltas.items()}
+        )
+
+
+def attendance_rate(present, late, total):
+    """Доля посещённых уроков (включая опоздания) в процентах или None, если отметок нет."""
+    return round((present + late) * 100 / total, 1) if total else None
+
+
+def _counts(row):
+    """Приводит счётчики к словарю статистики с итогом и процентом посещаемости."""
+    counts = {field: row[field] or 0 for field in COUNT_FIELDS}
+    counts['total'] = sum(counts.values())
+    counts['rate'] = attendance_rate(counts['present'], counts['late'], counts['total'])
+    return counts
+
+
+def _period(queryset, start_date=None, end_date=None):
+    if start_date:
+        queryset = queryset.filter(date__gte=start_date)
+    if end_date:
+        queryset = queryset.filter(date__lte=end_date)
+    return queryset
+
+
+def _sums():
+    return {field: Sum(field) for field in COUNT_FIELDS}
+
+
+def class_attendance_days(classroom, start_date=None, end_date=None):
+    """
+    Возвращает посещаемость класса по дням за период.
+
+    Возвращает:
+        list[dict]: {'date', 'present', 'absent', 'late', 'total', 'rate'} в порядке дат.
+    """
+    rows = _period(ClassAttendanceDay.objects.filter(classroom=classroom), start_date, end_date)
+    days = []
+    for row in rows.order_by('date').values('date', *COUNT_FIELDS):
+        day = _counts(row)
+        if day['total']:
+            day['date'] = row['date']
+            days.append(day)
+    return days
+
+
+def class_attendance_totals(classroom, start_date=None, end_date=None):
+    """Возвращает итоги посещаемости класса за период, см. _counts()."""
+    rows = _period(ClassAttendanceDay.objects.filter(classroom=classroom), start_date, end_date)
+    return _counts(rows.aggregate(**_sums()))
+
+
+def student_attendance_stats(classroom, start_date=None, end_date=None):
+    """
+    Считает посещаемость каждого ученика класса за период по дневным сводкам.
+
+    Серия пропусков — число подряд идущих дней с отметками, в которые ученик
+    отсутствовал на всех уроках; дни без отметок ученика серию не прерывают.
+
+    Возвращает:
+        list[dict]: {'student', 'present', 'absent', 'late', 'total', 'rate',
+        'absence_streak'} в порядке фамилий.
+    """
+    students = [
+        enrollment.student
+        for enrollment in Enrollment.objects.filter(classroom=classroom)
+        .select_related('student').order_by('student__last_name', 'student__first_name', 'student_id')
+    ]
+    stats = {
+        student.id: {'student': student, 'present': 0, 'absent': 0, 'late': 0, 'streak': 0, 'absence_streak': 0}
+        for student in students
+    }
+    rows = (
+        _period(StudentAttendanceDay.objects.filter(classroom=classroom), start_date, end_date)
+        .order_by('student_id', 'date')
+        .values_list('student_id', *COUNT_FIELDS)
+    )
+    for student_id, present, absent, late in rows:
+        row = stats.get(student_id)
+        if row is None or not present + absent + late:
+            continue
+        row['present'] += present
+        row['absent'] += absent
+        row['late'] += late
+        row['streak'] = row['streak'] + 1 if absent and not present + late else 0
+        row['absence_streak'] = max(row['absence_streak'], row['streak'])
+
+    result = []
+    for student in students:
+        row = stats[student.id]
+        del row['streak']
+        row.update(_counts(row))
+        result.append(row)
+    return result
+
+
+def school_attendance_stats(start_date=None, end_date=None):
+    """
+    Считает посещаемость каждого класса школы и итог по школе за период.
+
+    Возвращает:
+        tuple[list[dict], dict]: строки по классам ({'classroom_id', ...}, см. _counts())
+        и итог по школе.
+    """
+    rows = (
+        _period(ClassAttendanceDay.objects.all(), start_date, end_date)
+        .values('classroom_id')
+        .annotate(**_sums())
+        .order_by()
+    )
+    classes = []
+    for row in rows:
+        counts = _counts(row)
+        counts['classroom_id'] = row['classroom_id']
+        classes.append(counts)
+    school = _counts({field: sum(row[field] for row in classes) for field in COUNT_FIELDS})
+    return classes, school
+
+
+def _status_counts():
+    return {
+        field: Count('id', filter=Q(status=status))
+        for status, field in STATUS_FIELDS.items()
+    }
+
+
+def rebuild_attendance_rollups(record_model=AttendanceRecord, student_model=StudentAttendanceDay,
+                               class_model=ClassAttendanceDay):
+    """
+    Пересоздаёт все дневные сводки посещаемости сгруппированными запросами.
+
+    Аргументы:
+        record_model, student_model, class_model: модели отметок и сводок; миграция
+            передаёт исторические версии моделей.
+
+    Возвращает:
+        tuple[int, int]: количество сводок учеников и классов.
+    """
+    groupings = (
+        (student_model, ('student_id',)),
+        (class_model, ()),
+    )
+    created = []
+    with transaction.atomic():
+        for model, fields in groupings:
+            model.objects.all().delete()
+            rows = (
+                record_model.objects
+                .values(*fields, classroom_id=F('lesson__classroom_id'), date=F('lesson__date'))
+                .annotate(**_status_counts())
+                .order_by()
+            )
+            count = 0
+            batch = []
+            for row in rows.iterator(chunk_size=REBUILD_BATCH_SIZE):
+                batch.append(model(**row))
+                if len(batch) >= REBUILD_BATCH_SIZE:
+                    count += len(model.objects.bulk_create(batch))
+                    batch = []
+            count += len(model.objects.bulk_create(batch))
+            created.append(count)
+    return tuple(created)
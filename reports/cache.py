@@ -0,0 +1,244 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from .models import ReportCacheCounter
+from .versioning import ACADEMICS_SCOPE, get_versions
+
+COUNTERS = ("hits", "misses")
+
+
+class FileReportStore:
+    """
+    Хранилище готовых отчётов в каталоге на диске.
+
+    Файлы именуются по ключу содержимого. Суммарный размер каталога ограничен
+    `max_bytes`: при превышении удаляются давно не использованные файлы (LRU по mtime,
+    который обновляется при каждом чтении).
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def open(self, key):
+        """Открывает сохранённый отчёт на чтение или возвращает None."""
+        path = self._path(key)
+        try:
+            fh = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Файл вытеснен другим процессом между открытием и обновлением mtime.
+            fh.close()
+            return None
+        return fh
+
+    def exists(self, key):
+        """Проверяет, сохранён ли отчёт с данным ключом."""
+        return os.path.exists(self._path(key))
+
+    def save(self, key, source):
+        """
+        Атомарно копирует отчёт из файла `source` (с текущей позиции)
+        и вытесняет старые файлы при превышении лимита.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fh:
+            shutil.copyfileobj(source, fh)
+        os.replace(tmp_path, self._path(key))
+        self._evict()
+
+    def _entries(self):
+        try:
+            scanned = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return []
+        entries = []
+        for entry in scanned:
+            if not entry.name.endswith(".pdf"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def usage(self):
+        """Возвращает количество файлов и их суммарный размер в байтах."""
+        entries = self._entries()
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries)}
+
+    def clear(self):
+        """Удаляет все сохранённые отчёты."""
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class CacheBackendReportStore:
+    """
+    Хранилище готовых отчётов в бэкенде кэша Django.
+
+    Ограничение размера и LRU-вытеснение обеспечивает сам бэкенд
+    (MAX_ENTRIES у LocMemCache, политика памяти у Redis/Memcached).
+    """
+
+    key_prefix = "reports:pdf:"
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def open(self, key):
+        """Возвращает отчёт как файловый объект или None."""
+        data = self.cache.get(self.key_prefix + key)
+        return BytesIO(data) if data is not None else None
+
+    def exists(self, key):
+        """Проверяет, сохранён ли отчёт с данным ключом."""
+        return self.cache.has_key(self.key_prefix + key)
+
+    def save(self, key, source):
+        """Сохраняет отчёт из файла `source` в кэш без ограничения по времени."""
+        self.cache.set(self.key_prefix + key, source.read(), timeout=None)
+
+    def usage(self):
+        """Бэкенд кэша не сообщает размер — возвращает пустую статистику."""
+        return {"entries": None, "bytes": None}
+
+    def clear(self):
+        """Записи вытесняются бэкендом; явная очистка не поддерживается."""
+
+
+class ReportCache:
+    """
+    Кэш PDF-отчётов, адресуемый по содержимому.
+
+    Ключ — хэш от типа отчёта, идентификатора объекта, версий затронутых
+    областей данных и параметров построения. Изменение данных увеличивает
+    версию области (см. reports.signals), поэтому устаревшие записи
+    никогда не находятся и со временем вытесняются.
+
+    Счётчики попаданий и промахов хранятся в базе (ReportCacheCounter), чтобы
+    их видели все процессы, а не только записавший.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def make_key(self, report_type, object_id, scopes, params=None):
+        """
+        Вычисляет ключ отчёта.
+
+        Аргументы:
+            report_type (str): тип отчёта, например 'class'.
+            object_id (int): идентификатор класса или ученика.
+            scopes (Iterable[str]): области данных, от которых зависит отчёт.
+            params (dict | None): параметры построения (фильтры, дата).
+
+        Возвращает:
+            str: шестнадцатеричный SHA-256.
+        """
+        versions = get_versions(set(scopes) | {ACADEMICS_SCOPE})
+        payload = json.dumps(
+            [report_type, object_id, sorted(versions.items()), params or {}],
+            sort_keys=True, default=str, ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_or_render(self, key, render):
+        """
+        Возвращает файловый объект отчёта из кэша или строит его через `render(output)`.
+
+        При промахе документ пишется во временный файл на диске, копируется
+        в хранилище и отдаётся из того же временного файла — целиком в память
+        он не загружается.
+
+        Аргументы:
+            key (str): ключ из make_key().
+            render (Callable[[BinaryIO], None]): функция, записывающая PDF в файл.
+        """
+        fh = self.store.open(key)
+        if fh is not None:
+            self._incr("hits")
+            return fh
+        self._incr("misses")
+        spool = render_to_tempfile(render)
+        self.store.save(key, spool)
+        spool.seek(0)
+        return spool
+
+    def _incr(self, name):
+        if not ReportCacheCounter.objects.filter(name=name).update(value=F("value") + 1):
+            ReportCacheCounter.objects.bulk_create([ReportCacheCounter(name=name)], ignore_conflicts=True)
+            ReportCacheCounter.objects.filter(name=name).update(value=F("value") + 1)
+
+    def stats(self):
+        """Возвращает счётчики попаданий/промахов и заполненность хранилища."""
+        counters = dict(ReportCacheCounter.objects.filter(name__in=COUNTERS).values_list("name", "value"))
+        return {**{name: counters.get(name, 0) for name in COUNTERS}, **self.store.usage()}
+
+    def clear(self):
+        """Очищает хранилище и сбрасывает счётчики."""
+        self.store.clear()
+        ReportCacheCounter.objects.filter(name__in=COUNTERS).update(value=0)
+
+
+def render_to_tempfile(render):
+    """
+    Строит отчёт во временный файл и возвращает его, перемотанным в начало.
+
+    Аргументы:
+        render (Callable[[BinaryIO], None]): функция, записывающая PDF в файл.
+    """
+    spool = tempfile.TemporaryFile()
+    try:
+        render(spool)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+@lru_cache(maxsize=None)
+def get_report_cache():
+    """Возвращает кэш отчётов, настроенный по REPORTS_CACHE_* из settings."""
+    if settings.REPORTS_CACHE_BACKEND == "cache":
+        store = CacheBackendReportStore(settings.REPORTS_CACHE_ALIAS)
+    else:
+        store = FileReportStore(settings.REPORTS_CACHE_DIR, settings.REPORTS_CACHE_MAX_BYTES)
+    return ReportCache(store)
@@ -0,0 +1,121 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) по версиям данных.
+
+Ответ страницы отчёта или API зависит от данных нескольких областей
+(см. reports.versioning). ETag строится из версий этих областей, пользователя
+и адреса запроса, Last-Modified — наибольшее время изменения областей.
+Если у клиента ответ с тем же ETag, он получает 304 после одного запроса
+версий, без построения отчёта и сериализации.
+"""
+import hashlib
+import json
+from functools import wraps
+
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .versioning import ACADEMICS_SCOPE, aget_version_stamp, get_version_stamp
+
+
+def make_etag(request, versions, csrf=False):
+    """
+    Вычисляет слабый ETag ответа.
+
+    Кроме версий областей, учитывает пользователя, полный адрес запроса и
+    заголовок Accept.
+
+    Аргументы:
+        request (HttpRequest): запрос.
+        versions (dict[str, int]): версии областей.
+        csrf (bool): учитывать ли секрет CSRF — для страниц, в формах которых
+            выводится токен.
+
+    Возвращает:
+        str: значение заголовка ETag.
+    """
+    payload = json.dumps([
+        sorted(versions.items()),
+        request.user.pk,
+        request.get_full_path(),
+        request.headers.get("Accept", ""),
+        request.META.get("CSRF_COOKIE", "") if csrf else "",
+    ])
+    return "W/" + quote_etag(hashlib.sha256(payload.encode()).hexdigest()[:32])
+
+
+def _set_validators(response, etag, last_modified):
+    response.headers["ETag"] = etag
+    if last_modified is not None:
+        response.headers["Last-Modified"] = http_date(last_modified.timestamp())
+    # Ответ зависит от пользователя и должен перепроверяться при каждом обращении.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _conditional(request, versions, last_modified, csrf):
+    etag = make_etag(request, versions, csrf)
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def versioned_response(request, scopes, get_response, csrf=False):
+    """
+    Отвечает 304, если у клиента актуальная версия ответа, иначе строит ответ.
+
+    Аргументы:
+        request (HttpRequest): запрос.
+        scopes (Iterable[str] | None): области, от которых зависит ответ
+            (ACADEMICS_SCOPE добавляется всегда); None — ответ без проверки версий.
+        get_response (Callable[[], HttpResponse]): построение ответа.
+        csrf (bool): см. make_etag().
+
+    Возвращает:
+        HttpResponse: 304 или ответ get_response() с ETag и Last-Modified (для 200).
+    """
+    if scopes is None or request.method not in ("GET", "HEAD"):
+        return get_response()
+    versions, last_modified = get_version_stamp(set(scopes) | {ACADEMICS_SCOPE})
+    etag, not_modified = _conditional(request, versions, last_modified, csrf)
+    if not_modified is not None:
+        return _set_validators(not_modified, etag, last_modified)
+    response = get_response()
+    if response.status_code == 200:
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+async def aversioned_response(request, scopes, get_response):
+    """Асинхронный вариант versioned_response(): get_response — корутинная функция."""
+    if scopes is None or request.method not in ("GET", "HEAD"):
+        return await get_response()
+    versions, last_modified = await aget_version_stamp(set(scopes) | {ACADEMICS_SCOPE})
+    etag, not_modified = _conditional(request, versions, last_modified, csrf=False)
+    if not_modified is not None:
+        return _set_validators(not_modified, etag, last_modified)
+    response = await get_response()
+    if response.status_code == 200:
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+def condition_on_versions(get_scopes):
+    """
+    Декоратор HTML-представления: условный GET по версиям областей.
+
+    Секрет CSRF создаётся до сравнения ETag, чтобы первый ответ и
+    последующие запросы с уже выданной cookie давали одинаковый ETag.
+
+    Аргументы:
+        get_scopes (Callable): get_scopes(request, *args, **kwargs) возвращает
+            области, от которых зависит ответ, или None.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            get_token(request)
+            return versioned_response(
+                request, get_scopes(request, *args, **kwargs), lambda: view(request, *args, **kwargs), csrf=True,
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,217 @@
+import itertools
+from datetime import date
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.platypus import Paragraph, Spacer
+
+from journal.models import GradeRecord, AttendanceRecord
+from . import pdf
+from .aggregates import class_grade_stats, class_grade_notes, student_grade_stats
+from .attendance import class_attendance_totals, student_attendance_stats
+from .matrix import STATUS_LEGEND, attendance_matrix
+from .pdf import Column, ReportTable
+
+CLASS_REPORT_COLUMNS = [
+    Column("Ученик", 130, lambda row: f"{row['student'].last_name} {row['student'].first_name}", wrap=True),
+    Column("Средний балл", 70, lambda row: row['average'], align="CENTER"),
+    Column("Кол-во оценок", 80, lambda row: row['count'], align="CENTER"),
+    Column("Комментарий", 200, lambda row: row['notes'], wrap=True),
+]
+
+STUDENT_REPORT_COLUMNS = [
+    Column("Предмет", 70, lambda g: g.lesson.subject.name, wrap=True),
+    Column("Класс", 50, lambda g: g.lesson.classroom),
+    Column("Тема урока", 100, lambda g: g.lesson.topic, wrap=True),
+    Column("Оценка", 50, lambda g: g.value, align="RIGHT"),
+    Column("Макс. балл", 50, lambda g: g.max_value, align="RIGHT"),
+    Column("Дата", 60, lambda g: g.date.strftime("%d.%m.%Y")),
+    Column("Комментарий", 120, lambda g: g.note, wrap=True),
+]
+
+ATTENDANCE_STATUS_LABELS = dict(AttendanceRecord.Status.choices)
+
+# Итоги посещаемости по ученикам — строки из attendance.student_attendance_stats().
+ATTENDANCE_SUMMARY_COLUMNS = [
+    Column("Ученик", 150, lambda r: f"{r['student'].last_name} {r['student'].first_name}", wrap=True),
+    Column("Был", 50, lambda r: r['present'], align="CENTER"),
+    Column("Опоздал", 55, lambda r: r['late'], align="CENTER"),
+    Column("Отсутствовал", 75, lambda r: r['absent'], align="CENTER"),
+    Column("Посещаемость, %", 90, lambda r: r['rate'], align="CENTER"),
+    Column("Макс. серия пропусков", 90, lambda r: r['absence_streak'], align="CENTER"),
+]
+
+# Строки отчёта о посещаемости — кортежи из values_list (см. class_attendance_report_pdf).
+ATTENDANCE_REPORT_COLUMNS = [
+    Column("Ученик", 120, lambda r: f"{r[0]} {r[1]}", wrap=True),
+    Column("Дата", 70, lambda r: r[2].strftime('%d.%m.%Y')),
+    Column("Предмет", 100, lambda r: f"{r[3]} ({r[4]})", wrap=True),
+    Column("Статус", 70, lambda r: ATTENDANCE_STATUS_LABELS.get(r[5], '—')),
+    Column("Комментарий", 150, lambda r: r[6], wrap=True),
+]
+
+# Ширина колонки ученика и колонки урока в матрице посещаемости, пункты.
+MATRIX_STUDENT_WIDTH = 130
+MATRIX_LESSON_WIDTH = 22
+
+# Подсветка ячеек матрицы посещаемости по статусам.
+MATRIX_STATUS_COLORS = {
+    AttendanceRecord.Status.ABSENT: colors.HexColor("#f8d7da"),
+    AttendanceRecord.Status.LATE: colors.HexColor("#fff3cd"),
+}
+
+# Размер пачки строк, читаемых из базы при потоковом построении.
+ITERATOR_CHUNK_SIZE = 2000
+
+
+def class_report_pdf(classroom, report_date, output, start_date=None, end_date=None, subject=None):
+    """
+    Строит PDF-отчёт по успеваемости класса.
+
+    Аргументы:
+        classroom (ClassRoom): класс.
+        report_date (date): дата формирования, печатается в шапке.
+        output (BinaryIO): файл, в который записывается PDF.
+        start_date, end_date, subject: фильтры оценок, см. aggregates.grade_filter().
+    """
+    filters = {'start_date': start_date, 'end_date': end_date, 'subject': subject}
+    student_data = class_grade_stats(classroom, **filters)
+    notes = class_grade_notes(classroom, **filters)
+    for row in student_data:
+        row['notes'] = ", ".join(notes.get(row['student'].id, []))
+
+    table = ReportTable(CLASS_REPORT_COLUMNS, student_data)
+    pdf.render(pdf.header(f"Отчёт по классу {classroom}", report_date) + [table.flowable()], output)
+
+
+def student_report_pdf(student, report_date, output):
+    """
+    Строит PDF-отчёт по оценкам конкретного ученика.
+
+    Аргументы:
+        student (User): ученик.
+        report_date (date): дата формирования, печатается в шапке.
+        output (BinaryIO): файл, в который записывается PDF.
+    """
+    grades = GradeRecord.objects.filter(student=student).select_related('lesson__subject', 'lesson__classroom')
+    stats = student_grade_stats(student)
+
+    avg = stats['average'] if stats['average'] is not None else "-"
+    table = ReportTable(
+        STUDENT_REPORT_COLUMNS, grades,
+        footer=["Средний балл", "", "", "", "", "", avg],
+        style=[("SPAN", (0, -1), (5, -1))],
+    )
+    elements = pdf.header("Отчёт об успеваемости ученика", report_date, date_label="Дата формирования")
+    pdf.render(elements + [table.flowable()], output)
+
+
+def class_attendance_report_pdf(classroom, report_date, output):
+    """
+    Строит PDF-отчёт по посещаемости класса в потоковом режиме.
+
+    В начале отчёта — итоги по ученикам из дневных сводок посещаемости
+    (процент посещаемости, опоздания, самая длинная серия пропусков).
+
+    Записи читаются из базы итератором (values_list, без создания моделей),
+    таблица собирается частями по pdf.STREAM_CHUNK_ROWS строк и сразу
+    размещается на страницах, поэтому расход памяти не зависит от числа
+    записей.
+
+    Аргументы:
+        classroom (ClassRoom): класс.
+        report_date (date): дата формирования, печатается в шапке.
+        output (BinaryIO): файл, в который записывается PDF.
+    """
+    records = (
+        AttendanceRecord.objects
+        .filter(student__enrollments__classroom=classroom)
+        .order_by('lesson__date', 'student__last_name', 'student__first_name', 'id')
+        .values_list(
+            'student__last_name', 'student__first_name', 'lesson__date',
+            'lesson__subject__name', 'lesson__subject__code', 'status', 'comment',
+        )
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+
+    totals = class_attendance_totals(classroom)
+    summary = ReportTable(
+        ATTENDANCE_SUMMARY_COLUMNS, student_attendance_stats(classroom),
+        footer=["Итого по классу", totals['present'], totals['late'], totals['absent'], totals['rate'], ""],
+    )
+    table = ReportTable(ATTENDANCE_REPORT_COLUMNS, records)
+    elements = pdf.header(f"Отчёт по посещаемости класса {classroom}", report_date)
+    elements += [summary.flowable(), Spacer(1, 20)]
+    pdf.render(itertools.chain(elements, table.flowables()), output)
+
+
+def _matrix_table(matrix, start, stop):
+    """Строит таблицу матрицы посещаемости для уроков с индексами [start, stop)."""
+    columns = [Column("Ученик", MATRIX_STUDENT_WIDTH, lambda r: f"{r[0][1]} {r[0][2]}", wrap=True)]
+    for index in range(start, stop):
+        day = matrix.lessons[index][1]
+        columns.append(Column(day.strftime("%d.%m"), MATRIX_LESSON_WIDTH,
+                              lambda r, i=index: r[1][i], align="CENTER"))
+
+    style = [("FONTSIZE", (1, 0), (-1, 0), 6), ("LEFTPADDING", (1, 0), (-1, -1), 1),
+             ("RIGHTPADDING", (1, 0), (-1, -1), 1)]
+    for row_index, codes in enumerate(matrix.rows, start=1):
+        for column_index, code in enumerate(codes[start:stop], start=1):
+            if code in MATRIX_STATUS_COLORS:
+                cell = (column_index, row_index)
+                style.append(("BACKGROUND", cell, cell, MATRIX_STATUS_COLORS[code]))
+    return ReportTable(columns, list(matrix), style=style).flowable()
+
+
+def class_attendance_matrix_pdf(classroom, report_date, output, start_date=None, end_date=None, subject=None):
+    """
+    Строит PDF с матрицей посещаемости класса (ученики × уроки) на листах A4 в альбомной ориентации.
+
+    Если уроков больше, чем помещается по ширине листа, матрица делится на
+    несколько таблиц по колонкам.
+
+    Аргументы:
+        classroom (ClassRoom): класс.
+        report_date (date): дата формирования, печатается в шапке.
+        output (BinaryIO): файл, в который записывается PDF.
+        start_date, end_date, subject: фильтры, см. matrix.attendance_matrix().
+    """
+    matrix = attendance_matrix(classroom, start_date, end_date, subject)
+    pagesize = landscape(A4)
+    page_width = pagesize[0] - pdf.PAGE_MARGINS["leftMargin"] - pdf.PAGE_MARGINS["rightMargin"]
+    per_table = max(1, int((page_width - MATRIX_STUDENT_WIDTH) // MATRIX_LESSON_WIDTH))
+
+    legend = ", ".join(f"{code} — {label}" for code, label in STATUS_LEGEND.items())
+    elements = pdf.header(f"Матрица посещаемости класса {classroom}", report_date)
+    elements += [Paragraph(f"Обозначения: {legend}", pdf.NORMAL_STYLE), Spacer(1, 12)]
+    if not matrix.lessons:
+        elements.append(Paragraph("Отметок посещаемости за период нет.", pdf.NORMAL_STYLE))
+    for start in range(0, len(matrix.lessons), per_table):
+        elements += [_matrix_table(matrix, start, min(start + per_table, len(matrix.lessons))), Spacer(1, 16)]
+    pdf.render(elements, output, pagesize=pagesize)
+
+
+def render_report(kind, obj, params, output):
+    """
+    Строит PDF-отчёт указанного типа по сохранённым параметрам.
+
+    Используется и представлениями, и фоновым обработчиком заданий (reports.jobs).
+
+    Аргументы:
+        kind (str): тип отчёта — 'class', 'student', 'attendance' или 'attendance_matrix'.
+        obj (ClassRoom | User): класс или ученик.
+        params (dict): параметры построения: 'date' (ISO) и фильтры оценок.
+        output (BinaryIO): файл, в который записывается PDF.
+    """
+    report_date = date.fromisoformat(params['date'])
+    if kind == 'class':
+        filters = {key: params.get(key) for key in ('start_date', 'end_date', 'subject')}
+        return class_report_pdf(obj, report_date, output, **filters)
+    if kind == 'student':
+        return student_report_pdf(obj, report_date, output)
+    if kind == 'attendance':
+        return class_attendance_report_pdf(obj, report_date, output)
+    if kind == 'attendance_matrix':
+        filters = {key: params.get(key) for key in ('start_date', 'end_date', 'subject')}
+        return class_attendance_matrix_pdf(obj, report_date, output, **filters)
+    raise ValueError(f"Неизвестный тип отчёта: {kind}")
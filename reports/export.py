@@ -0,0 +1,207 @@
+"""
+Выгрузка отчётов всех классов школы одним ZIP-архивом.
+
+PDF-отчёты по успеваемости и посещаемости каждого класса строятся в пуле
+процессов (reports.workers) и сохраняются в кэш отчётов; главный процесс
+добавляет каждый готовый отчёт в архив сразу по завершении, не дожидаясь
+остальных, и отдаёт архив частями (reports.zipstream).
+"""
+import os
+import time
+from concurrent.futures import as_completed
+
+from academics.models import ClassRoom
+from . import documents
+from .cache import get_report_cache, render_to_tempfile
+from .models import ReportJob
+from .versioning import classroom_scope
+from .workers import make_process_pool, run_export_report
+from .zipstream import StreamingZip
+
+# Отчёты, выгружаемые для каждого класса, и шаблоны имён файлов в архиве.
+EXPORT_REPORTS = (
+    (ReportJob.Kind.CLASS, "class_report_{classroom}.pdf"),
+    (ReportJob.Kind.ATTENDANCE, "attendance_report_{classroom}.pdf"),
+)
+
+
+def export_params(kind, date):
+    """
+    Параметры построения отчёта — те же, что у представлений без фильтров,
+    поэтому выгрузка и отдельные отчёты пользуются общими записями кэша.
+    """
+    params = {'date': date}
+    if kind == ReportJob.Kind.CLASS:
+        params.update(start_date=None, end_date=None, subject=None)
+    return params
+
+
+def export_tasks(date):
+    """
+    Составляет список отчётов для выгрузки: по два на каждый класс.
+
+    Возвращает:
+        list[dict]: тип отчёта, id класса, параметры и путь файла в архиве.
+    """
+    tasks = []
+    for classroom in ClassRoom.objects.all():
+        for kind, filename in EXPORT_REPORTS:
+            tasks.append({
+                'kind': kind,
+                'object_id': classroom.pk,
+                'params': export_params(kind, date),
+                'arcname': f"{classroom}/{filename.format(classroom=classroom)}",
+            })
+    return tasks
+
+
+def render_cached_report(kind, object_id, params):
+    """
+    Строит отчёт класса в кэш отчётов, если его там ещё нет.
+
+    Выполняется в процессе пула (см. reports.workers.run_export_report).
+
+    Возвращает:
+        dict: ключ отчёта в кэше, признак попадания в кэш, pid процесса и время, секунды.
+    """
+    started = time.perf_counter()
+    report_cache = get_report_cache()
+    key = report_cache.make_key(kind, object_id, [classroom_scope(object_id)], params)
+    cached = report_cache.store.exists(key)
+    if not cached:
+        classroom = ClassRoom.objects.get(pk=object_id)
+        with render_to_tempfile(lambda output: documents.render_report(kind, classroom, params, output)) as spool:
+            report_cache.store.save(key, spool)
+    return {'key': key, 'cached': cached, 'pid': os.getpid(), 'seconds': time.perf_counter() - started}
+
+
+def _open_report(report_cache, task, key):
+    """
+    Открывает построенный отчёт из кэша.
+
+    Если файла там нет (вытеснен или кэш локален для процесса пула, как LocMemCache),
+    отчёт строится заново в текущем процессе.
+    """
+    fh = report_cache.store.open(key)
+    if fh is not None:
+        return fh
+    classroom = ClassRoom.objects.get(pk=task['object_id'])
+    return report_cache.get_or_render(
+        key, lambda output: documents.render_report(task['kind'], classroom, task['params'], output)
+    )
+
+
+class ExportStats:
+    """
+    Ход выгрузки и сводка времени построения по процессам пула.
+
+    Атрибуты:
+        processes (int): размер пула.
+        total (int): всего отчётов.
+        done (int): обработано отчётов (включая ошибки).
+        cached (int): взято из кэша без построения.
+        workers (dict[int, dict]): по pid — число отчётов, суммарное и максимальное время.
+        errors (list[str]): описания ошибок.
+    """
+
+    def __init__(self, processes, total):
+        self.processes = processes
+        self.total = total
+        self.done = 0
+        self.cached = 0
+        self.workers = {}
+        self.errors = []
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        """Время с начала выгрузки, секунды."""
+        return time.perf_counter() - self.started
+
+    def add(self, result):
+        """Учитывает отчёт, построенный процессом пула."""
+        self.done += 1
+        self.cached += result['cached']
+        worker = self.workers.setdefault(result['pid'], {'reports': 0, 'seconds': 0.0, 'max': 0.0})
+        worker['reports'] += 1
+        worker['seconds'] += result['seconds']
+        worker['max'] = max(worker['max'], result['seconds'])
+
+    def add_error(self, task, exc):
+        """Учитывает отчёт, который не удалось построить."""
+        self.done += 1
+        self.errors.append(f"{task['arcname']}: {type(exc).__name__}: {exc}")
+
+    def summary(self):
+        """
+        Возвращает текстовую сводку: общее время, загрузку пула и время по процессам.
+
+        По загрузке видно, упирается ли выгрузка в число процессов
+        (загрузка близка к 100%) или в главный процесс и базу данных.
+        """
+        elapsed = self.elapsed
+        busy = sum(worker['seconds'] for worker in self.workers.values())
+        lines = [
+            f"Отчётов: {self.done} из {self.total}, из кэша: {self.cached}, ошибок: {len(self.errors)}",
+            f"Время выгрузки: {elapsed:.1f} с, процессов: {self.processes}, "
+            f"загрузка пула: {busy / (elapsed * self.processes or 1):.0%}",
+            "",
+            f"{'процесс':>8} | {'отчётов':>7} | {'всего, с':>8} | {'среднее, с':>10} | {'макс., с':>8}",
+        ]
+        for pid, worker in sorted(self.workers.items()):
+            lines.append(
+                f"{pid:>8} | {worker['reports']:>7} | {worker['seconds']:>8.2f} | "
+                f"{worker['seconds'] / worker['reports']:>10.2f} | {worker['max']:>8.2f}"
+            )
+        if self.errors:
+            lines += ["", "Ошибки:"] + self.errors
+        return "\n".join(lines) + "\n"
+
+
+def export_archive(date, processes, progress=None):
+    """
+    Строит отчёты всех классов в пуле процессов и отдаёт ZIP-архив частями.
+
+    Отчёты попадают в архив в порядке завершения. Ошибка построения одного
+    отчёта не прерывает выгрузку — она попадает в сводку summary.txt,
+    которая добавляется в конец архива.
+
+    Аргументы:
+        date (str): дата формирования в формате ISO, входит в ключи кэша.
+        processes (int): размер пула процессов.
+        progress (Callable[[ExportStats, dict], None] | None): вызывается после
+            каждого отчёта; в задаче есть 'result' или 'error'.
+
+    Возвращает:
+        Iterator[bytes]: части ZIP-архива.
+    """
+    tasks = export_tasks(date)
+    report_cache = get_report_cache()
+    stats = ExportStats(processes, len(tasks))
+    archive = StreamingZip()
+
+    pool = make_process_pool(processes)
+    try:
+        futures = {
+            pool.submit(run_export_report, task['kind'], task['object_id'], task['params']): task
+            for task in tasks
+        }
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                task['result'] = future.result()
+                fh = _open_report(report_cache, task, task['result']['key'])
+            except Exception as exc:
+                task['error'] = exc
+                stats.add_error(task, exc)
+            else:
+                with fh:
+                    yield from archive.write_file(task['arcname'], fh)
+                stats.add(task['result'])
+            if progress is not None:
+                progress(stats, task)
+
+        yield from archive.write("summary.txt", [stats.summary().encode("utf-8")])
+        yield archive.close()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,26 @@
+from django import forms
+
+
+class PeriodForm(forms.Form):
+    """Период отчёта (параметры GET-запроса); обе границы необязательны и включаются в период."""
+
+    start_date = forms.DateField(required=False, label="С даты")
+    end_date = forms.DateField(required=False, label="По дату")
+
+
+class ExportFilterForm(PeriodForm):
+    """
+    Фильтры табличной выгрузки оценок и посещаемости (параметры GET-запроса).
+
+    Все поля необязательны; период задаётся по дате урока.
+    """
+
+    classroom = forms.IntegerField(required=False, min_value=1, label="Класс")
+    subject = forms.IntegerField(required=False, min_value=1, label="Предмет")
+    teacher = forms.IntegerField(required=False, min_value=1, label="Учитель")
+
+
+class MatrixFilterForm(PeriodForm):
+    """Фильтры матрицы посещаемости: период и предмет."""
+
+    subject = forms.IntegerField(required=False, min_value=1, label="Предмет")
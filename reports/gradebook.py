@@ -0,0 +1,155 @@
+"""
+Журнал класса: строки — ученики, колонки — уроки предмета за период,
+в ячейках — оценка, максимальный балл и статус посещаемости.
+
+Журнал строится двумя запросами: уроки класса и одно объединение (UNION ALL)
+зачислений, оценок и отметок этих уроков. Ячейки хранятся плотными
+массивами по ученикам, а готовый журнал кэшируется по версиям класса
+(см. reports.versioning): любое изменение оценок, отметок, зачислений
+или уроков даёт новый ключ.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import BigIntegerField, CharField, DecimalField, Value
+
+from academics.models import Enrollment, Lesson
+from journal.models import AttendanceRecord, GradeRecord
+from .matrix import NO_MARK, STATUS_LEGEND
+from .versioning import ACADEMICS_SCOPE, classroom_scope, get_versions
+
+CACHE_PREFIX = "reports:gradebook:"
+
+
+def _null(field):
+    return Value(None, output_field=field)
+
+
+class Gradebook:
+    """
+    Журнал класса.
+
+    Атрибуты:
+        lessons (list[tuple]): уроки (id, дата, тема) в порядке дат.
+        students (list[tuple]): ученики (id, фамилия, имя) в порядке фамилий.
+        values (list[list]): для каждого ученика — оценки по урокам (None — нет оценки).
+        max_values (list[list]): максимальные баллы этих оценок.
+        attendance (list[str]): для каждого ученика — строка кодов статусов по урокам.
+    """
+
+    def __init__(self, lessons, students, values, max_values, attendance):
+        self.lessons = lessons
+        self.students = students
+        self.values = values
+        self.max_values = max_values
+        self.attendance = attendance
+
+    def to_dict(self):
+        """Представляет журнал столбцами и плотными массивами для JSON-ответа."""
+        return {
+            "lessons": {
+                "id": [lesson_id for lesson_id, _, _ in self.lessons],
+                "date": [day.isoformat() for _, day, _ in self.lessons],
+                "topic": [topic for _, _, topic in self.lessons],
+            },
+            "students": {
+                "id": [student_id for student_id, _, _ in self.students],
+                "name": [f"{last_name} {first_name}" for _, last_name, first_name in self.students],
+            },
+            "values": self.values,
+            "max_values": self.max_values,
+            "attendance": self.attendance,
+            "legend": {**STATUS_LEGEND, NO_MARK: "Нет отметки"},
+        }
+
+
+def gradebook(classroom, start_date=None, end_date=None, subject=None):
+    """
+    Строит журнал класса двумя запросами.
+
+    В строки попадают зачисленные в класс ученики и ученики, у которых есть
+    оценки или отметки на уроках журнала.
+
+    Аргументы:
+        classroom (ClassRoom): класс.
+        start_date, end_date (date | None): период по дате урока.
+        subject (int | None): идентификатор предмета.
+
+    Возвращает:
+        Gradebook: журнал класса.
+    """
+    lessons = Lesson.objects.filter(classroom=classroom)
+    if start_date:
+        lessons = lessons.filter(date__gte=start_date)
+    if end_date:
+        lessons = lessons.filter(date__lte=end_date)
+    if subject:
+        lessons = lessons.filter(subject_id=subject)
+    lesson_list = list(lessons.order_by("date", "id").values_list("id", "date", "topic"))
+    lesson_ids = [lesson_id for lesson_id, _, _ in lesson_list]
+
+    decimal = DecimalField(max_digits=5, decimal_places=2)
+    names = ("student__last_name", "student__first_name")
+    grades = GradeRecord.objects.filter(lesson_id__in=lesson_ids).order_by().values_list(
+        "student_id", *names, "lesson_id", "value", "max_value", _null(CharField()),
+    )
+    marks = AttendanceRecord.objects.filter(lesson_id__in=lesson_ids).order_by().values_list(
+        "student_id", *names, "lesson_id", _null(decimal), _null(decimal), "status",
+    )
+    enrolled = Enrollment.objects.filter(classroom=classroom).order_by().values_list(
+        "student_id", *names, _null(BigIntegerField()), _null(decimal), _null(decimal), _null(CharField()),
+    )
+    # Оценки — первая часть: типы столбцов объединения берутся из её полей модели,
+    # и Django не прогоняет каждую строку через преобразователи выражений Value.
+    rows = grades.union(marks, enrolled, all=True) if lesson_ids else enrolled
+
+    students = {}
+    cells = []
+    for student_id, last_name, first_name, lesson_id, value, max_value, status in rows:
+        students[student_id] = (student_id, last_name, first_name)
+        if lesson_id is not None:
+            cells.append((student_id, lesson_id, value, max_value, status))
+
+    student_list = sorted(students.values(), key=lambda student: (student[1], student[2], student[0]))
+    row = {student[0]: index for index, student in enumerate(student_list)}
+    column = {lesson_id: index for index, lesson_id in enumerate(lesson_ids)}
+    values = [[None] * len(lesson_ids) for _ in student_list]
+    max_values = [[None] * len(lesson_ids) for _ in student_list]
+    attendance = [bytearray(NO_MARK * len(lesson_ids), "ascii") for _ in student_list]
+    for student_id, lesson_id, value, max_value, status in cells:
+        index, position = row[student_id], column[lesson_id]
+        if status is None:
+            values[index][position] = value
+            max_values[index][position] = max_value
+        else:
+            attendance[index][position] = ord(status)
+
+    return Gradebook(lesson_list, student_list, values, max_values, [codes.decode("ascii") for codes in attendance])
+
+
+def cached_gradebook(classroom, **filters):
+    """
+    Возвращает журнал класса в виде словаря из кэша или строит его.
+
+    Ключ — версии области класса и справочников и фильтры, поэтому после
+    изменения данных класса старая запись просто перестаёт находиться.
+
+    Аргументы:
+        classroom (ClassRoom): класс.
+        **filters: start_date, end_date, subject — см. gradebook().
+
+    Возвращает:
+        dict: результат Gradebook.to_dict().
+    """
+    versions = get_versions({classroom_scope(classroom.pk), ACADEMICS_SCOPE})
+    payload = json.dumps([classroom.pk, sorted(versions.items()), filters], sort_keys=True, default=str)
+    key = CACHE_PREFIX + hashlib.sha256(payload.encode()).hexdigest()
+
+    cache = caches[settings.REPORTS_CACHE_ALIAS]
+    data = cache.get(key)
+    if data is None:
+        data = gradebook(classroom, **filters).to_dict()
+        cache.set(key, data, timeout=settings.REPORTS_GRADEBOOK_CACHE_TTL)
+    return data
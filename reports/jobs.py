@@ -0,0 +1,211 @@
+import os
+import socket
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.urls import reverse
+from django.utils import timezone
+
+from academics.models import ClassRoom
+from accounts.models import User
+from . import documents
+from .cache import get_report_cache, render_to_tempfile
+from .models import ReportJob
+
+REPORT_MODELS = {
+    ReportJob.Kind.CLASS: ClassRoom,
+    ReportJob.Kind.ATTENDANCE: ClassRoom,
+    ReportJob.Kind.ATTENDANCE_MATRIX: ClassRoom,
+    ReportJob.Kind.STUDENT: User,
+}
+
+# Сколько раз enqueue_report() повторяет поиск после конфликта с параллельным запросом.
+ENQUEUE_ATTEMPTS = 3
+
+
+def enqueue_report(kind, object_id, cache_key, params, filename, user):
+    """
+    Ставит построение отчёта в очередь или присоединяется к существующему заданию.
+
+    Если задание с тем же ключом отчёта уже ожидает или выполняется, возвращается оно.
+    Если отчёт с этим ключом уже построен и лежит в кэше, возвращается завершённое задание.
+
+    Аргументы:
+        kind (str): тип отчёта, см. ReportJob.Kind.
+        object_id (int): идентификатор класса или ученика.
+        cache_key (str): ключ отчёта из ReportCache.make_key().
+        params (dict): параметры построения.
+        filename (str): имя файла для скачивания.
+        user (User): пользователь, запросивший отчёт.
+
+    Возвращает:
+        ReportJob: задание на построение отчёта.
+    """
+    for _ in range(ENQUEUE_ATTEMPTS):
+        job = _existing_job(cache_key)
+        if job is not None:
+            return job
+        try:
+            with transaction.atomic():
+                return ReportJob.objects.create(
+                    kind=kind,
+                    object_id=object_id,
+                    params=params,
+                    cache_key=cache_key,
+                    filename=filename,
+                    requested_by=user,
+                )
+        except IntegrityError:
+            # Параллельный запрос успел создать задание с тем же ключом; к этому
+            # времени оно может быть уже завершено, поэтому поиск повторяется.
+            continue
+    return ReportJob.objects.filter(cache_key=cache_key).order_by('-created_at').first()
+
+
+def _existing_job(cache_key):
+    """Возвращает активное задание с ключом или завершённое, чей отчёт лежит в кэше."""
+    active = ReportJob.objects.filter(cache_key=cache_key, status__in=ReportJob.ACTIVE_STATUSES).first()
+    if active is not None:
+        return active
+    done = (
+        ReportJob.objects
+        .filter(cache_key=cache_key, status=ReportJob.Status.DONE)
+        .order_by('-finished_at')
+        .first()
+    )
+    if done is not None and get_report_cache().store.exists(cache_key):
+        return done
+    return None
+
+
+def worker_name():
+    """Возвращает имя текущего обработчика заданий: хост и pid процесса."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_jobs(limit, worker):
+    """
+    Забирает из очереди до `limit` ожидающих заданий и помечает их выполняющимися.
+
+    Используется SELECT ... FOR UPDATE SKIP LOCKED, поэтому несколько обработчиков
+    могут работать с одной очередью, не получая одно задание дважды.
+
+    Аргументы:
+        limit (int): сколько заданий забрать.
+        worker (str): имя обработчика, см. worker_name().
+
+    Возвращает:
+        list[int]: идентификаторы захваченных заданий.
+    """
+    with transaction.atomic():
+        job_ids = list(
+            ReportJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=ReportJob.Status.PENDING)
+            .order_by('created_at')
+            .values_list('id', flat=True)[:limit]
+        )
+        if job_ids:
+            now = timezone.now()
+            ReportJob.objects.filter(id__in=job_ids).update(
+                status=ReportJob.Status.RUNNING,
+                started_at=now,
+                worker=worker,
+                heartbeat_at=now,
+            )
+    return job_ids
+
+
+def send_heartbeat(job_ids, worker):
+    """
+    Отмечает, что обработчик ещё выполняет свои задания.
+
+    Аргументы:
+        job_ids (Iterable[int]): выполняемые задания.
+        worker (str): имя обработчика.
+
+    Возвращает:
+        int: количество заданий, которые всё ещё числятся за обработчиком.
+    """
+    return ReportJob.objects.filter(
+        id__in=list(job_ids), status=ReportJob.Status.RUNNING, worker=worker,
+    ).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale_jobs(max_age, exclude=()):
+    """
+    Возвращает в очередь задания, обработчик которых не подавал сигнала
+    дольше `max_age` (например, после его аварийного завершения).
+
+    Аргументы:
+        max_age (timedelta): допустимое время без сигнала обработчика.
+        exclude (Iterable[int]): задания, которые вызывающий обработчик ещё выполняет.
+
+    Возвращает:
+        int: количество возвращённых в очередь заданий.
+    """
+    deadline = timezone.now() - max_age
+    return ReportJob.objects.filter(
+        # Задания, захваченные до появления сигналов, проверяются по времени начала.
+        Q(heartbeat_at__lt=deadline) | Q(heartbeat_at__isnull=True, started_at__lt=deadline),
+        status=ReportJob.Status.RUNNING,
+    ).exclude(id__in=list(exclude)).update(
+        status=ReportJob.Status.PENDING, started_at=None, worker='', heartbeat_at=None,
+    )
+
+
+def execute_job(job_id, worker):
+    """
+    Строит отчёт по заданию и сохраняет его в кэш отчётов.
+
+    Итог записывается, только если задание всё ещё числится за этим
+    обработчиком: задание, возвращённое в очередь и захваченное другим
+    обработчиком, не помечается завершённым дважды.
+
+    Аргументы:
+        job_id (int): идентификатор задания.
+        worker (str): имя обработчика, захватившего задание.
+
+    Возвращает:
+        bool: True, если отчёт построен и итог записан.
+    """
+    job = ReportJob.objects.get(pk=job_id)
+    mine = ReportJob.objects.filter(pk=job_id, status=ReportJob.Status.RUNNING, worker=worker)
+    try:
+        obj = REPORT_MODELS[job.kind].objects.get(pk=job.object_id)
+        with render_to_tempfile(lambda output: documents.render_report(job.kind, obj, job.params, output)) as spool:
+            get_report_cache().store.save(job.cache_key, spool)
+    except Exception as exc:
+        mine.update(
+            status=ReportJob.Status.FAILED,
+            error=f"{type(exc).__name__}: {exc}",
+            finished_at=timezone.now(),
+        )
+        return False
+
+    return mine.update(status=ReportJob.Status.DONE, finished_at=timezone.now()) == 1
+
+
+def job_payload(job):
+    """
+    Представляет задание в виде словаря для JSON-ответа.
+
+    Возвращает:
+        dict: id, тип, статус, время и ссылки на статус и скачивание.
+    """
+    payload = {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'status_url': reverse('reports:job_status', args=[job.pk]),
+        'download_url': None,
+    }
+    if job.status == ReportJob.Status.DONE:
+        payload['download_url'] = reverse('reports:job_download', args=[job.pk])
+    if job.status == ReportJob.Status.FAILED:
+        payload['error'] = job.error
+    return payload
+
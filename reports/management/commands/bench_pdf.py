@@ -0,0 +1,121 @@
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+from io import BytesIO
+
+from django.core.management.base import BaseCommand
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+from reports import pdf
+from reports.pdf import Column, ReportTable
+
+STATUSES = ("Был", "Отсутствовал", "Опоздал")
+
+COLUMNS = [
+    Column("Ученик", 120, lambda r: r[0], wrap=True),
+    Column("Дата", 70, lambda r: r[1]),
+    Column("Предмет", 100, lambda r: r[2], wrap=True),
+    Column("Статус", 70, lambda r: r[3]),
+    Column("Комментарий", 150, lambda r: r[4], wrap=True),
+]
+
+
+def sample_rows(count):
+    """Синтетические строки отчёта о посещаемости (без обращения к базе данных)."""
+    start = date(2025, 9, 1)
+    return [
+        (
+            f"Фамилия{i % 35} Имя{i % 35}",
+            (start + timedelta(days=i // 35)).strftime("%d.%m.%Y"),
+            "Математика (MATEMATI-1A2B)",
+            STATUSES[i % 3],
+            "Уважительная причина, справка от врача" if i % 17 == 0 else "-",
+        )
+        for i in range(count)
+    ]
+
+
+def render_legacy(rows):
+    """Прежний способ: регистрация шрифта, стили и Paragraph в каждой ячейке на каждый запрос."""
+    buffer = BytesIO()
+    font_path = pdf.FONT_PATH
+    pdfmetrics.registerFont(TTFont("DejaVuSans", font_path))
+    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=40, bottomMargin=30)
+
+    styles = getSampleStyleSheet()
+    normal_style = ParagraphStyle('Normal', parent=styles['Normal'], fontName='DejaVuSans', fontSize=10, leading=12)
+    elements = [
+        Paragraph("<b>Отчёт по посещаемости класса</b>", ParagraphStyle('Title', fontName='DejaVuSans', fontSize=16)),
+        Spacer(1, 12),
+    ]
+    data = [[Paragraph(f"<b>{column.title}</b>", normal_style) for column in COLUMNS]]
+    for row in rows:
+        data.append([Paragraph(str(cell), normal_style) for cell in row])
+
+    table = Table(data, colWidths=[column.width for column in COLUMNS])
+    table.setStyle(TableStyle([
+        ('FONT', (0, 0), (-1, -1), 'DejaVuSans'),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ]))
+    elements.append(table)
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def render_engine(rows):
+    """Новый способ: общий движок reports.pdf с декларативной таблицей."""
+    buffer = BytesIO()
+    elements = pdf.header("Отчёт по посещаемости класса", date.today())
+    pdf.render(elements + [ReportTable(COLUMNS, rows).flowable()], buffer)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    """
+    Сравнивает время построения и выделение памяти на один PDF-документ
+    для прежнего кода отчётов и движка reports.pdf.
+
+    Пример:
+        python manage.py bench_pdf --rows 200 1000 --repeat 5
+    """
+    help = "Бенчмарк построения PDF: прежний код против reports.pdf"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[35, 500, 2000],
+                            help="Размеры таблиц (строк) для замера")
+        parser.add_argument("--repeat", type=int, default=5, help="Повторов на каждый замер")
+
+    def measure(self, func, rows, repeat):
+        """Возвращает медиану времени (мс) и пик выделенной памяти (КиБ) на один документ."""
+        func(rows)  # прогрев: импорт модулей, кэши ReportLab
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func(rows)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        tracemalloc.start()
+        func(rows)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return statistics.median(timings), peak / 1024
+
+    def handle(self, *args, **options):
+        pdf.setup()
+        self.stdout.write(f"{'строк':>6} | {'вариант':<8} | {'время, мс':>10} | {'пик, КиБ':>10}")
+        for count in options["rows"]:
+            rows = sample_rows(count)
+            results = {}
+            for name, func in (("прежний", render_legacy), ("движок", render_engine)):
+                results[name] = self.measure(func, rows, options["repeat"])
+                elapsed, peak = results[name]
+                self.stdout.write(f"{count:>6} | {name:<8} | {elapsed:>10.1f} | {peak:>10.0f}")
+            speedup = results["прежний"][0] / results["движок"][0]
+            self.stdout.write(self.style.SUCCESS(f"{count:>6} | ускорение ×{speedup:.2f}"))
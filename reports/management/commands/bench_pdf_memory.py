@@ -0,0 +1,80 @@
+import itertools
+import multiprocessing
+import resource
+import tempfile
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from reports import pdf
+from reports.pdf import ReportTable
+from reports.management.commands.bench_pdf import COLUMNS, render_legacy, sample_rows
+
+
+def iter_sample_rows(count, batch=2000):
+    """Синтетические строки, выдаваемые пачками — как .iterator() по queryset."""
+    for offset in range(0, count, batch):
+        yield from sample_rows(min(batch, count - offset))
+
+
+def run_legacy(count):
+    """Прежний способ: вся таблица в одном Table, документ в BytesIO и копия через getvalue()."""
+    return len(render_legacy(sample_rows(count)))
+
+
+def run_streaming(count):
+    """Потоковый способ: LongTable частями по странице, запись во временный файл."""
+    elements = pdf.header("Отчёт по посещаемости класса", date.today())
+    table = ReportTable(COLUMNS, iter_sample_rows(count))
+    with tempfile.TemporaryFile() as output:
+        pdf.render(itertools.chain(elements, table.flowables()), output)
+        return output.tell()
+
+
+def measure(target, count):
+    """Выполняется в отдельном процессе: возвращает время, размер PDF и пиковый RSS (КиБ)."""
+    import django
+    django.setup()
+    pdf.setup()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    size = target(count)
+    elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return elapsed, size, baseline, peak
+
+
+class Command(BaseCommand):
+    """
+    Замеряет пиковое потребление памяти (RSS) при построении отчёта о посещаемости
+    прежним способом и в потоковом режиме reports.pdf.
+
+    Каждый замер выполняется в отдельном процессе, чтобы пиковый RSS
+    не накапливался между прогонами.
+
+    Пример:
+        python manage.py bench_pdf_memory --rows 1000 10000 30000
+    """
+    help = "Бенчмарк памяти: отчёт о посещаемости целиком против потокового режима"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 30000],
+                            help="Количество записей посещаемости")
+        parser.add_argument("--skip-legacy", action="store_true",
+                            help="Не запускать прежний способ (долго на больших объёмах)")
+
+    def handle(self, *args, **options):
+        variants = [("потоковый", run_streaming)]
+        if not options["skip_legacy"]:
+            variants.insert(0, ("прежний", run_legacy))
+
+        context = multiprocessing.get_context("spawn")
+        self.stdout.write(f"{'записей':>8} | {'вариант':<10} | {'время, с':>9} | {'PDF, КиБ':>9} | {'прирост RSS, МиБ':>16}")
+        for count in options["rows"]:
+            for name, target in variants:
+                with context.Pool(1) as pool:
+                    elapsed, size, baseline, peak = pool.apply(measure, (target, count))
+                self.stdout.write(
+                    f"{count:>8} | {name:<10} | {elapsed:>9.1f} | {size / 1024:>9.0f} | {(peak - baseline) / 1024:>16.1f}"
+                )
@@ -0,0 +1,50 @@
+import os
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from reports.export import export_archive
+
+
+class Command(BaseCommand):
+    """
+    Выгружает PDF-отчёты по успеваемости и посещаемости всех классов в один ZIP-архив.
+
+    Отчёты строятся в пуле процессов; по ходу выгрузки печатается прогресс,
+    в конце — сводка времени по процессам, по которой удобно подбирать размер пула.
+
+    Пример:
+        python manage.py export_reports --processes 4 --output reports.zip
+    """
+    help = "Выгрузка отчётов всех классов в ZIP-архив"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", help="Путь к архиву (по умолчанию reports_<дата>.zip)")
+        parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                            help="Количество процессов пула")
+
+    def progress(self, stats, task):
+        """Печатает строку о завершённом отчёте."""
+        self.stats = stats
+        prefix = f"[{stats.done}/{stats.total}] {task['arcname']}"
+        if 'error' in task:
+            self.stdout.write(self.style.ERROR(f"{prefix}: ошибка — {task['error']}"))
+            return
+        result = task['result']
+        source = "из кэша" if result['cached'] else "построен"
+        self.stdout.write(f"{prefix}: {source} за {result['seconds']:.2f} с (процесс {result['pid']})")
+
+    def handle(self, *args, **options):
+        date = timezone.localdate().isoformat()
+        output = options["output"] or f"reports_{date}.zip"
+        processes = options["processes"]
+
+        self.stats = None
+        with open(output, "wb") as fh:
+            for chunk in export_archive(date, processes, progress=self.progress):
+                fh.write(chunk)
+
+        if self.stats is not None:
+            self.stdout.write("")
+            self.stdout.write(self.stats.summary())
+        self.stdout.write(self.style.SUCCESS(f"Архив сохранён: {output} ({os.path.getsize(output)} байт)"))
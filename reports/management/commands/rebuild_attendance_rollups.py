@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from reports.attendance import rebuild_attendance_rollups
+
+
+class Command(BaseCommand):
+    """
+    Пересоздаёт дневные сводки посещаемости учеников и классов по всем отметкам.
+
+    Нужна для первичного заполнения и для исправления сводок после
+    изменения отметок в обход сигналов (QuerySet.update(), загрузка фикстур).
+
+    Пример:
+        python manage.py rebuild_attendance_rollups
+    """
+    help = "Пересоздаёт дневные сводки посещаемости"
+
+    def handle(self, *args, **options):
+        students, classes = rebuild_attendance_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Сводок создано: учеников — {students}, классов — {classes}"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from reports.summaries import rebuild_grade_summaries
+
+
+class Command(BaseCommand):
+    """
+    Пересоздаёт сводки оценок GradeSummary по всем оценкам.
+
+    Нужна для первичного заполнения и для исправления сводок после
+    изменения оценок в обход сигналов (QuerySet.update(), загрузка фикстур).
+
+    Пример:
+        python manage.py rebuild_grade_summaries
+    """
+    help = "Пересоздаёт сводки оценок по ученикам, предметам и четвертям"
+
+    def handle(self, *args, **options):
+        created = rebuild_grade_summaries()
+        self.stdout.write(self.style.SUCCESS(f"Сводок создано: {created}"))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from reports.search import rebuild_search_entries
+
+
+class Command(BaseCommand):
+    """
+    Пересоздаёт поисковые записи всех учеников.
+
+    Нужна после изменения правил нормализации и транслитерации, а также
+    после изменения пользователей в обход сигналов (QuerySet.update(), загрузка фикстур).
+
+    Пример:
+        python manage.py rebuild_student_search
+    """
+    help = "Пересоздаёт поисковые записи учеников"
+
+    def handle(self, *args, **options):
+        created = rebuild_search_entries()
+        self.stdout.write(self.style.SUCCESS(f"Поисковых записей создано: {created}"))
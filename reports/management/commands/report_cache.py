@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from reports.cache import get_report_cache
+
+
+class Command(BaseCommand):
+    """
+    Показывает статистику кэша PDF-отчётов и при необходимости очищает его.
+
+    Пример:
+        python manage.py report_cache --clear
+    """
+    help = "Статистика и очистка кэша PDF-отчётов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clear", action="store_true", help="Очистить кэш и сбросить счётчики")
+
+    def handle(self, *args, **options):
+        report_cache = get_report_cache()
+        if options["clear"]:
+            report_cache.clear()
+            self.stdout.write(self.style.SUCCESS("Кэш отчётов очищен."))
+        stats = report_cache.stats()
+        for name in ("hits", "misses", "entries", "bytes"):
+            self.stdout.write(f"{name}: {stats[name]}")
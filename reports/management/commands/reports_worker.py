@@ -0,0 +1,85 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from reports.jobs import claim_jobs, requeue_stale_jobs, send_heartbeat, worker_name
+from reports.workers import make_process_pool, run_report_job
+
+# Как часто (в секундах) обработчик ищет зависшие задания других обработчиков.
+REQUEUE_INTERVAL = 60
+
+# Как часто (в секундах) обработчик подтверждает, что его задания ещё выполняются.
+HEARTBEAT_INTERVAL = 15
+
+
+class Command(BaseCommand):
+    """
+    Обработчик очереди заданий на построение PDF-отчётов.
+
+    Забирает задания из таблицы ReportJob и строит отчёты в пуле процессов.
+    Внешний брокер не нужен: очередь хранится в базе данных, несколько
+    обработчиков на разных серверах могут работать одновременно. Пока задание
+    выполняется, обработчик раз в HEARTBEAT_INTERVAL секунд обновляет его
+    heartbeat_at; задания, сигнал которых пропал дольше --stale-after секунд
+    (обработчик аварийно завершился), возвращаются в очередь при запуске и
+    затем раз в REQUEUE_INTERVAL секунд.
+
+    Пример:
+        python manage.py reports_worker --processes 4
+    """
+    help = "Обработчик фоновых заданий на построение PDF-отчётов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                            help="Количество процессов пула")
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Пауза между опросами очереди, секунды")
+        parser.add_argument("--stale-after", type=int, default=120,
+                            help="Через сколько секунд без сигнала обработчика задание возвращается в очередь")
+        parser.add_argument("--once", action="store_true",
+                            help="Обработать текущую очередь и завершиться")
+
+    def handle(self, *args, **options):
+        processes = options["processes"]
+        poll_interval = options["poll_interval"]
+        stale_after = timedelta(seconds=options["stale_after"])
+
+        worker = worker_name()
+        self.stdout.write(f"Обработчик отчётов {worker} запущен, процессов: {processes}")
+        running = {}
+        next_requeue = 0
+        next_heartbeat = 0
+        with make_process_pool(processes) as pool:
+            try:
+                while True:
+                    if running and time.monotonic() >= next_heartbeat:
+                        send_heartbeat(running.values(), worker)
+                        next_heartbeat = time.monotonic() + HEARTBEAT_INTERVAL
+
+                    if time.monotonic() >= next_requeue:
+                        requeued = requeue_stale_jobs(stale_after, exclude=running.values())
+                        if requeued:
+                            self.stdout.write(f"Возвращено в очередь зависших заданий: {requeued}")
+                        next_requeue = time.monotonic() + REQUEUE_INTERVAL
+
+                    job_ids = claim_jobs(processes - len(running), worker) if len(running) < processes else []
+                    for job_id in job_ids:
+                        running[pool.submit(run_report_job, job_id, worker)] = job_id
+
+                    if not running:
+                        if options["once"]:
+                            break
+                        time.sleep(poll_interval)
+                        continue
+
+                    finished, _ = wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        job_id = running.pop(future)
+                        ok = not future.exception() and future.result()
+                        status = self.style.SUCCESS("готово") if ok else self.style.ERROR("ошибка")
+                        self.stdout.write(f"Задание #{job_id}: {status}")
+            except KeyboardInterrupt:
+                self.stdout.write("Остановка обработчика, ожидание текущих заданий...")
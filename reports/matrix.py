@@ -0,0 +1,105 @@
+"""
+Матрица посещаемости класса: строки — ученики, колонки — уроки, ячейки — коды статусов.
+
+Колонки — уроки класса за период, строки — зачисленные ученики (и ученики
+с отметками на этих уроках), поэтому пустые уроки и ученики без отметок
+тоже видны в матрице.
+Строка ученика хранится как строка кодов длиной в число уроков
+(например, 'PPA-L'), что компактнее списка записей.
+"""
+from django.db.models import BigIntegerField, CharField, Value
+
+from academics.models import Enrollment, Lesson
+from journal.models import AttendanceRecord
+
+# Код ячейки без отметки.
+NO_MARK = "-"
+
+STATUS_LEGEND = {code: label for code, label in AttendanceRecord.Status.choices}
+
+
+class AttendanceMatrix:
+    """
+    Матрица посещаемости.
+
+    Атрибуты:
+        lessons (list[tuple]): уроки (id, дата, код предмета) в порядке дат.
+        students (list[tuple]): ученики (id, фамилия, имя) в порядке фамилий.
+        rows (list[str]): для каждого ученика — строка кодов статусов по урокам.
+    """
+
+    def __init__(self, lessons, students, rows):
+        self.lessons = lessons
+        self.students = students
+        self.rows = rows
+
+    def __iter__(self):
+        """Перебирает пары (ученик, строка кодов)."""
+        return zip(self.students, self.rows)
+
+    def to_dict(self):
+        """Представляет матрицу в виде словаря для JSON-ответа."""
+        return {
+            "lessons": [
+                {"id": lesson_id, "date": day.isoformat(), "subject": subject}
+                for lesson_id, day, subject in self.lessons
+            ],
+            "students": [
+                {"id": student_id, "name": f"{last_name} {first_name}"}
+                for student_id, last_name, first_name in self.students
+            ],
+            "rows": self.rows,
+            "legend": {**STATUS_LEGEND, NO_MARK: "Нет отметки"},
+        }
+
+
+def attendance_matrix(classroom, start_date=None, end_date=None, subject=None):
+    """
+    Строит матрицу посещаемости класса двумя запросами.
+
+    Колонки — все уроки класса за период, строки — зачисленные в класс ученики
+    и ученики, у которых есть отметки на этих уроках; ячейки заполняются
+    отметками из того же запроса (объединение UNION ALL, как в gradebook).
+
+    Аргументы:
+        classroom (ClassRoom): класс.
+        start_date, end_date (date | None): период по дате урока.
+        subject (int | None): идентификатор предмета.
+
+    Возвращает:
+        AttendanceMatrix: матрица посещаемости.
+    """
+    lessons = Lesson.objects.filter(classroom=classroom)
+    if start_date:
+        lessons = lessons.filter(date__gte=start_date)
+    if end_date:
+        lessons = lessons.filter(date__lte=end_date)
+    if subject:
+        lessons = lessons.filter(subject_id=subject)
+    lesson_list = list(lessons.order_by("date", "id").values_list("id", "date", "subject__code"))
+    lesson_ids = [lesson_id for lesson_id, _, _ in lesson_list]
+
+    names = ("student__last_name", "student__first_name")
+    marks = AttendanceRecord.objects.filter(lesson_id__in=lesson_ids).order_by().values_list(
+        "student_id", *names, "lesson_id", "status",
+    )
+    enrolled = Enrollment.objects.filter(classroom=classroom).order_by().values_list(
+        "student_id", *names, Value(None, output_field=BigIntegerField()), Value(None, output_field=CharField()),
+    )
+    rows = marks.union(enrolled, all=True) if lesson_ids else enrolled
+
+    students = {}
+    cells = []
+    for student_id, last_name, first_name, lesson_id, status in rows:
+        students[student_id] = (student_id, last_name, first_name)
+        if lesson_id is not None:
+            cells.append((student_id, lesson_id, status))
+
+    student_list = sorted(students.values(), key=lambda student: (student[1], student[2], student[0]))
+    row = {student[0]: index for index, student in enumerate(student_list)}
+    column = {lesson_id: index for index, lesson_id in enumerate(lesson_ids)}
+    codes = [bytearray(NO_MARK * len(lesson_ids), "ascii") for _ in student_list]
+    for student_id, lesson_id, status in cells:
+        codes[row[student_id]][column[lesson_id]] = ord(status)
+
+    return AttendanceMatrix(lesson_list, student_list, [line.decode("ascii") for line in codes])
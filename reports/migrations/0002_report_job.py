@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('class', 'Успеваемость класса'), ('student', 'Успеваемость ученика'), ('attendance', 'Посещаемость класса')], max_length=20, verbose_name='Тип отчёта')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='Объект')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='Параметры')),
+                ('cache_key', models.CharField(db_index=True, max_length=64, verbose_name='Ключ отчёта')),
+                ('filename', models.CharField(max_length=255, verbose_name='Имя файла')),
+                ('status', models.CharField(choices=[('PENDING', 'В очереди'), ('RUNNING', 'Выполняется'), ('DONE', 'Готово'), ('FAILED', 'Ошибка')], default='PENDING', max_length=10, verbose_name='Статус')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Создано')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='Начато')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='Завершено')),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='report_jobs', to=settings.AUTH_USER_MODEL, verbose_name='Запросил')),
+            ],
+            options={
+                'verbose_name': 'Задание на отчёт',
+                'verbose_name_plural': 'Задания на отчёты',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='report_job_queue_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['PENDING', 'RUNNING'])), fields=('cache_key',), name='unique_active_report_job')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_grade_summaries(apps, schema_editor):
+    from reports.summaries import rebuild_grade_summaries
+    rebuild_grade_summaries(apps.get_model('journal', 'GradeRecord'), apps.get_model('reports', 'GradeSummary'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0003_alter_subject_code'),
+        ('journal', '0001_initial'),
+        ('reports', '0002_report_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=16, verbose_name='Четверть')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Кол-во оценок')),
+                ('value_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Сумма оценок')),
+                ('normalized_sum', models.FloatField(default=0, verbose_name='Сумма нормированных оценок')),
+                ('normalized_count', models.PositiveIntegerField(default=0, verbose_name='Кол-во нормированных оценок')),
+                ('min_value', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='Мин. оценка')),
+                ('max_value', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='Макс. оценка')),
+                ('last_date', models.DateField(blank=True, null=True, verbose_name='Дата последней оценки')),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_summaries', to='academics.classroom', verbose_name='Класс')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_summaries', to=settings.AUTH_USER_MODEL, verbose_name='Ученик')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_summaries', to='academics.subject', verbose_name='Предмет')),
+            ],
+            options={
+                'verbose_name': 'Сводка оценок',
+                'verbose_name_plural': 'Сводки оценок',
+                'constraints': [models.UniqueConstraint(fields=('student', 'subject', 'classroom', 'term'), name='unique_grade_summary')],
+            },
+        ),
+        migrations.RunPython(backfill_grade_summaries, migrations.RunPython.noop),
+    ]
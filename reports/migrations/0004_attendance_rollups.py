@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_attendance_rollups(apps, schema_editor):
+    from reports.attendance import rebuild_attendance_rollups
+    rebuild_attendance_rollups(
+        apps.get_model('journal', 'AttendanceRecord'),
+        apps.get_model('reports', 'StudentAttendanceDay'),
+        apps.get_model('reports', 'ClassAttendanceDay'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('academics', '0003_alter_subject_code'),
+        ('journal', '0001_initial'),
+        ('reports', '0003_grade_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassAttendanceDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present', models.PositiveIntegerField(default=0, verbose_name='Был')),
+                ('absent', models.PositiveIntegerField(default=0, verbose_name='Отсутствовал')),
+                ('late', models.PositiveIntegerField(default=0, verbose_name='Опоздал')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_days', to='academics.classroom', verbose_name='Класс')),
+            ],
+            options={
+                'verbose_name': 'Посещаемость класса за день',
+                'verbose_name_plural': 'Посещаемость классов по дням',
+                'indexes': [models.Index(fields=['date'], name='class_att_day_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('classroom', 'date'), name='unique_class_attendance_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentAttendanceDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('present', models.PositiveIntegerField(default=0, verbose_name='Был')),
+                ('absent', models.PositiveIntegerField(default=0, verbose_name='Отсутствовал')),
+                ('late', models.PositiveIntegerField(default=0, verbose_name='Опоздал')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='student_attendance_days', to='academics.classroom', verbose_name='Класс')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_days', to=settings.AUTH_USER_MODEL, verbose_name='Ученик')),
+            ],
+            options={
+                'verbose_name': 'Посещаемость ученика за день',
+                'verbose_name_plural': 'Посещаемость учеников по дням',
+                'indexes': [models.Index(fields=['classroom', 'date'], name='student_att_day_class_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'classroom', 'date'), name='unique_student_attendance_day')],
+            },
+        ),
+        migrations.RunPython(backfill_attendance_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_attendance_rollups'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='reportjob',
+            name='kind',
+            field=models.CharField(choices=[('class', 'Успеваемость класса'), ('student', 'Успеваемость ученика'), ('attendance', 'Посещаемость класса'), ('attendance_matrix', 'Матрица посещаемости класса')], max_length=20, verbose_name='Тип отчёта'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 06:58
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_student_search(apps, schema_editor):
+    from reports.search import rebuild_search_entries
+    rebuild_search_entries(apps.get_model('accounts', 'User'), apps.get_model('reports', 'StudentSearchEntry'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_profile_phone_alter_user_first_name_and_more'),
+        ('reports', '0005_report_job_matrix_kind'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentSearchEntry',
+            fields=[
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_entry', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Ученик')),
+                ('name', models.CharField(max_length=61, verbose_name='Фамилия и имя')),
+                ('username', models.CharField(max_length=150, verbose_name='Логин')),
+                ('text', models.CharField(max_length=500, verbose_name='Слова для поиска')),
+                ('vector', models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('text', config='simple'), output_field=django.contrib.postgres.search.SearchVectorField())),
+            ],
+            options={
+                'verbose_name': 'Поисковая запись ученика',
+                'verbose_name_plural': 'Поисковые записи учеников',
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['vector'], name='student_search_vector_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_student_search, migrations.RunPython.noop),
+    ]
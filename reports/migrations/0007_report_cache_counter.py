@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0006_student_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCacheCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=32, unique=True, verbose_name='Счётчик')),
+                ('value', models.PositiveBigIntegerField(default=0, verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Счётчик кэша отчётов',
+                'verbose_name_plural': 'Счётчики кэша отчётов',
+            },
+        ),
+    ]
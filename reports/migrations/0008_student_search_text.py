@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 08:05
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # PostgreSQL не меняет тип столбца, от которого зависит генерируемый столбец:
+    # vector и его индекс удаляются и создаются заново по новому text.
+
+    dependencies = [
+        ('reports', '0007_report_cache_counter'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='studentsearchentry',
+            name='student_search_vector_idx',
+        ),
+        migrations.RemoveField(
+            model_name='studentsearchentry',
+            name='vector',
+        ),
+        migrations.AlterField(
+            model_name='studentsearchentry',
+            name='text',
+            field=models.TextField(verbose_name='Слова для поиска'),
+        ),
+        migrations.AddField(
+            model_name='studentsearchentry',
+            name='vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.SearchVector('text', config='simple'), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='studentsearchentry',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['vector'], name='student_search_vector_idx'),
+        ),
+    ]
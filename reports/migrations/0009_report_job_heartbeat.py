@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 08:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0008_student_search_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последний сигнал'),
+        ),
+        migrations.AddField(
+            model_name='reportjob',
+            name='worker',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Обработчик'),
+        ),
+    ]
@@ -1,3 +1,331 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 
-# Create your models here.
+
+class DataVersion(models.Model):
+    """
+    Штамп версии данных для области (scope), используемый для инвалидации кэшей отчётов.
+
+    Атрибуты:
+        scope (CharField): имя области, например 'classroom:5' или 'student:12'.
+        version (PositiveBigIntegerField): номер версии, увеличивается при каждом изменении данных.
+        updated_at (DateTimeField): время последнего изменения.
+    """
+
+    scope = models.CharField('Область', max_length=64, unique=True)
+    version = models.PositiveBigIntegerField('Версия', default=0)
+    updated_at = models.DateTimeField('Обновлено', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        """Возвращает строку вида 'classroom:5 · v12'."""
+        return f"{self.scope} · v{self.version}"
+
+
+class ReportCacheCounter(models.Model):
+    """
+    Счётчик кэша PDF-отчётов, общий для всех процессов (веб-воркеров,
+    reports_worker, команд manage.py).
+
+    Атрибуты:
+        name (CharField): имя счётчика ('hits' или 'misses').
+        value (PositiveBigIntegerField): текущее значение.
+    """
+
+    name = models.CharField('Счётчик', max_length=32, unique=True)
+    value = models.PositiveBigIntegerField('Значение', default=0)
+
+    class Meta:
+        verbose_name = 'Счётчик кэша отчётов'
+        verbose_name_plural = 'Счётчики кэша отчётов'
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
+
+
+class ReportJob(models.Model):
+    """
+    Задание на фоновое построение PDF-отчёта.
+
+    Атрибуты:
+        kind (CharField): тип отчёта (успеваемость класса, ученика, посещаемость).
+        object_id (PositiveBigIntegerField): идентификатор класса или ученика.
+        params (JSONField): параметры построения (фильтры, автор, дата).
+        cache_key (CharField): ключ отчёта в кэше; совпадает у одинаковых запросов.
+        filename (CharField): имя файла для скачивания.
+        status (CharField): состояние задания.
+        error (TextField): текст ошибки, если построение не удалось.
+        requested_by (ForeignKey): пользователь, запросивший отчёт.
+        created_at, started_at, finished_at (DateTimeField): время жизни задания.
+        worker (CharField): обработчик, выполняющий задание (хост:pid).
+        heartbeat_at (DateTimeField): последний сигнал обработчика о том, что задание выполняется.
+
+    Ограничения:
+        Для одного ключа отчёта может существовать только одно активное
+        (ожидающее или выполняющееся) задание — повторные запросы присоединяются к нему.
+    """
+
+    class Kind(models.TextChoices):
+        """Типы отчётов, которые умеет строить обработчик заданий."""
+        CLASS = 'class', 'Успеваемость класса'
+        STUDENT = 'student', 'Успеваемость ученика'
+        ATTENDANCE = 'attendance', 'Посещаемость класса'
+        ATTENDANCE_MATRIX = 'attendance_matrix', 'Матрица посещаемости класса'
+
+    class Status(models.TextChoices):
+        """Состояния задания."""
+        PENDING = 'PENDING', 'В очереди'
+        RUNNING = 'RUNNING', 'Выполняется'
+        DONE = 'DONE', 'Готово'
+        FAILED = 'FAILED', 'Ошибка'
+
+    ACTIVE_STATUSES = (Status.PENDING, Status.RUNNING)
+
+    kind = models.CharField('Тип отчёта', max_length=20, choices=Kind.choices)
+    object_id = models.PositiveBigIntegerField('Объект')
+    params = models.JSONField('Параметры', default=dict, blank=True)
+    cache_key = models.CharField('Ключ отчёта', max_length=64, db_index=True)
+    filename = models.CharField('Имя файла', max_length=255)
+    status = models.CharField('Статус', max_length=10, choices=Status.choices, default=Status.PENDING)
+    error = models.TextField('Ошибка', blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='report_jobs',
+        verbose_name='Запросил'
+    )
+    created_at = models.DateTimeField('Создано', auto_now_add=True)
+    started_at = models.DateTimeField('Начато', null=True, blank=True)
+    finished_at = models.DateTimeField('Завершено', null=True, blank=True)
+    worker = models.CharField('Обработчик', max_length=100, blank=True)
+    heartbeat_at = models.DateTimeField('Последний сигнал', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Задание на отчёт'
+        verbose_name_plural = 'Задания на отчёты'
+        ordering = ['created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['cache_key'],
+                condition=models.Q(status__in=['PENDING', 'RUNNING']),
+                name='unique_active_report_job',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='report_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        """Возвращает строку вида '#12 class:5 (DONE)'."""
+        return f"#{self.pk} {self.kind}:{self.object_id} ({self.status})"
+
+
+class GradeSummary(models.Model):
+    """
+    Сводка оценок ученика по предмету в классе за учебную четверть.
+
+    Поддерживается инкрементально при сохранении и удалении оценок
+    (см. reports.summaries и reports.signals), восстанавливается командой
+    `manage.py rebuild_grade_summaries`. Отчёты читают сводки вместо
+    всех оценок, если не задан произвольный период.
+
+    Атрибуты:
+        student (ForeignKey): ученик.
+        subject (ForeignKey): предмет урока.
+        classroom (ForeignKey): класс, в котором проходил урок.
+        term (CharField): четверть в виде '2025-1' (год начала учебного года и номер).
+        count (PositiveIntegerField): количество оценок.
+        value_sum (DecimalField): сумма оценок.
+        normalized_sum (FloatField): сумма оценок, делённых на максимальный балл.
+        normalized_count (PositiveIntegerField): количество оценок с ненулевым максимальным баллом.
+        min_value, max_value (DecimalField): минимальная и максимальная оценка.
+        last_date (DateField): дата последней оценки.
+    """
+
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='grade_summaries',
+        verbose_name='Ученик'
+    )
+    subject = models.ForeignKey(
+        'academics.Subject',
+        on_delete=models.CASCADE,
+        related_name='grade_summaries',
+        verbose_name='Предмет'
+    )
+    classroom = models.ForeignKey(
+        'academics.ClassRoom',
+        on_delete=models.CASCADE,
+        related_name='grade_summaries',
+        verbose_name='Класс'
+    )
+    term = models.CharField('Четверть', max_length=16)
+    count = models.PositiveIntegerField('Кол-во оценок', default=0)
+    value_sum = models.DecimalField('Сумма оценок', max_digits=14, decimal_places=2, default=0)
+    normalized_sum = models.FloatField('Сумма нормированных оценок', default=0)
+    normalized_count = models.PositiveIntegerField('Кол-во нормированных оценок', default=0)
+    min_value = models.DecimalField('Мин. оценка', max_digits=5, decimal_places=2, null=True, blank=True)
+    max_value = models.DecimalField('Макс. оценка', max_digits=5, decimal_places=2, null=True, blank=True)
+    last_date = models.DateField('Дата последней оценки', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'Сводка оценок'
+        verbose_name_plural = 'Сводки оценок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'subject', 'classroom', 'term'],
+                name='unique_grade_summary',
+            ),
+        ]
+
+    def __str__(self):
+        """Возвращает строку вида 'Иванов Иван · Математика · 2025-1 · 12 оц.'."""
+        return f"{self.student} · {self.subject} · {self.term} · {self.count} оц."
+
+
+class AttendanceCounts(models.Model):
+    """
+    Абстрактная модель счётчиков отметок посещаемости по статусам.
+
+    Атрибуты:
+        present (PositiveIntegerField): уроков с отметкой «Был».
+        absent (PositiveIntegerField): уроков с отметкой «Отсутствовал».
+        late (PositiveIntegerField): уроков с отметкой «Опоздал».
+    """
+
+    present = models.PositiveIntegerField('Был', default=0)
+    absent = models.PositiveIntegerField('Отсутствовал', default=0)
+    late = models.PositiveIntegerField('Опоздал', default=0)
+
+    class Meta:
+        abstract = True
+
+    @property
+    def total(self):
+        """Всего отметок."""
+        return self.present + self.absent + self.late
+
+
+class StudentAttendanceDay(AttendanceCounts):
+    """
+    Посещаемость ученика за день: число уроков по статусам.
+
+    Поддерживается инкрементально при изменении отметок (см. reports.attendance
+    и reports.signals), восстанавливается командой `manage.py rebuild_attendance_rollups`.
+
+    Атрибуты:
+        student (ForeignKey): ученик.
+        classroom (ForeignKey): класс, в котором проходили уроки.
+        date (DateField): дата уроков.
+    """
+
+    student = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='attendance_days',
+        verbose_name='Ученик'
+    )
+    classroom = models.ForeignKey(
+        'academics.ClassRoom',
+        on_delete=models.CASCADE,
+        related_name='student_attendance_days',
+        verbose_name='Класс'
+    )
+    date = models.DateField('Дата')
+
+    class Meta:
+        verbose_name = 'Посещаемость ученика за день'
+        verbose_name_plural = 'Посещаемость учеников по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'classroom', 'date'], name='unique_student_attendance_day'),
+        ]
+        indexes = [
+            models.Index(fields=['classroom', 'date'], name='student_att_day_class_idx'),
+        ]
+
+    def __str__(self):
+        """Возвращает строку вида 'Иванов Иван · 01.09.2025 · 5/1/0'."""
+        return f"{self.student} · {self.date:%d.%m.%Y} · {self.present}/{self.absent}/{self.late}"
+
+
+class ClassAttendanceDay(AttendanceCounts):
+    """
+    Посещаемость класса за день: число отметок по статусам по всем урокам дня.
+
+    Атрибуты:
+        classroom (ForeignKey): класс.
+        date (DateField): дата уроков.
+    """
+
+    classroom = models.ForeignKey(
+        'academics.ClassRoom',
+        on_delete=models.CASCADE,
+        related_name='attendance_days',
+        verbose_name='Класс'
+    )
+    date = models.DateField('Дата')
+
+    class Meta:
+        verbose_name = 'Посещаемость класса за день'
+        verbose_name_plural = 'Посещаемость классов по дням'
+        constraints = [
+            models.UniqueConstraint(fields=['classroom', 'date'], name='unique_class_attendance_day'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='class_att_day_date_idx'),
+        ]
+
+    def __str__(self):
+        """Возвращает строку вида '5А · 01.09.2025 · 120/6/3'."""
+        return f"{self.classroom} · {self.date:%d.%m.%Y} · {self.present}/{self.absent}/{self.late}"
+
+
+class StudentSearchEntry(models.Model):
+    """
+    Поисковая запись ученика: слова имени, фамилии и логина вместе с их
+    транслитерацией и полнотекстовый вектор по ним с GIN-индексом.
+
+    Поддерживается при сохранении пользователя (см. reports.search и reports.signals),
+    восстанавливается командой `manage.py rebuild_student_search`.
+
+    Атрибуты:
+        student (OneToOneField): ученик.
+        name (CharField): «Фамилия Имя» для показа и сортировки результатов без JOIN с пользователями.
+        username (CharField): логин ученика.
+        text (TextField): нормализованные слова для поиска через пробел.
+        vector (GeneratedField): tsvector по text в конфигурации 'simple'.
+    """
+
+    student = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_entry',
+        verbose_name='Ученик'
+    )
+    name = models.CharField('Фамилия и имя', max_length=61)
+    username = models.CharField('Логин', max_length=150)
+    text = models.TextField('Слова для поиска')
+    vector = models.GeneratedField(
+        expression=SearchVector('text', config='simple'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    class Meta:
+        verbose_name = 'Поисковая запись ученика'
+        verbose_name_plural = 'Поисковые записи учеников'
+        indexes = [
+            GinIndex(fields=['vector'], name='student_search_vector_idx'),
+        ]
+
+    def __str__(self):
+        """Возвращает строку вида 'Иванов Иван · иванов иван ivanov ivan'."""
+        return f"{self.name} · {self.text}"
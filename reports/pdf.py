@@ -0,0 +1,208 @@
+"""
+Общий движок построения PDF-отчётов на ReportLab.
+
+Шрифт регистрируется и стили создаются один раз при старте приложения
+(см. ReportsConfig.ready), а не при каждом запросе. Таблицы описываются
+декларативно — списком колонок Column; короткие и числовые значения выводятся
+простыми строками, и только длинный текст оборачивается в Paragraph.
+
+Документ собирается потоково: содержимое может быть генератором, а большие
+таблицы строятся частями (LongTable по STREAM_CHUNK_ROWS строк), поэтому в памяти
+одновременно находится лишь текущая часть строк, а не вся таблица.
+"""
+import os
+from xml.sax.saxutils import escape
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import SimpleDocTemplate, LongTable, Table, TableStyle, Paragraph, Spacer
+
+FONT_NAME = "DejaVuSans"
+FONT_PATH = os.path.join(os.path.dirname(__file__), "DejaVuSans.ttf")
+FONT_SIZE = 10
+
+# Горизонтальные отступы ячейки таблицы ReportLab (LEFTPADDING + RIGHTPADDING по умолчанию).
+CELL_PADDING = 12
+
+NORMAL_STYLE = ParagraphStyle("ReportNormal", fontName=FONT_NAME, fontSize=FONT_SIZE, leading=12)
+TITLE_STYLE = ParagraphStyle("ReportTitle", fontName=FONT_NAME, fontSize=16, leading=20)
+
+BASE_TABLE_STYLE = TableStyle([
+    ("FONT", (0, 0), (-1, -1), FONT_NAME, FONT_SIZE),
+    ("VALIGN", (0, 0), (-1, -1), "TOP"),
+    ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+    ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+])
+
+PAGE_MARGINS = {"rightMargin": 30, "leftMargin": 30, "topMargin": 40, "bottomMargin": 30}
+
+# Строк в одной части таблицы при потоковом построении (примерно страница A4).
+STREAM_CHUNK_ROWS = 40
+
+
+def setup():
+    """Регистрирует шрифт отчётов в ReportLab (повторные вызовы ничего не делают)."""
+    if FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+
+
+class Column:
+    """
+    Описание колонки таблицы отчёта.
+
+    Атрибуты:
+        title (str): заголовок колонки.
+        width (int): ширина колонки в пунктах.
+        value (Callable[[Any], Any]): функция, извлекающая значение из строки данных.
+        wrap (bool): переносить ли длинный текст по строкам (через Paragraph).
+        align (str): выравнивание — 'LEFT', 'CENTER' или 'RIGHT'.
+    """
+
+    def __init__(self, title, width, value, wrap=False, align="LEFT"):
+        self.title = title
+        self.width = width
+        self.value = value
+        self.wrap = wrap
+        self.align = align
+
+    def render(self, row):
+        """Возвращает содержимое ячейки: строку или Paragraph для длинного текста."""
+        value = self.value(row)
+        text = "-" if value is None or value == "" else str(value)
+        if self.wrap and pdfmetrics.stringWidth(text, FONT_NAME, FONT_SIZE) > self.width - CELL_PADDING:
+            return Paragraph(escape(text), NORMAL_STYLE)
+        return text
+
+
+class ReportTable:
+    """
+    Декларативная таблица отчёта: колонки, строки данных и необязательная итоговая строка.
+
+    Пример:
+        ReportTable([Column("Ученик", 130, lambda r: r.name, wrap=True)], rows).flowable()
+    """
+
+    def __init__(self, columns, rows, footer=None, style=None):
+        self.columns = columns
+        self.rows = rows
+        self.footer = footer
+        self.style = style or []
+
+    def data(self):
+        """Возвращает матрицу ячеек, включая заголовок и итоговую строку."""
+        data = [[column.title for column in self.columns]]
+        for row in self.rows:
+            data.append([column.render(row) for column in self.columns])
+        if self.footer is not None:
+            data.append(["" if cell is None else str(cell) for cell in self.footer])
+        return data
+
+    def table_style(self):
+        """Возвращает стиль таблицы: базовый, выравнивание колонок и дополнительные команды."""
+        commands = list(BASE_TABLE_STYLE.getCommands())
+        for index, column in enumerate(self.columns):
+            if column.align != "LEFT":
+                commands.append(("ALIGN", (index, 0), (index, -1), column.align))
+        return TableStyle(commands + list(self.style))
+
+    def _table(self, data, table_class=Table):
+        table = table_class(data, colWidths=[column.width for column in self.columns], repeatRows=1)
+        table.setStyle(self.table_style())
+        return table
+
+    def flowable(self):
+        """Строит объект Table для размещения в документе."""
+        return self._table(self.data())
+
+    def flowables(self, chunk_rows=STREAM_CHUNK_ROWS):
+        """
+        Лениво строит таблицу частями по `chunk_rows` строк.
+
+        Каждая часть — отдельная LongTable со своим заголовком. Строки данных
+        читаются из `rows` по мере надобности, поэтому `rows` может быть
+        итератором по queryset.
+
+        Возвращает:
+            Iterator[LongTable]: части таблицы.
+        """
+        titles = [column.title for column in self.columns]
+        chunk = []
+        emitted = False
+        for row in self.rows:
+            chunk.append([column.render(row) for column in self.columns])
+            if len(chunk) >= chunk_rows:
+                yield self._table([titles] + chunk, LongTable)
+                emitted = True
+                chunk = []
+        if self.footer is not None:
+            chunk.append(["" if cell is None else str(cell) for cell in self.footer])
+        if chunk or not emitted:
+            yield self._table([titles] + chunk, LongTable)
+
+
+class LazyStory(list):
+    """
+    Список элементов документа, который подгружается из итератора по мере сборки.
+
+    ReportLab обрабатывает содержимое как очередь: берёт flowables[0], удаляет
+    его и при разбиении вставляет части обратно в начало. LazyStory держит в
+    памяти лишь несколько ближайших элементов и дочитывает следующие, когда
+    очередь пустеет.
+    """
+
+    def __init__(self, elements, lookahead=2):
+        super().__init__()
+        self._source = iter(elements)
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while list.__len__(self) < self._lookahead:
+            try:
+                list.append(self, next(self._source))
+            except StopIteration:
+                break
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+def header(title, report_date, date_label="Дата"):
+    """
+    Возвращает элементы шапки отчёта: заголовок и дату формирования.
+
+    Имя пользователя в шапку не печатается: один и тот же отчёт отдаётся из
+    кэша всем учителям и директору.
+
+    Аргументы:
+        title (str): заголовок отчёта.
+        report_date (date): дата формирования — та, что входит в ключ кэша.
+        date_label (str): подпись к дате формирования.
+    """
+    return [
+        Paragraph(escape(title), TITLE_STYLE),
+        Spacer(1, 12),
+        Paragraph(f"{date_label}: {report_date.strftime('%d.%m.%Y')}", NORMAL_STYLE),
+        Spacer(1, 20),
+    ]
+
+
+def render(elements, output, pagesize=A4):
+    """
+    Собирает PDF-документ из элементов ReportLab и записывает его в файл.
+
+    Аргументы:
+        elements (Iterable[Flowable]): содержимое документа; может быть генератором.
+        output (BinaryIO): файл, открытый на запись в двоичном режиме.
+        pagesize (tuple): размер страницы.
+    """
+    setup()
+    doc = SimpleDocTemplate(output, pagesize=pagesize, **PAGE_MARGINS)
+    doc.build(LazyStory(elements))
@@ -0,0 +1,327 @@
+"""
+Поиск учеников по имени, фамилии и логину.
+
+Для каждого ученика хранится запись StudentSearchEntry: нормализованные слова
+(нижний регистр, ё → е) вместе с их латинской транслитерацией и
+полнотекстовый вектор по ним с GIN-индексом. Запрос разбивается на слова,
+каждое ищется как префикс (`слово:*`) — так работает автодополнение, а
+транслитерация позволяет найти «Иванов» по «ivanov» и наоборот.
+
+Дополнительно можно включить префиксный индекс в памяти процесса
+(REPORTS_SEARCH_PREFIX_INDEX): отсортированный список слов, в котором
+префиксы ищутся двоичным поиском без обращения к базе. Он обновляется при
+сохранении учеников в этом же процессе, а изменения из других процессов
+подхватывает, перечитываясь из базы раз в REPORTS_SEARCH_INDEX_TTL секунд.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+
+from accounts.models import User
+from .models import StudentSearchEntry
+
+SEARCH_CONFIG = "simple"
+
+# Поля пользователя, от которых зависит поисковая запись.
+SEARCH_FIELDS = {"last_name", "first_name", "username", "role"}
+
+# Более короткие запросы не ищутся: под них подходит слишком много учеников.
+SEARCH_MIN_LENGTH = 2
+
+# Сколько подсказок возвращает автодополнение по умолчанию и максимум.
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MAX_LIMIT = 50
+
+# Размер пачки при массовом создании поисковых записей.
+REBUILD_BATCH_SIZE = 1000
+
+# Транслитерация как в загранпаспорте и распространённый «бытовой» вариант;
+# казахские буквы передаются ближайшими латинскими.
+TRANSLITERATIONS = (
+    {
+        "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ж": "zh", "з": "z",
+        "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o", "п": "p",
+        "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts", "ч": "ch",
+        "ш": "sh", "щ": "shch", "ъ": "ie", "ы": "y", "ь": "", "э": "e", "ю": "iu", "я": "ia",
+        "ә": "a", "ғ": "g", "қ": "k", "ң": "n", "ө": "o", "ұ": "u", "ү": "u", "һ": "h", "і": "i",
+    },
+    {"й": "y", "х": "h", "щ": "sch", "ъ": "", "ю": "yu", "я": "ya"},
+)
+
+# Слово — буквы и цифры любого алфавита (\w без подчёркивания).
+_WORD_RE = re.compile(r"[^\W_]+")
+_CYRILLIC_RE = re.compile("[" + "".join(TRANSLITERATIONS[0]) + "]")
+
+
+def normalize_words(text):
+    """
+    Разбивает текст на слова в нижнем регистре, заменяя «ё» на «е».
+
+    Возвращает:
+        list[str]: слова из букв и цифр любого алфавита.
+    """
+    return _WORD_RE.findall(text.lower().replace("ё", "е"))
+
+
+def transliterations(word):
+    """
+    Возвращает слово и его латинские транслитерации.
+
+    Аргументы:
+        word (str): нормализованное слово, см. normalize_words().
+
+    Возвращает:
+        list[str]: варианты без повторов; первый — само слово.
+    """
+    variants = [word]
+    if _CYRILLIC_RE.search(word):
+        table = dict(TRANSLITERATIONS[0])
+        for overrides in ({}, *TRANSLITERATIONS[1:]):
+            table.update(overrides)
+            latin = "".join(table.get(char, char) for char in word)
+            if latin and latin not in variants:
+                variants.append(latin)
+    return variants
+
+
+def search_text(student):
+    """Возвращает слова поисковой записи ученика: имя, фамилия, логин и их транслитерации."""
+    words = {}
+    for word in normalize_words(f"{student.last_name} {student.first_name} {student.username}"):
+        words.update(dict.fromkeys(transliterations(word)))
+    return " ".join(words)
+
+
+def entry_fields(student):
+    """Возвращает значения полей StudentSearchEntry для ученика."""
+    return {
+        "name": f"{student.last_name} {student.first_name}",
+        "username": student.username,
+        "text": search_text(student),
+    }
+
+
+def query_words(query):
+    """
+    Разбирает поисковый запрос.
+
+    Возвращает:
+        list[list[str]]: для каждого слова запроса — его варианты, см. transliterations();
+        пустой список, если запрос короче SEARCH_MIN_LENGTH.
+    """
+    words = normalize_words(query)
+    if sum(len(word) for word in words) < SEARCH_MIN_LENGTH:
+        return []
+    return [transliterations(word) for word in words]
+
+
+def _tsquery(words, exact=False):
+    # Слова состоят только из букв и цифр, поэтому их можно подставлять в tsquery как есть.
+    def variant_terms(variants):
+        terms = [f"{variant}:*" for variant in variants]
+        if exact:
+            terms += variants
+        return "(" + " | ".join(terms) + ")"
+    return " & ".join(variant_terms(variants) for variants in words)
+
+
+def search_queryset(query):
+    """
+    Возвращает поисковые записи учеников, подходящих под запрос, от наиболее релевантных.
+
+    Каждое слово запроса должно быть началом какого-либо слова ученика.
+    Ученики, у которых слово совпало целиком, идут первыми, дальше — по фамилии и имени.
+
+    Аргументы:
+        query (str): поисковый запрос.
+
+    Возвращает:
+        QuerySet[StudentSearchEntry]: записи с аннотацией exact.
+    """
+    words = query_words(query)
+    if not words:
+        return StudentSearchEntry.objects.none()
+    match = SearchQuery(_tsquery(words), search_type="raw", config=SEARCH_CONFIG)
+    exact = SearchQuery(
+        " | ".join(" | ".join(variants) for variants in words), search_type="raw", config=SEARCH_CONFIG,
+    )
+    return (
+        StudentSearchEntry.objects
+        .filter(vector=match)
+        .annotate(exact=Case(When(vector=exact, then=Value(1)), default=Value(0)))
+        .order_by("-exact", "name", "student_id")
+    )
+
+
+def autocomplete(query, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Возвращает подсказки для автодополнения.
+
+    Если включён префиксный индекс в памяти, ищет в нём, иначе — в базе.
+
+    Аргументы:
+        query (str): поисковый запрос.
+        limit (int): максимальное число подсказок.
+
+    Возвращает:
+        list[dict]: {'id', 'name', 'username'}.
+    """
+    if settings.REPORTS_SEARCH_PREFIX_INDEX:
+        return prefix_index.search(query, limit)
+    return list(search_queryset(query).values("name", "username", id=F("student_id"))[:limit])
+
+
+def sync_search_entry(user):
+    """
+    Обновляет поисковую запись пользователя после сохранения.
+
+    Для ученика запись создаётся или обновляется, для остальных ролей удаляется.
+    Префиксный индекс в памяти обновляется после фиксации транзакции.
+    """
+    if user.role == "STUDENT":
+        fields = entry_fields(user)
+        StudentSearchEntry.objects.update_or_create(student_id=user.pk, defaults=fields)
+        transaction.on_commit(lambda: prefix_index.update(user.pk, **fields))
+    else:
+        StudentSearchEntry.objects.filter(student_id=user.pk).delete()
+        transaction.on_commit(lambda: prefix_index.remove(user.pk))
+
+
+def rebuild_search_entries(user_model=User, entry_model=StudentSearchEntry):
+    """
+    Пересоздаёт поисковые записи всех учеников.
+
+    Аргументы:
+        user_model, entry_model: модели пользователя и поисковой записи; миграция
+            передаёт исторические версии моделей.
+
+    Возвращает:
+        int: количество созданных записей.
+    """
+    created = 0
+    with transaction.atomic():
+        entry_model.objects.all().delete()
+        batch = []
+        students = user_model.objects.filter(role="STUDENT").only("id", "last_name", "first_name", "username")
+        for student in students.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.append(entry_model(student_id=student.pk, **entry_fields(student)))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                created += len(entry_model.objects.bulk_create(batch))
+                batch = []
+        created += len(entry_model.objects.bulk_create(batch))
+    return created
+
+
+class PrefixIndex:
+    """
+    Префиксный индекс поисковых слов учеников в памяти процесса.
+
+    Хранит отсортированный список пар (слово, id ученика); слова с заданным
+    префиксом занимают в нём непрерывный отрезок, который находится двоичным
+    поиском. Загружается из StudentSearchEntry при первом поиске и
+    перечитывается, если старше ttl секунд.
+    """
+
+    def __init__(self, ttl=None):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._words = []
+        self._students = {}
+        self._loaded_at = None
+
+    def _load(self):
+        rows = StudentSearchEntry.objects.values_list("student_id", "name", "username", "text")
+        students = {}
+        words = []
+        for student_id, name, username, text in rows.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            student_words = text.split()
+            students[student_id] = (name, username, student_words)
+            words.extend((word, student_id) for word in student_words)
+        words.sort()
+        self._students, self._words = students, words
+        self._loaded_at = time.monotonic()
+
+    def _ensure_loaded(self):
+        ttl = settings.REPORTS_SEARCH_INDEX_TTL if self.ttl is None else self.ttl
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > ttl:
+            self._load()
+
+    def _discard(self, student_id):
+        entry = self._students.pop(student_id, None)
+        if entry is None:
+            return
+        for word in entry[2]:
+            position = bisect.bisect_left(self._words, (word, student_id))
+            if position < len(self._words) and self._words[position] == (word, student_id):
+                del self._words[position]
+
+    def update(self, student_id, name, username, text):
+        """
+        Заменяет ученика в индексе; если индекс ещё не загружен, ничего не делает.
+
+        Аргументы:
+            student_id (int): идентификатор ученика.
+            name, username, text (str): поля поисковой записи, см. entry_fields().
+        """
+        with self._lock:
+            if self._loaded_at is None:
+                return
+            self._discard(student_id)
+            student_words = text.split()
+            self._students[student_id] = (name, username, student_words)
+            for word in student_words:
+                bisect.insort(self._words, (word, student_id))
+
+    def remove(self, student_id):
+        """Удаляет ученика из индекса."""
+        with self._lock:
+            self._discard(student_id)
+
+    def _matches(self, variants):
+        """Возвращает {id ученика: совпало ли слово целиком} для учеников со словом на один из префиксов."""
+        matches = {}
+        for prefix in variants:
+            # Слова с префиксом лежат между (prefix,) и (prefix + максимальный символ,).
+            start = bisect.bisect_left(self._words, (prefix,))
+            stop = bisect.bisect_left(self._words, (prefix + "\U0010ffff",), start)
+            for word, student_id in self._words[start:stop]:
+                matches[student_id] = matches.get(student_id, False) or word == prefix
+        return matches
+
+    def search(self, query, limit=AUTOCOMPLETE_LIMIT):
+        """
+        Ищет учеников по префиксам слов запроса в том же порядке, что и search_queryset().
+
+        Возвращает:
+            list[dict]: {'id', 'name', 'username'}.
+        """
+        words = query_words(query)
+        if not words:
+            return []
+        with self._lock:
+            self._ensure_loaded()
+            found = self._matches(words[0])
+            for variants in words[1:]:
+                matches = self._matches(variants)
+                found = {
+                    student_id: exact or matches[student_id]
+                    for student_id, exact in found.items() if student_id in matches
+                }
+            top = heapq.nsmallest(
+                limit, found.items(),
+                key=lambda item: (not item[1], self._students[item[0]][0], item[0]),
+            )
+            return [
+                {"id": student_id, "name": self._students[student_id][0], "username": self._students[student_id][1]}
+                for student_id, _ in top
+            ]
+
+
+prefix_index = PrefixIndex()
@@ -0,0 +1,253 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from academics.models import ClassRoom, Enrollment, Lesson, Subject
+from accounts.models import User
+from journal.bulk import attendance_bulk_saved, grades_bulk_saved
+from journal.models import AttendanceRecord, GradeRecord
+from .attendance import apply_attendance, apply_attendance_changes, attendance_key
+from .search import SEARCH_FIELDS, prefix_index, sync_search_entry
+from .summaries import add_grade, grade_summary_key, recompute_summaries, term_for
+from .versioning import (
+    ACADEMICS_SCOPE, bump_versions, classroom_scope, journal_scopes, lesson_scopes, student_scopes, teacher_scope,
+)
+
+# Поля пользователя, которые выводятся в отчётах и ответах API.
+PROFILE_FIELDS = SEARCH_FIELDS | {'email'}
+
+
+@receiver(pre_save, sender=GradeRecord)
+@receiver(pre_save, sender=AttendanceRecord)
+def remember_journal_state(sender, instance, raw=False, **kwargs):
+    """Запоминает прежних ученика, класс и учителя урока записи, чтобы инвалидировать и их отчёты."""
+    if raw or instance.pk is None:
+        return
+    instance._versions_previous = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list('student_id', 'lesson__classroom_id', 'lesson__teacher_id')
+        .first()
+    )
+
+
+@receiver(post_save, sender=GradeRecord)
+@receiver(post_delete, sender=GradeRecord)
+@receiver(post_save, sender=AttendanceRecord)
+@receiver(post_delete, sender=AttendanceRecord)
+def bump_journal_versions(sender, instance, **kwargs):
+    """
+    Инвалидирует отчёты ученика и его классов, класса и учителя урока при
+    изменении оценки или посещаемости; у перенесённой записи — и прежних.
+    """
+    lesson = instance.lesson
+    current = (instance.student_id, lesson.classroom_id, lesson.teacher_id)
+    scopes = journal_scopes(*current)
+    previous = getattr(instance, '_versions_previous', None)
+    if previous is not None:
+        del instance._versions_previous
+        if previous != current:
+            scopes |= journal_scopes(*previous)
+    bump_versions(scopes)
+
+
+@receiver(pre_save, sender=GradeRecord)
+def remember_grade_summary_state(sender, instance, raw=False, **kwargs):
+    """Запоминает прежние ключ сводки и оценку, чтобы при изменении пересчитать обе сводки."""
+    if raw or instance.pk is None:
+        return
+    previous = GradeRecord.objects.select_related('lesson').filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._summary_previous = (grade_summary_key(previous), previous.value, previous.max_value)
+
+
+@receiver(post_save, sender=GradeRecord)
+def update_grade_summary(sender, instance, created, raw=False, **kwargs):
+    """Обновляет сводку оценок: новая оценка добавляется приращением, изменённая — пересчётом."""
+    if raw:
+        return
+    previous = getattr(instance, '_summary_previous', None)
+    if previous is None:
+        if created:
+            add_grade(instance)
+        return
+    del instance._summary_previous
+    key = grade_summary_key(instance)
+    previous_key, previous_value, previous_max = previous
+    if (previous_key, previous_value, previous_max) != (key, instance.value, instance.max_value):
+        recompute_summaries({previous_key, key})
+
+
+@receiver(grades_bulk_saved, sender=GradeRecord)
+def update_bulk_grade_summaries(sender, lesson, student_ids, **kwargs):
+    """Пересчитывает сводки и инвалидирует отчёты учеников после массового сохранения оценок урока."""
+    recompute_summaries(
+        (student_id, lesson.subject_id, lesson.classroom_id, term_for(day))
+        for student_id, day in GradeRecord.objects.filter(lesson=lesson, student_id__in=student_ids)
+        .values_list('student_id', 'date')
+    )
+    bump_versions(
+        student_scopes(student_ids) | {classroom_scope(lesson.classroom_id), teacher_scope(lesson.teacher_id)}
+    )
+
+
+@receiver(post_delete, sender=GradeRecord)
+def remove_grade_from_summary(sender, instance, **kwargs):
+    """Пересчитывает сводку, из которой удалена оценка."""
+    recompute_summaries([grade_summary_key(instance)])
+
+
+@receiver(pre_save, sender=AttendanceRecord)
+def remember_attendance_state(sender, instance, raw=False, **kwargs):
+    """Запоминает прежние ключ сводки и статус отметки, чтобы при изменении перенести счётчик."""
+    if raw or instance.pk is None:
+        return
+    previous = AttendanceRecord.objects.select_related('lesson').filter(pk=instance.pk).first()
+    if previous is not None:
+        instance._rollup_previous = (attendance_key(previous), previous.status)
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def update_attendance_rollups(sender, instance, created, raw=False, **kwargs):
+    """Обновляет дневные сводки посещаемости ученика и класса."""
+    if raw:
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    current = (attendance_key(instance), instance.status)
+    if previous is None:
+        if created:
+            apply_attendance(*current, 1)
+        return
+    del instance._rollup_previous
+    if previous != current:
+        apply_attendance(*previous, -1)
+        apply_attendance(*current, 1)
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def remove_attendance_from_rollups(sender, instance, **kwargs):
+    """Вычитает удалённую отметку из дневных сводок."""
+    apply_attendance(attendance_key(instance), instance.status, -1)
+
+
+@receiver(attendance_bulk_saved, sender=AttendanceRecord)
+def update_bulk_attendance_rollups(sender, lesson, student_ids, changes, **kwargs):
+    """Переносит счётчики сводок и инвалидирует отчёты учеников после переклички."""
+    apply_attendance_changes(lesson.classroom_id, lesson.date, changes)
+    bump_versions(
+        student_scopes(student_ids) | {classroom_scope(lesson.classroom_id), teacher_scope(lesson.teacher_id)}
+    )
+
+
+@receiver(pre_save, sender=Lesson)
+def remember_lesson_state(sender, instance, raw=False, **kwargs):
+    """Запоминает прежние класс, предмет, дату и учителя урока."""
+    if raw or instance.pk is None:
+        return
+    previous = (
+        Lesson.objects.filter(pk=instance.pk).values_list('classroom_id', 'subject_id', 'date', 'teacher_id').first()
+    )
+    if previous is not None:
+        classroom_id, subject_id, day, teacher_id = previous
+        instance._rollup_previous = (classroom_id, subject_id, day)
+        instance._versions_previous = lesson_scopes(classroom_id, teacher_id)
+
+
+@receiver(post_save, sender=Lesson)
+def move_lesson_rollups(sender, instance, raw=False, **kwargs):
+    """Переносит оценки и отметки урока в другие сводки, если у урока сменились класс, предмет или дата."""
+    previous = getattr(instance, '_rollup_previous', None)
+    if raw or previous is None:
+        return
+    del instance._rollup_previous
+    classroom_id, subject_id, day = previous
+    if (classroom_id, subject_id, day) == (instance.classroom_id, instance.subject_id, instance.date):
+        return
+
+    keys = set()
+    for student_id, grade_date in instance.grades.values_list('student_id', 'date'):
+        term = term_for(grade_date)
+        keys.add((student_id, subject_id, classroom_id, term))
+        keys.add((student_id, instance.subject_id, instance.classroom_id, term))
+    recompute_summaries(keys)
+
+    for student_id, status in instance.attendance.values_list('student_id', 'status'):
+        apply_attendance((student_id, classroom_id, day), status, -1)
+        apply_attendance((student_id, instance.classroom_id, instance.date), status, 1)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def bump_enrollment_versions(sender, instance, **kwargs):
+    """Инвалидирует отчёты класса и ученика при зачислении или отчислении."""
+    bump_versions(student_scopes([instance.student_id]) | {classroom_scope(instance.classroom_id)})
+
+
+@receiver(post_save, sender=Subject)
+@receiver(post_delete, sender=Subject)
+@receiver(post_save, sender=ClassRoom)
+@receiver(post_delete, sender=ClassRoom)
+def bump_academics_version(sender, instance, **kwargs):
+    """Инвалидирует все отчёты при изменении справочников (предметы, классы)."""
+    bump_versions([ACADEMICS_SCOPE])
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def bump_lesson_versions(sender, instance, created=False, **kwargs):
+    """
+    Инвалидирует отчёты класса и учителя урока (при переносе — и прежних) и
+    учеников с оценками или отметками урока: в их отчётах выводятся тема и дата урока.
+    """
+    scopes = lesson_scopes(instance.classroom_id, instance.teacher_id)
+    previous = getattr(instance, '_versions_previous', None)
+    if previous is not None:
+        del instance._versions_previous
+        scopes |= previous
+    if not created:
+        student_ids = set(instance.grades.values_list('student_id', flat=True))
+        student_ids.update(instance.attendance.values_list('student_id', flat=True))
+        scopes |= student_scopes(student_ids)
+    bump_versions(scopes)
+
+
+@receiver(post_save, sender=User)
+def update_student_search_entry(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Обновляет поисковую запись при сохранении пользователя (но не при обновлении, например, last_login)."""
+    if raw or (update_fields is not None and not SEARCH_FIELDS & set(update_fields)):
+        return
+    sync_search_entry(instance)
+
+
+@receiver(pre_save, sender=User)
+def remember_profile_state(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Запоминает выводимые в отчётах поля пользователя до сохранения."""
+    if raw or instance.pk is None or (update_fields is not None and not PROFILE_FIELDS & set(update_fields)):
+        return
+    instance._profile_previous = User.objects.filter(pk=instance.pk).values(*PROFILE_FIELDS).first()
+
+
+@receiver(post_save, sender=User)
+def bump_profile_version(sender, instance, raw=False, **kwargs):
+    """
+    Инвалидирует отчёты и ответы API ученика (и его классов) или учителя,
+    если изменились его имя, логин, почта или роль.
+    """
+    previous = getattr(instance, '_profile_previous', None)
+    if raw or previous is None:
+        return
+    del instance._profile_previous
+    if all(previous[field] == getattr(instance, field) for field in PROFILE_FIELDS):
+        return
+
+    scopes = set()
+    roles = {previous['role'], instance.role}
+    if 'STUDENT' in roles:
+        scopes |= student_scopes([instance.pk])
+    if 'TEACHER' in roles:
+        scopes.add(teacher_scope(instance.pk))
+    bump_versions(scopes)
+
+
+@receiver(post_delete, sender=User)
+def remove_student_from_search(sender, instance, **kwargs):
+    """Удаляет ученика из префиксного индекса; запись в базе удаляется каскадно."""
+    prefix_index.remove(instance.pk)
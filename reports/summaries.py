@@ -0,0 +1,225 @@
+"""
+Поддержка сводок оценок GradeSummary.
+
+Новая оценка добавляется к сводке приращением (счётчики, суммы, минимум и
+максимум) без чтения остальных оценок. При изменении или удалении оценки
+минимум и максимум приращением не восстановить, поэтому затронутые сводки
+пересчитываются по оценкам ученика, предмета, класса и четверти.
+"""
+import calendar
+from collections import defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import (
+    Case, CharField, Count, DecimalField, F, FloatField, Max, Min, Sum, Value, When,
+)
+from django.db.models.functions import Cast, Coalesce, Concat, ExtractYear, Greatest, Least, NullIf
+
+from journal.models import GradeRecord
+from .models import GradeSummary
+
+# Учебный год начинается 1 сентября.
+ACADEMIC_YEAR_START_MONTH = 9
+
+# Четверти: (номер, первый месяц, последний месяц).
+TERMS = (
+    (1, 9, 10),
+    (2, 11, 12),
+    (3, 1, 3),
+    (4, 4, 8),
+)
+
+# Префикс имён агрегатов, см. summary_aggregates().
+SUMMARY_PREFIX = "summary_"
+
+# Размер пачки при массовом создании сводок.
+REBUILD_BATCH_SIZE = 1000
+
+
+def term_for(day):
+    """
+    Возвращает четверть, к которой относится дата, в виде '2025-1'.
+
+    Аргументы:
+        day (date): дата оценки.
+    """
+    year = day.year if day.month >= ACADEMIC_YEAR_START_MONTH else day.year - 1
+    number = next(number for number, first, last in TERMS if first <= day.month <= last)
+    return f"{year}-{number}"
+
+
+def term_bounds(term):
+    """
+    Возвращает первый и последний день четверти.
+
+    Аргументы:
+        term (str): четверть в виде '2025-1'.
+
+    Возвращает:
+        tuple[date, date]: границы четверти включительно.
+    """
+    year, number = (int(part) for part in term.split("-"))
+    _, first, last = TERMS[number - 1]
+    if first < ACADEMIC_YEAR_START_MONTH:
+        year += 1
+    return date(year, first, 1), date(year, last, calendar.monthrange(year, last)[1])
+
+
+def term_expression(field="date"):
+    """SQL-выражение, вычисляющее четверть по полю даты так же, как term_for()."""
+    year = Case(
+        When(**{f"{field}__month__gte": ACADEMIC_YEAR_START_MONTH}, then=ExtractYear(field)),
+        default=ExtractYear(field) - 1,
+    )
+    number = Case(*[
+        When(**{f"{field}__month__gte": first, f"{field}__month__lte": last}, then=Value(number))
+        for number, first, last in TERMS
+    ])
+    return Concat(Cast(year, CharField()), Value("-"), Cast(number, CharField()), output_field=CharField())
+
+
+def summary_aggregates():
+    """
+    Агрегаты по GradeRecord, из которых состоит сводка.
+
+    Имена агрегатов начинаются с SUMMARY_PREFIX, чтобы не пересекаться с полями
+    GradeRecord (например, max_value); см. summary_fields().
+    """
+    normalized = Cast("value", FloatField()) / NullIf(Cast("max_value", FloatField()), 0.0)
+    aggregates = {
+        "count": Count("id"),
+        "value_sum": Sum("value"),
+        "normalized_sum": Coalesce(Sum(normalized), 0.0),
+        "normalized_count": Count(normalized),
+        "min_value": Min("value"),
+        "max_value": Max("value"),
+        "last_date": Max("date"),
+    }
+    return {SUMMARY_PREFIX + name: aggregate for name, aggregate in aggregates.items()}
+
+
+def summary_fields(row):
+    """Возвращает значения полей GradeSummary из строки с агрегатами summary_aggregates()."""
+    return {name[len(SUMMARY_PREFIX):]: value for name, value in row.items() if name.startswith(SUMMARY_PREFIX)}
+
+
+def grade_summary_key(grade):
+    """
+    Возвращает ключ сводки, к которой относится оценка.
+
+    Возвращает:
+        tuple: (student_id, subject_id, classroom_id, term).
+    """
+    lesson = grade.lesson
+    return grade.student_id, lesson.subject_id, lesson.classroom_id, term_for(grade.date)
+
+
+def _lookup(key):
+    student_id, subject_id, classroom_id, term = key
+    return {"student_id": student_id, "subject_id": subject_id, "classroom_id": classroom_id, "term": term}
+
+
+def add_grade(grade):
+    """
+    Добавляет новую оценку к её сводке приращением.
+
+    Аргументы:
+        grade (GradeRecord): только что созданная оценка.
+    """
+    value = Value(grade.value, output_field=DecimalField())
+    day = Value(grade.date)
+    normalized = float(grade.value) / float(grade.max_value) if grade.max_value else None
+    with transaction.atomic():
+        summary, _ = GradeSummary.objects.get_or_create(**_lookup(grade_summary_key(grade)))
+        GradeSummary.objects.filter(pk=summary.pk).update(
+            count=F("count") + 1,
+            value_sum=F("value_sum") + value,
+            normalized_sum=F("normalized_sum") + (normalized or 0.0),
+            normalized_count=F("normalized_count") + int(normalized is not None),
+            min_value=Least(Coalesce("min_value", value), value),
+            max_value=Greatest(Coalesce("max_value", value), value),
+            last_date=Greatest(Coalesce("last_date", day), day),
+        )
+
+
+def recompute_summaries(keys):
+    """
+    Пересчитывает сводки по оценкам; сводки без оценок удаляются.
+
+    Ключи группируются по предмету, классу и четверти: на группу выполняется
+    один сгруппированный по ученикам запрос, одна массовая вставка с
+    обновлением и одно удаление, сколько бы учеников в неё ни входило.
+
+    Аргументы:
+        keys (Iterable[tuple]): ключи сводок, см. grade_summary_key().
+    """
+    groups = defaultdict(set)
+    for student_id, subject_id, classroom_id, term in set(keys):
+        groups[subject_id, classroom_id, term].add(student_id)
+
+    with transaction.atomic():
+        for (subject_id, classroom_id, term), student_ids in groups.items():
+            rows = (
+                GradeRecord.objects
+                .filter(
+                    student_id__in=student_ids,
+                    lesson__subject_id=subject_id,
+                    lesson__classroom_id=classroom_id,
+                    date__range=term_bounds(term),
+                )
+                .values("student_id")
+                .annotate(**summary_aggregates())
+                .order_by()
+            )
+            summaries = [
+                GradeSummary(student_id=row["student_id"], subject_id=subject_id, classroom_id=classroom_id,
+                             term=term, **summary_fields(row))
+                for row in rows
+            ]
+            if summaries:
+                GradeSummary.objects.bulk_create(
+                    summaries,
+                    update_conflicts=True,
+                    unique_fields=["student", "subject", "classroom", "term"],
+                    update_fields=[name[len(SUMMARY_PREFIX):] for name in summary_aggregates()],
+                )
+            empty = student_ids - {summary.student_id for summary in summaries}
+            if empty:
+                GradeSummary.objects.filter(
+                    student_id__in=empty, subject_id=subject_id, classroom_id=classroom_id, term=term,
+                ).delete()
+
+
+def rebuild_grade_summaries(grade_model=GradeRecord, summary_model=GradeSummary):
+    """
+    Пересоздаёт все сводки по оценкам одним сгруппированным запросом.
+
+    Аргументы:
+        grade_model, summary_model: модели оценок и сводок; миграция передаёт
+            исторические версии моделей.
+
+    Возвращает:
+        int: количество созданных сводок.
+    """
+    rows = (
+        grade_model.objects
+        .values("student_id", subject_id=F("lesson__subject_id"), classroom_id=F("lesson__classroom_id"),
+                term=term_expression())
+        .annotate(**summary_aggregates())
+        .order_by()
+    )
+    created = 0
+    with transaction.atomic():
+        summary_model.objects.all().delete()
+        batch = []
+        for row in rows.iterator(chunk_size=REBUILD_BATCH_SIZE):
+            batch.append(summary_model(
+                student_id=row["student_id"], subject_id=row["subject_id"],
+                classroom_id=row["classroom_id"], term=row["term"], **summary_fields(row),
+            ))
+            if len(batch) >= REBUILD_BATCH_SIZE:
+                created += len(summary_model.objects.bulk_create(batch))
+                batch = []
+        created += len(summary_model.objects.bulk_create(batch))
+    return created
@@ -1,3 +1,771 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import re
+import tempfile
+import zipfile
+from collections import defaultdict
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from reportlab.platypus import LongTable, Paragraph
+
+from academics.models import ClassRoom, Enrollment, Lesson, Subject
+from accounts.models import User
+from journal.bulk import upsert_attendance, upsert_grades
+from journal.models import AttendanceRecord, GradeRecord
+from . import pdf
+from .aggregates import class_grade_stats
+from .attendance import COUNT_FIELDS, STATUS_FIELDS
+from .cache import FileReportStore, ReportCache
+from .jobs import claim_jobs, enqueue_report, execute_job, requeue_stale_jobs, send_heartbeat
+from .matrix import attendance_matrix
+from .models import ClassAttendanceDay, GradeSummary, ReportJob, StudentAttendanceDay, StudentSearchEntry
+from .pdf import Column, ReportTable
+from .search import search_queryset
+from .summaries import term_for
+from .versioning import ACADEMICS_SCOPE, classroom_scope, get_versions, student_scope, teacher_scope
+from .xlsx import iter_xlsx
+from .zipstream import StreamingZip
+
+
+def render_stub(output):
+    output.write(b'%PDF')
+
+
+def stored_summaries():
+    """Сводки оценок из таблицы GradeSummary: {ключ: поля}."""
+    return {
+        (summary.student_id, summary.subject_id, summary.classroom_id, summary.term): (
+            summary.count, summary.value_sum, round(summary.normalized_sum, 6), summary.normalized_count,
+            summary.min_value, summary.max_value, summary.last_date,
+        )
+        for summary in GradeSummary.objects.all()
+    }
+
+
+def aggregated_summaries():
+    """Те же сводки, посчитанные напрямую по всем оценкам."""
+    groups = defaultdict(list)
+    for grade in GradeRecord.objects.select_related('lesson'):
+        groups[grade.student_id, grade.lesson.subject_id, grade.lesson.classroom_id, term_for(grade.date)].append(grade)
+    summaries = {}
+    for key, grades in groups.items():
+        values = [grade.value for grade in grades]
+        normalized = [float(grade.value) / float(grade.max_value) for grade in grades if grade.max_value]
+        summaries[key] = (
+            len(grades), sum(values), round(sum(normalized), 6), len(normalized),
+            min(values), max(values), max(grade.date for grade in grades),
+        )
+    return summaries
+
+
+def stored_rollups():
+    """Ненулевые дневные сводки посещаемости учеников и классов из таблиц."""
+    return tuple(
+        {
+            tuple(row[:-len(COUNT_FIELDS)]): row[-len(COUNT_FIELDS):]
+            for row in model.objects.values_list(*key, *COUNT_FIELDS)
+            if any(row[-len(COUNT_FIELDS):])
+        }
+        for model, key in (
+            (StudentAttendanceDay, ('student_id', 'classroom_id', 'date')),
+            (ClassAttendanceDay, ('classroom_id', 'date')),
+        )
+    )
+
+
+def aggregated_rollups():
+    """Те же сводки, посчитанные напрямую по всем отметкам."""
+    students = defaultdict(lambda: dict.fromkeys(COUNT_FIELDS, 0))
+    classes = defaultdict(lambda: dict.fromkeys(COUNT_FIELDS, 0))
+    for record in AttendanceRecord.objects.select_related('lesson'):
+        field = STATUS_FIELDS[record.status]
+        students[record.student_id, record.lesson.classroom_id, record.lesson.date][field] += 1
+        classes[record.lesson.classroom_id, record.lesson.date][field] += 1
+    return tuple(
+        {key: tuple(counts[field] for field in COUNT_FIELDS) for key, counts in rollups.items()}
+        for rollups in (students, classes)
+    )
+
+
+class ReportCacheTests(TestCase):
+    """Кэш PDF-отчётов: общие счётчики и чтение файла, вытесненного другим процессом."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.store = FileReportStore(directory.name, max_bytes=1024 * 1024)
+
+    def test_counters_are_shared_between_instances(self):
+        ReportCache(self.store).get_or_render('a', render_stub).close()
+        ReportCache(self.store).get_or_render('a', render_stub).close()
+        # Другой экземпляр (как в другом процессе) видит те же счётчики.
+        stats = ReportCache(self.store).stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+        ReportCache(self.store).clear()
+        self.assertEqual(ReportCache(self.store).stats()['hits'], 0)
+
+    def test_class_report_is_shared_between_users(self):
+        classroom = ClassRoom.objects.create(grade_level=5, name='А')
+        url = reverse('reports:class_report_pdf', args=[classroom.pk])
+        with override_settings(REPORTS_CACHE_DIR=self.store.directory):
+            for number in range(2):
+                teacher = User.objects.create_user(username=f't{number}', email=f't{number}@example.com',
+                                                   password='pw', role='TEACHER', first_name=f'Учитель {number}')
+                self.client.force_login(teacher)
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+            stats = ReportCache(self.store).stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_header_prints_date_from_params(self):
+        header = pdf.header('Отчёт', datetime.date(2025, 1, 2))
+        self.assertIn('02.01.2025', header[2].text)
+
+    def test_file_evicted_during_open_is_a_miss(self):
+        self.store.save('a', io.BytesIO(b'%PDF'))
+        with mock.patch('reports.cache.os.utime', side_effect=FileNotFoundError):
+            self.assertIsNone(self.store.open('a'))
+
+
+class ReportTableTests(SimpleTestCase):
+    """Декларативная таблица отчёта: ячейки и построение частями."""
+
+    def setUp(self):
+        pdf.setup()
+
+    def test_cells_without_wrap_are_plain_strings(self):
+        text = 'очень длинный комментарий ' * 10
+        table = ReportTable([
+            Column("Текст", 50, lambda row: row[0]),
+            Column("Перенос", 50, lambda row: row[0], wrap=True),
+            Column("Число", 50, lambda row: row[1]),
+        ], [(text, 5), ('', None)], footer=['Итого', None, 5])
+        header, long_row, empty_row, footer = table.data()
+        self.assertEqual(header, ['Текст', 'Перенос', 'Число'])
+        self.assertEqual(long_row[0], text)
+        self.assertIsInstance(long_row[1], Paragraph)
+        self.assertEqual(long_row[2], '5')
+        self.assertEqual(empty_row, ['-', '-', '-'])
+        self.assertEqual(footer, ['Итого', '', '5'])
+
+    def test_flowables_are_chunked_and_keep_footer(self):
+        columns = [Column("Номер", 50, lambda row: row)]
+        read = []
+
+        def rows():
+            for number in range(2 * pdf.STREAM_CHUNK_ROWS + 5):
+                read.append(number)
+                yield number
+
+        chunks = ReportTable(columns, rows(), footer=['Итого']).flowables()
+        first = next(chunks)
+        # Строки читаются по мере построения частей.
+        self.assertEqual(len(read), pdf.STREAM_CHUNK_ROWS)
+        tables = [first, *chunks]
+        self.assertTrue(all(isinstance(table, LongTable) for table in tables))
+        # В каждой части — заголовок, в последней — остаток строк и итоговая строка.
+        self.assertEqual([len(table._cellvalues) for table in tables],
+                         [pdf.STREAM_CHUNK_ROWS + 1, pdf.STREAM_CHUNK_ROWS + 1, 1 + 5 + 1])
+        self.assertEqual(tables[0]._cellvalues[0], ['Номер'])
+        self.assertEqual(tables[-1]._cellvalues[-1], ['Итого'])
+
+        tables = list(ReportTable(columns, [], footer=['Итого']).flowables())
+        self.assertEqual([table._cellvalues for table in tables], [[['Номер'], ['Итого']]])
+
+
+class ExportArchiveTests(TestCase):
+    """Выгрузка отчётов всей школы одним ZIP-архивом."""
+
+    def test_streaming_zip_opens(self):
+        archive = StreamingZip()
+        parts = [*archive.write('a.txt', [b'hello ', b'world']),
+                 *archive.write_file('b.pdf', io.BytesIO(b'%PDF' * 50000), chunk_size=1000)]
+        parts.append(archive.close())
+        self.assertTrue(all(parts))
+        with zipfile.ZipFile(io.BytesIO(b''.join(parts))) as result:
+            self.assertIsNone(result.testzip())
+            self.assertEqual(result.read('a.txt'), b'hello world')
+            self.assertEqual(result.read('b.pdf'), b'%PDF' * 50000)
+
+    def test_only_director_exports(self):
+        url = reverse('reports:export_all_reports')
+        teacher = User.objects.create_user(username='t', email='t@example.com', password='pw', role='TEACHER')
+        director = User.objects.create_user(username='d', email='d@example.com', password='pw', role='ADMIN')
+        with mock.patch('reports.views.export_archive', return_value=iter([b'PK'])) as export_archive:
+            self.client.force_login(teacher)
+            self.assertEqual(self.client.get(url).status_code, 403)
+            export_archive.assert_not_called()
+            self.client.force_login(director)
+            response = self.client.get(url)
+            self.assertEqual(response['Content-Type'], 'application/zip')
+            self.assertEqual(b''.join(response.streaming_content), b'PK')
+        export_archive.assert_called_once()
+
+
+def xlsx_sheets(content):
+    """Листы XLSX-файла: {имя: строки}, строки — списки текстов ячеек."""
+    with zipfile.ZipFile(io.BytesIO(content)) as book:
+        names = re.findall(r'<sheet name="([^"]*)"', book.read('xl/workbook.xml').decode())
+        return {
+            name: [
+                re.findall(r'<(?:t xml:space="preserve"|v)>([^<]*)<', row)
+                for row in re.findall(r'<row>(.*?)</row>', book.read(f'xl/worksheets/sheet{index}.xml').decode())
+            ]
+            for index, name in enumerate(names, start=1)
+        }
+
+
+class TableExportTests(TestCase):
+    """Табличная выгрузка оценок и посещаемости в CSV и XLSX."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.other_teacher = (
+            User.objects.create_user(username=name, email=f'{name}@example.com', password='pw', role='TEACHER',
+                                     last_name=last_name, first_name='Анна')
+            for name, last_name in (('t1', 'Петрова'), ('t2', 'Сидорова'))
+        )
+        cls.director = User.objects.create_user(username='d', email='d@example.com', password='pw', role='ADMIN')
+        cls.student = User.objects.create_user(username='s', email='s@example.com', password='pw',
+                                               role='STUDENT')
+        subject = Subject.objects.create(name='Математика', teacher=cls.teacher)
+        cls.classroom, other_classroom = (
+            ClassRoom.objects.create(grade_level=5, name=name) for name in ('А', 'Б')
+        )
+        for day, (teacher, classroom) in enumerate(((cls.teacher, cls.classroom), (cls.other_teacher, cls.classroom),
+                                                    (cls.teacher, other_classroom)), start=1):
+            lesson = Lesson.objects.create(subject=subject, classroom=classroom, teacher=teacher,
+                                           date=datetime.date(2025, 9, day), topic=f'Тема {day}')
+            GradeRecord.objects.create(lesson=lesson, student=cls.student, value=day)
+            AttendanceRecord.objects.create(lesson=lesson, student=cls.student, status='A')
+
+    def export(self, user, dataset, file_format, **params):
+        self.client.force_login(user)
+        response = self.client.get(reverse('reports:table_export', args=[dataset, file_format]), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def csv_rows(self, user, dataset, **params):
+        return list(csv.reader(io.StringIO(self.export(user, dataset, 'csv', **params).decode('utf-8-sig'))))
+
+    def test_teacher_exports_only_own_lessons(self):
+        header, *rows = self.csv_rows(self.teacher, 'grades', teacher=self.other_teacher.pk)
+        self.assertEqual(header[0], 'Дата урока')
+        self.assertEqual([(row[0], row[1], row[5]) for row in rows],
+                         [('2025-09-01', '5А', 'Тема 1'), ('2025-09-03', '5Б', 'Тема 3')])
+        self.client.force_login(self.student)
+        self.assertEqual(self.client.get(reverse('reports:table_export', args=['grades', 'csv'])).status_code, 403)
+
+    def test_director_filters(self):
+        rows = self.csv_rows(self.director, 'attendance', classroom=self.classroom.pk,
+                             start_date='2025-09-02')[1:]
+        self.assertEqual([(row[0], row[3], row[6]) for row in rows], [('2025-09-02', 'Сидорова Анна', 'Отсутствовал')])
+        self.assertEqual(len(self.csv_rows(self.director, 'grades')), 1 + 3)
+        self.client.force_login(self.director)
+        url = reverse('reports:table_export', args=['grades', 'csv'])
+        self.assertEqual(self.client.get(url, {'classroom': 'x'}).status_code, 400)
+
+    def test_xlsx(self):
+        sheets = xlsx_sheets(self.export(self.director, 'grades', 'xlsx', classroom=self.classroom.pk))
+        [(name, rows)] = sheets.items()
+        self.assertEqual(name, 'Оценки')
+        self.assertEqual(rows[0][:2], ['Дата урока', 'Класс'])
+        self.assertEqual([row[1:3] for row in rows[1:]], [['5А', 'Математика'], ['5А', 'Математика']])
+
+    def test_xlsx_sheet_rollover(self):
+        with mock.patch('reports.xlsx.MAX_SHEET_ROWS', 2):
+            sheets = xlsx_sheets(b''.join(iter_xlsx(['№'], ([number] for number in range(5)), title='Лист')))
+            self.assertEqual(list(sheets), ['Лист', 'Лист (2)', 'Лист (3)'])
+            self.assertEqual(list(sheets.values()), [[['№'], ['0'], ['1']], [['№'], ['2'], ['3']], [['№'], ['4']]])
+            # Ровно заполненный лист не даёт пустого продолжения.
+            self.assertEqual(list(xlsx_sheets(b''.join(iter_xlsx(['№'], [[1], [2]])))), ['Лист'])
+
+
+class StudentSearchTests(TestCase):
+    """Поисковая запись ученика с длинными именами и транслитерацией."""
+
+    def test_long_names_are_indexed(self):
+        student = User.objects.create_user(
+            username='щ' * 150, email='long@example.com', password='pw', role='STUDENT',
+            first_name='Щукарь' * 5, last_name='Жужжащий' * 3,
+        )
+        entry = StudentSearchEntry.objects.get(student=student)
+        self.assertGreater(len(entry.text), 500)
+        self.assertIn(student.pk, search_queryset('shchukar').values_list('student_id', flat=True))
+
+    def test_kazakh_names_are_found_in_both_scripts(self):
+        student = User.objects.create_user(username='aliya_2010', email='kz@example.com', password='pw',
+                                           role='STUDENT', first_name='Әлия', last_name='Сүлейменова')
+        for query in ('Әлия', 'алия', 'aliia', 'suleimenova', 'Сүлейм', 'aliya'):
+            with self.subTest(query=query):
+                self.assertIn(student.pk, search_queryset(query).values_list('student_id', flat=True))
+
+
+class ReportJobTests(TestCase):
+    """Очередь заданий на отчёты: гонка при постановке и возврат зависших заданий."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='d', email='d@example.com', password='pw', role='ADMIN')
+
+    def make_job(self, status, **fields):
+        return ReportJob.objects.create(kind=ReportJob.Kind.CLASS, object_id=1, params={}, cache_key='key',
+                                        filename='report.pdf', requested_by=self.user, status=status, **fields)
+
+    def test_enqueue_race_with_already_finished_job(self):
+        done = self.make_job(ReportJob.Status.DONE, finished_at=timezone.now())
+        # Отчёта в кэше ещё нет, задание создаёт параллельный запрос и успевает его завершить.
+        with mock.patch.object(ReportJob.objects, 'create', side_effect=IntegrityError), \
+                mock.patch('reports.jobs.get_report_cache') as report_cache:
+            report_cache.return_value.store.exists.side_effect = [False, True]
+            job = enqueue_report(ReportJob.Kind.CLASS, 1, 'key', {}, 'report.pdf', self.user)
+        self.assertEqual(job, done)
+
+    def test_requeue_skips_own_running_jobs(self):
+        started = timezone.now() - datetime.timedelta(hours=1)
+        own = self.make_job(ReportJob.Status.RUNNING, started_at=started)
+        ReportJob.objects.filter(pk=own.pk).update(cache_key='own')
+        stale = self.make_job(ReportJob.Status.RUNNING, started_at=started)
+        self.assertEqual(requeue_stale_jobs(datetime.timedelta(minutes=10), exclude=[own.pk]), 1)
+        stale.refresh_from_db()
+        own.refresh_from_db()
+        self.assertEqual((stale.status, own.status), (ReportJob.Status.PENDING, ReportJob.Status.RUNNING))
+
+    def test_requeue_uses_heartbeat(self):
+        started = timezone.now() - datetime.timedelta(hours=1)
+        alive = self.make_job(ReportJob.Status.RUNNING, started_at=started, worker='a:1')
+        ReportJob.objects.filter(pk=alive.pk).update(cache_key='alive')
+        dead = self.make_job(ReportJob.Status.RUNNING, started_at=started, worker='b:1',
+                             heartbeat_at=timezone.now() - datetime.timedelta(minutes=5))
+        # Долгое задание живого обработчика не возвращается в очередь.
+        self.assertEqual(send_heartbeat([alive.pk, dead.pk], 'a:1'), 1)
+        self.assertEqual(requeue_stale_jobs(datetime.timedelta(minutes=2)), 1)
+        dead.refresh_from_db()
+        self.assertEqual((dead.status, dead.worker, dead.heartbeat_at), (ReportJob.Status.PENDING, '', None))
+
+    def test_requeued_job_is_finished_only_by_its_new_worker(self):
+        classroom = ClassRoom.objects.create(grade_level=5, name='А')
+        job = self.make_job(ReportJob.Status.PENDING)
+        ReportJob.objects.filter(pk=job.pk).update(object_id=classroom.pk, params={'date': '2025-09-01'})
+        self.assertEqual(claim_jobs(1, 'a:1'), [job.pk])
+        requeue_stale_jobs(datetime.timedelta(0))
+        self.assertEqual(claim_jobs(1, 'b:1'), [job.pk])
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(REPORTS_CACHE_DIR=directory.name):
+            self.assertFalse(execute_job(job.pk, 'a:1'))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.worker), (ReportJob.Status.RUNNING, 'b:1'))
+            self.assertTrue(execute_job(job.pk, 'b:1'))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ReportJob.Status.DONE)
+
+    def test_heavy_reports_are_queued_by_default(self):
+        classroom = ClassRoom.objects.create(grade_level=5, name='А')
+        self.client.force_login(self.user)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(REPORTS_CACHE_DIR=directory.name):
+            response = self.client.get(reverse('reports:class_attendance_report_pdf', args=[classroom.pk]))
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(response.json()['kind'], ReportJob.Kind.ATTENDANCE)
+            response = self.client.get(reverse('reports:class_attendance_report_pdf', args=[classroom.pk]),
+                                       {'async': '0'})
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            b''.join(response.streaming_content)
+            response = self.client.get(reverse('reports:class_report_pdf', args=[classroom.pk]))
+            self.assertEqual(response['Content-Type'], 'application/pdf')
+            b''.join(response.streaming_content)
+
+
+class GradeSummaryConsistencyTests(TestCase):
+    """Таблица GradeSummary совпадает с агрегатом по оценкам после любых изменений."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='t', email='t@example.com', password='pw', role='TEACHER')
+        cls.students = [
+            User.objects.create_user(username=f's{number}', email=f's{number}@example.com', password='pw',
+                                     role='STUDENT')
+            for number in range(2)
+        ]
+        cls.subject, cls.other_subject = (
+            Subject.objects.create(name=name, teacher=cls.teacher) for name in ('Математика', 'Физика')
+        )
+        cls.classroom, cls.other_classroom = (
+            ClassRoom.objects.create(grade_level=5, name=name, curator=cls.teacher) for name in ('А', 'Б')
+        )
+        for student in cls.students:
+            Enrollment.objects.create(student=student, classroom=cls.classroom)
+        cls.lesson, cls.second_lesson = (
+            Lesson.objects.create(subject=cls.subject, classroom=cls.classroom, teacher=cls.teacher,
+                                  date=datetime.date(2025, 9, day))
+            for day in (1, 2)
+        )
+
+    def grade(self, lesson, student, value, max_value=100):
+        return GradeRecord.objects.create(lesson=lesson, student=student, value=value, max_value=max_value)
+
+    def assertConsistent(self):
+        self.assertEqual(stored_summaries(), aggregated_summaries())
+
+    def test_create_update_delete(self):
+        first = self.grade(self.lesson, self.students[0], 80)
+        self.assertConsistent()
+        second = self.grade(self.second_lesson, self.students[0], 60, max_value=0)
+        self.assertConsistent()
+        # Минимум после изменения оценки приращением не восстановить — сводка пересчитывается.
+        second.value = 95
+        second.max_value = 100
+        second.save()
+        self.assertConsistent()
+        first.delete()
+        self.assertConsistent()
+        second.delete()
+        self.assertConsistent()
+        self.assertFalse(GradeSummary.objects.exists())
+
+    def test_bulk_upsert(self):
+        self.grade(self.lesson, self.students[0], 40)
+        upsert_grades([
+            GradeRecord(lesson=self.lesson, student=self.students[0], value=90, max_value=100),
+            GradeRecord(lesson=self.lesson, student=self.students[1], value=70, max_value=100),
+        ])
+        self.assertConsistent()
+        self.assertEqual(stored_summaries()[self.students[0].pk, self.subject.pk, self.classroom.pk,
+                                            term_for(timezone.localdate())][1], Decimal(90))
+
+    def test_moving_lesson(self):
+        self.grade(self.lesson, self.students[0], 80)
+        self.grade(self.second_lesson, self.students[0], 50)
+        self.lesson.classroom = self.other_classroom
+        self.lesson.save()
+        self.assertConsistent()
+        self.lesson.subject = self.other_subject
+        self.lesson.save()
+        self.assertConsistent()
+        self.assertEqual(GradeSummary.objects.count(), 2)
+
+    def test_rebuild_leaves_nothing_to_fix(self):
+        grade = self.grade(self.lesson, self.students[0], 80)
+        self.grade(self.second_lesson, self.students[0], 30)
+        self.grade(self.lesson, self.students[1], 100)
+        grade.value = 20
+        grade.save()
+        self.second_lesson.classroom = self.other_classroom
+        self.second_lesson.save()
+        upsert_grades([GradeRecord(lesson=self.lesson, student=self.students[1], value=60, max_value=80)])
+        before = stored_summaries()
+        call_command('rebuild_grade_summaries', stdout=io.StringIO())
+        self.assertEqual(stored_summaries(), before)
+        self.assertEqual(before, aggregated_summaries())
+
+
+class ClassGradeStatsTests(TestCase):
+    """Статистика класса по сводкам GradeSummary совпадает со статистикой по самим оценкам."""
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(username='t', email='t@example.com', password='pw', role='TEACHER')
+        cls.students = [
+            User.objects.create_user(username=f's{number}', email=f's{number}@example.com', password='pw',
+                                     role='STUDENT', last_name=last_name, first_name=first_name)
+            for number, (last_name, first_name) in enumerate((('Волков', 'Иван'), ('Алексеев', 'Пётр'),
+                                                              ('Алексеев', 'Антон')))
+        ]
+        cls.classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=teacher)
+        for student in cls.students:
+            Enrollment.objects.create(student=student, classroom=cls.classroom)
+        cls.subject, other_subject = (
+            Subject.objects.create(name=name, teacher=teacher) for name in ('Математика', 'Физика')
+        )
+        lessons = [
+            Lesson.objects.create(subject=subject, classroom=cls.classroom, teacher=teacher,
+                                  date=datetime.date(2025, 9, day))
+            for subject, day in ((cls.subject, 1), (cls.subject, 2), (other_subject, 3))
+        ]
+        for lesson, student, value, max_value in (
+            (lessons[0], cls.students[0], 80, 100), (lessons[1], cls.students[0], 4, 5),
+            (lessons[2], cls.students[0], 60, 100), (lessons[0], cls.students[1], 7, 10),
+            (lessons[2], cls.students[1], 3, 0),
+        ):
+            GradeRecord.objects.create(lesson=lesson, student=student, value=value, max_value=max_value)
+
+    def test_order_by_name(self):
+        rows = class_grade_stats(self.classroom)
+        self.assertEqual([row['student'] for row in rows], [self.students[2], self.students[1], self.students[0]])
+        self.assertEqual((rows[0]['count'], rows[0]['average']), (0, None))
+
+    def test_summaries_match_grades(self):
+        # Период задан — статистика считается по оценкам, без него — по сводкам.
+        period = {'start_date': datetime.date(2000, 1, 1)}
+        for subject in (None, self.subject.pk):
+            with self.subTest(subject=subject):
+                self.assertEqual(class_grade_stats(self.classroom, subject=subject),
+                                 class_grade_stats(self.classroom, subject=subject, **period))
+
+
+class AttendanceRollupConsistencyTests(TestCase):
+    """Дневные сводки посещаемости совпадают с агрегатом по отметкам после любых изменений."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='t', email='t@example.com', password='pw', role='TEACHER')
+        cls.students = [
+            User.objects.create_user(username=f's{number}', email=f's{number}@example.com', password='pw',
+                                     role='STUDENT')
+            for number in range(2)
+        ]
+        subject = Subject.objects.create(name='Математика', teacher=cls.teacher)
+        cls.classroom, cls.other_classroom = (
+            ClassRoom.objects.create(grade_level=5, name=name, curator=cls.teacher) for name in ('А', 'Б')
+        )
+        for student in cls.students:
+            Enrollment.objects.create(student=student, classroom=cls.classroom)
+        cls.lesson, cls.second_lesson = (
+            Lesson.objects.create(subject=subject, classroom=cls.classroom, teacher=cls.teacher,
+                                  date=datetime.date(2025, 9, 1))
+            for _ in range(2)
+        )
+
+    def mark(self, lesson, student, status):
+        return AttendanceRecord.objects.create(lesson=lesson, student=student, status=status)
+
+    def assertConsistent(self):
+        self.assertEqual(stored_rollups(), aggregated_rollups())
+
+    def test_create_change_status_delete(self):
+        record = self.mark(self.lesson, self.students[0], AttendanceRecord.Status.PRESENT)
+        self.mark(self.second_lesson, self.students[0], AttendanceRecord.Status.LATE)
+        self.assertConsistent()
+        record.status = AttendanceRecord.Status.ABSENT
+        record.save()
+        self.assertConsistent()
+        record.delete()
+        self.assertConsistent()
+
+    def test_roll_call_overwrites_marks(self):
+        self.mark(self.lesson, self.students[0], AttendanceRecord.Status.ABSENT)
+        upsert_attendance([
+            AttendanceRecord(lesson=self.lesson, student=self.students[0], status=AttendanceRecord.Status.LATE),
+            AttendanceRecord(lesson=self.lesson, student=self.students[1], status=AttendanceRecord.Status.ABSENT),
+        ])
+        self.assertConsistent()
+        # Повторная перекличка с теми же статусами счётчики не меняет.
+        upsert_attendance([
+            AttendanceRecord(lesson=self.lesson, student=self.students[1], status=AttendanceRecord.Status.ABSENT),
+        ])
+        self.assertConsistent()
+
+    def test_moving_lesson(self):
+        self.mark(self.lesson, self.students[0], AttendanceRecord.Status.ABSENT)
+        self.mark(self.lesson, self.students[1], AttendanceRecord.Status.PRESENT)
+        self.mark(self.second_lesson, self.students[0], AttendanceRecord.Status.PRESENT)
+        self.lesson.date = datetime.date(2025, 9, 2)
+        self.lesson.save()
+        self.assertConsistent()
+        self.lesson.classroom = self.other_classroom
+        self.lesson.save()
+        self.assertConsistent()
+
+    def test_rebuild_leaves_nothing_to_fix(self):
+        record = self.mark(self.lesson, self.students[0], AttendanceRecord.Status.PRESENT)
+        self.mark(self.second_lesson, self.students[1], AttendanceRecord.Status.LATE)
+        record.status = AttendanceRecord.Status.ABSENT
+        record.save()
+        self.second_lesson.date = datetime.date(2025, 9, 3)
+        self.second_lesson.save()
+        upsert_attendance([
+            AttendanceRecord(lesson=self.lesson, student=self.students[1], status=AttendanceRecord.Status.ABSENT),
+        ])
+        before = stored_rollups()
+        call_command('rebuild_attendance_rollups', stdout=io.StringIO())
+        self.assertEqual(stored_rollups(), before)
+        self.assertEqual(before, aggregated_rollups())
+
+
+class LessonVersionTests(TestCase):
+    """Изменение урока инвалидирует только отчёты его класса, учителя и учеников."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.other_teacher = (
+            User.objects.create_user(username=name, email=f'{name}@example.com', password='pw', role='TEACHER')
+            for name in ('t1', 't2')
+        )
+        cls.student = User.objects.create_user(username='s', email='s@example.com', password='pw', role='STUDENT')
+        cls.subject = Subject.objects.create(name='Математика', teacher=cls.teacher)
+        cls.classroom, cls.other_classroom = (
+            ClassRoom.objects.create(grade_level=5, name=name, curator=cls.teacher) for name in ('А', 'Б')
+        )
+        cls.scopes = [
+            ACADEMICS_SCOPE, classroom_scope(cls.classroom.pk), classroom_scope(cls.other_classroom.pk),
+            teacher_scope(cls.teacher.pk), teacher_scope(cls.other_teacher.pk), student_scope(cls.student.pk),
+        ]
+
+    def bumped(self, change):
+        """Выполняет изменение и возвращает области, версии которых выросли."""
+        before = get_versions(self.scopes)
+        change()
+        after = get_versions(self.scopes)
+        return {scope for scope in self.scopes if after[scope] != before[scope]}
+
+    def test_new_lesson_bumps_its_class_and_teacher(self):
+        bumped = self.bumped(lambda: Lesson.objects.create(
+            subject=self.subject, classroom=self.classroom, teacher=self.teacher, date=datetime.date(2025, 9, 1),
+        ))
+        self.assertEqual(bumped, {classroom_scope(self.classroom.pk), teacher_scope(self.teacher.pk)})
+
+    def test_moved_lesson_bumps_old_and_new_keys(self):
+        lesson = Lesson.objects.create(subject=self.subject, classroom=self.classroom, teacher=self.teacher,
+                                       date=datetime.date(2025, 9, 1))
+        GradeRecord.objects.create(lesson=lesson, student=self.student, value=80)
+
+        def move():
+            lesson.classroom = self.other_classroom
+            lesson.teacher = self.other_teacher
+            lesson.save()
+
+        self.assertEqual(self.bumped(move), set(self.scopes) - {ACADEMICS_SCOPE})
+
+    def test_classroom_rename_bumps_all_reports(self):
+        def rename():
+            self.classroom.name = 'В'
+            self.classroom.save()
+
+        self.assertIn(ACADEMICS_SCOPE, self.bumped(rename))
+
+
+class JournalVersionTests(TestCase):
+    """Запись оценки инвалидирует отчёты класса урока, даже если ученик в нём не числится, и прежние ключи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher, cls.other_teacher = (
+            User.objects.create_user(username=name, email=f'{name}@example.com', password='pw', role='TEACHER')
+            for name in ('t1', 't2')
+        )
+        cls.student, cls.other_student = (
+            User.objects.create_user(username=name, email=f'{name}@example.com', password='pw', role='STUDENT')
+            for name in ('s1', 's2')
+        )
+        subject = Subject.objects.create(name='Математика', teacher=cls.teacher)
+        cls.classroom, cls.other_classroom = (
+            ClassRoom.objects.create(grade_level=5, name=name, curator=cls.teacher) for name in ('А', 'Б')
+        )
+        cls.lesson = Lesson.objects.create(subject=subject, classroom=cls.classroom, teacher=cls.teacher,
+                                           date=datetime.date(2025, 9, 1))
+        cls.other_lesson = Lesson.objects.create(subject=subject, classroom=cls.other_classroom,
+                                                 teacher=cls.other_teacher, date=datetime.date(2025, 9, 1))
+        cls.scopes = [
+            classroom_scope(cls.classroom.pk), classroom_scope(cls.other_classroom.pk),
+            teacher_scope(cls.teacher.pk), teacher_scope(cls.other_teacher.pk),
+            student_scope(cls.student.pk), student_scope(cls.other_student.pk),
+        ]
+
+    def bumped(self, change):
+        before = get_versions(self.scopes)
+        change()
+        after = get_versions(self.scopes)
+        return {scope for scope in self.scopes if after[scope] != before[scope]}
+
+    def test_mark_of_student_not_in_class_bumps_lesson_class(self):
+        bumped = self.bumped(lambda: AttendanceRecord.objects.create(
+            lesson=self.lesson, student=self.student, status=AttendanceRecord.Status.ABSENT,
+        ))
+        self.assertEqual(bumped, {classroom_scope(self.classroom.pk), teacher_scope(self.teacher.pk),
+                                  student_scope(self.student.pk)})
+
+    def test_moved_grade_bumps_old_and_new_keys(self):
+        grade = GradeRecord.objects.create(lesson=self.lesson, student=self.student, value=80)
+
+        def move():
+            grade.lesson = self.other_lesson
+            grade.student = self.other_student
+            grade.save()
+
+        self.assertEqual(self.bumped(move), set(self.scopes))
+
+
+class ProfileVersionTests(TestCase):
+    """Изменение профиля инвалидирует только отчёты самого пользователя и классов ученика."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username='t', email='t@example.com', password='pw', role='TEACHER')
+        cls.student = User.objects.create_user(username='s', email='s@example.com', password='pw', role='STUDENT')
+        cls.classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=cls.teacher)
+        Enrollment.objects.create(student=cls.student, classroom=cls.classroom)
+        cls.scopes = [ACADEMICS_SCOPE, classroom_scope(cls.classroom.pk), teacher_scope(cls.teacher.pk),
+                      student_scope(cls.student.pk)]
+
+    def bumped(self, user, **fields):
+        before = get_versions(self.scopes)
+        user = User.objects.get(pk=user.pk)
+        for field, value in fields.items():
+            setattr(user, field, value)
+        user.save()
+        after = get_versions(self.scopes)
+        return {scope for scope in self.scopes if after[scope] != before[scope]}
+
+    def test_displayed_field_change(self):
+        self.assertEqual(self.bumped(self.student, last_name='Иванов'),
+                         {student_scope(self.student.pk), classroom_scope(self.classroom.pk)})
+        self.assertEqual(self.bumped(self.teacher, email='new@example.com'), {teacher_scope(self.teacher.pk)})
+
+    def test_other_saves_bump_nothing(self):
+        self.assertEqual(self.bumped(self.student), set())
+        self.assertEqual(self.bumped(self.teacher, is_active=False), set())
+
+
+class AttendanceMatrixTests(TestCase):
+    """Матрица посещаемости: колонки — уроки класса, строки — зачисленные ученики."""
+
+    @classmethod
+    def setUpTestData(cls):
+        teacher = User.objects.create_user(username='t', email='t@example.com', password='pw', role='TEACHER')
+        cls.students = [
+            User.objects.create_user(username=f's{number}', email=f's{number}@example.com', password='pw',
+                                     role='STUDENT', last_name=last_name, first_name='Имя')
+            for number, last_name in enumerate(('Борисов', 'Алексеев', 'Волков'))
+        ]
+        cls.classroom = ClassRoom.objects.create(grade_level=5, name='А', curator=teacher)
+        for student in cls.students[:2]:
+            Enrollment.objects.create(student=student, classroom=cls.classroom)
+        cls.math = Subject.objects.create(name='Математика', code='MATH', teacher=teacher)
+        physics = Subject.objects.create(name='Физика', code='PHYS', teacher=teacher)
+        cls.lessons = [
+            Lesson.objects.create(subject=subject, classroom=cls.classroom, teacher=teacher,
+                                  date=datetime.date(2025, 9, day))
+            for subject, day in ((cls.math, 3), (physics, 2), (cls.math, 1))
+        ]
+        for student, lesson, status in (
+            (cls.students[0], cls.lessons[0], 'A'),
+            (cls.students[1], cls.lessons[1], 'L'),
+            # Ученик не зачислен, но отмечен на уроке класса.
+            (cls.students[2], cls.lessons[2], 'P'),
+        ):
+            AttendanceRecord.objects.create(lesson=lesson, student=student, status=status)
+
+    def test_cells(self):
+        matrix = attendance_matrix(self.classroom)
+        self.assertEqual([lesson[0] for lesson in matrix.lessons], [lesson.pk for lesson in reversed(self.lessons)])
+        self.assertEqual([student[1] for student in matrix.students], ['Алексеев', 'Борисов', 'Волков'])
+        self.assertEqual(matrix.rows, ['-L-', '--A', 'P--'])
+
+    def test_lessons_and_students_without_marks_are_shown(self):
+        AttendanceRecord.objects.all().delete()
+        matrix = attendance_matrix(self.classroom, subject=self.math.pk,
+                                   start_date=datetime.date(2025, 9, 2))
+        self.assertEqual([lesson[0] for lesson in matrix.lessons], [self.lessons[0].pk])
+        self.assertEqual(matrix.rows, ['-', '-'])
+        self.assertEqual(attendance_matrix(self.classroom, end_date=datetime.date(2025, 8, 1)).rows, ['', ''])
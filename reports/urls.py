@@ -9,5 +9,14 @@ urlpatterns = [
     path('student/<int:student_id>/', views.student_report, name='student_report'),
     path('student/<int:student_id>/pdf/', views.student_report_pdf, name="student_report_pdf"),
     path("students/search/", views.student_search, name="student_search"),
+    path("students/autocomplete/", views.student_autocomplete, name="student_autocomplete"),
+    path('class/<int:class_id>/attendance/', views.class_attendance, name='class_attendance'),
+    path('class/<int:class_id>/attendance/matrix/', views.class_attendance_matrix, name='class_attendance_matrix'),
+    path('class/<int:class_id>/attendance/matrix/pdf/', views.class_attendance_matrix_pdf,
+         name='class_attendance_matrix_pdf'),
     path('class/<int:class_id>/attendance/pdf/', views.class_attendance_report_pdf, name='class_attendance_report_pdf'),
+    path('export/', views.export_all_reports, name='export_all_reports'),
+    path('export/<str:dataset>.<str:file_format>', views.table_export, name='table_export'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', views.job_download, name='job_download'),
 ]
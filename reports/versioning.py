@@ -0,0 +1,151 @@
+from django.db.models import F
+from django.utils import timezone
+
+from academics.models import Enrollment, Lesson
+from .models import DataVersion
+
+# Область, общая для всех отчётов: предметы и классы.
+ACADEMICS_SCOPE = "academics"
+
+# Область списка уроков в API: меняется при изменении любого урока; отчёты от неё не зависят.
+LESSONS_SCOPE = "lessons"
+
+
+def classroom_scope(classroom_id):
+    """Возвращает имя области версий для класса."""
+    return f"classroom:{classroom_id}"
+
+
+def student_scope(student_id):
+    """Возвращает имя области версий для ученика."""
+    return f"student:{student_id}"
+
+
+def teacher_scope(teacher_id):
+    """Возвращает имя области версий для учителя: оценки и посещаемость его уроков."""
+    return f"teacher:{teacher_id}"
+
+
+def lesson_scopes(classroom_id, teacher_id):
+    """
+    Возвращает области, затрагиваемые изменением урока: его класс, учитель и список уроков.
+
+    Аргументы:
+        classroom_id (int): класс урока.
+        teacher_id (int): учитель урока.
+
+    Возвращает:
+        set[str]: имена областей.
+    """
+    return {classroom_scope(classroom_id), teacher_scope(teacher_id), LESSONS_SCOPE}
+
+
+def student_scopes(student_ids):
+    """
+    Возвращает области, затрагиваемые изменением данных учеников:
+    сами ученики и все классы, в которые они зачислены.
+
+    Аргументы:
+        student_ids (Iterable[int]): идентификаторы учеников.
+
+    Возвращает:
+        set[str]: имена областей.
+    """
+    student_ids = set(student_ids)
+    scopes = {student_scope(pk) for pk in student_ids}
+    classroom_ids = (
+        Enrollment.objects
+        .filter(student_id__in=student_ids)
+        .values_list("classroom_id", flat=True)
+        .distinct()
+    )
+    scopes.update(classroom_scope(pk) for pk in classroom_ids)
+    return scopes
+
+
+def journal_scopes(student_id, classroom_id, teacher_id):
+    """
+    Возвращает области, затрагиваемые оценкой или отметкой: ученик и его
+    классы, а также класс и учитель урока (ученик может быть уже не зачислен в него).
+
+    Аргументы:
+        student_id (int): ученик.
+        classroom_id (int): класс урока.
+        teacher_id (int): учитель урока.
+
+    Возвращает:
+        set[str]: имена областей.
+    """
+    return student_scopes([student_id]) | {classroom_scope(classroom_id), teacher_scope(teacher_id)}
+
+
+def bump_versions(scopes):
+    """
+    Увеличивает версии указанных областей (создаёт недостающие записи).
+
+    Аргументы:
+        scopes (Iterable[str]): имена областей.
+    """
+    scopes = set(scopes)
+    if not scopes:
+        return
+    DataVersion.objects.bulk_create(
+        [DataVersion(scope=scope) for scope in scopes],
+        ignore_conflicts=True,
+    )
+    DataVersion.objects.filter(scope__in=scopes).update(
+        version=F("version") + 1,
+        updated_at=timezone.now(),
+    )
+
+
+def get_versions(scopes):
+    """
+    Возвращает текущие версии областей одним запросом.
+
+    Аргументы:
+        scopes (Iterable[str]): имена областей.
+
+    Возвращает:
+        dict[str, int]: версия для каждой области (0, если изменений ещё не было).
+    """
+    scopes = set(scopes)
+    versions = dict.fromkeys(scopes, 0)
+    versions.update(
+        DataVersion.objects.filter(scope__in=scopes).values_list("scope", "version")
+    )
+    return versions
+
+
+def _version_stamp_query(scopes):
+    return DataVersion.objects.filter(scope__in=scopes).values_list("scope", "version", "updated_at")
+
+
+def _version_stamp(scopes, rows):
+    versions = dict.fromkeys(scopes, 0)
+    last_modified = None
+    for scope, version, updated_at in rows:
+        versions[scope] = version
+        last_modified = max(last_modified, updated_at) if last_modified else updated_at
+    return versions, last_modified
+
+
+def get_version_stamp(scopes):
+    """
+    Возвращает версии областей и время последнего изменения одним запросом.
+
+    Аргументы:
+        scopes (Iterable[str]): имена областей.
+
+    Возвращает:
+        tuple[dict[str, int], datetime | None]: версии, как в get_versions(), и
+        наибольшее updated_at среди областей (None, если изменений ещё не было).
+    """
+    scopes = set(scopes)
+    return _version_stamp(scopes, _version_stamp_query(scopes))
+
+
+async def aget_version_stamp(scopes):
+    """Асинхронный вариант get_version_stamp()."""
+    scopes = set(scopes)
+    return _version_stamp(scopes, [row async for row in _version_stamp_query(scopes)])
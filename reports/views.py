@@ -1,22 +1,43 @@
 from django.shortcuts import render, get_object_or_404
-from django.http import HttpResponse, HttpResponseForbidden
+from django.conf import settings
+from django.http import (
+    FileResponse, Http404, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse,
+)
 from django.contrib.auth.decorators import login_required
-from academics.models import ClassRoom, Enrollment, Lesson
+from django.utils import timezone
+from django.core.paginator import Paginator
+from django.urls import reverse
+from academics.models import ClassRoom
 from journal.models import GradeRecord
-from io import BytesIO
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from datetime import datetime
-from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-from reportlab.pdfbase import pdfmetrics
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.pdfbase.ttfonts import TTFont
-import os
 from accounts.models import User
-from django.utils import timezone
-from django.db.models import Q
+from . import documents
+from .aggregates import class_grade_stats, student_grade_stats
+from .attendance import class_attendance_days, class_attendance_totals, student_attendance_stats
+from .cache import get_report_cache
+from .conditional import condition_on_versions
+from .export import export_archive
+from .forms import ExportFilterForm, MatrixFilterForm, PeriodForm
+from .jobs import enqueue_report, job_payload
+from .matrix import STATUS_LEGEND, attendance_matrix
+from .models import ReportJob
+from .search import AUTOCOMPLETE_LIMIT, AUTOCOMPLETE_MAX_LIMIT, autocomplete, search_queryset
+from .tabular import EXPORT_FORMATS, TABLE_EXPORTS, export_response
+from .versioning import classroom_scope, student_scope
+
+
+# Учеников на странице результатов поиска.
+SEARCH_PAGE_SIZE = 25
+
+# Тяжёлые отчёты, которые по умолчанию строятся фоновым обработчиком, а не в запросе.
+ASYNC_REPORT_KINDS = {ReportJob.Kind.ATTENDANCE, ReportJob.Kind.ATTENDANCE_MATRIX}
+
+
+def _classroom_scopes(request, class_id):
+    return [classroom_scope(class_id)]
+
+
+def _student_scopes(request, student_id):
+    return [student_scope(student_id)]
 
 
 def user_is_teacher_or_director(user):
@@ -32,7 +53,99 @@ def user_is_teacher_or_director(user):
     return user.is_authenticated and user.role in ["TEACHER", "ADMIN"]
 
 
+def _report_date():
+    """Дата формирования, печатаемая в PDF; входит в ключ кэша отчётов."""
+    return timezone.localdate().isoformat()
+
+
+def _pdf_response(request, kind, obj, scopes, params, filename):
+    """
+    Отдаёт PDF-отчёт из кэша или ставит его построение в очередь.
+
+    В фоновом режиме сразу возвращается JSON с заданием (HTTP 202), которое
+    выполнит `manage.py reports_worker`; иначе отчёт строится в рамках запроса.
+    Отчёты из ASYNC_REPORT_KINDS по умолчанию строятся в фоне (?async=0 строит
+    их в запросе), остальные — в запросе (?async=1 ставит их в очередь).
+
+    Аргументы:
+        request (HttpRequest): HTTP-запрос.
+        kind (str): тип отчёта, см. ReportJob.Kind.
+        obj (ClassRoom | User): класс или ученик.
+        scopes (list[str]): области данных, от которых зависит отчёт.
+        params (dict): параметры построения.
+        filename (str): имя файла для скачивания.
+    """
+    report_cache = get_report_cache()
+    key = report_cache.make_key(kind, obj.pk, scopes, params)
+
+    if request.GET.get('async', '1' if kind in ASYNC_REPORT_KINDS else '0') != '0':
+        job = enqueue_report(kind, obj.pk, key, params, filename, request.user)
+        return JsonResponse(job_payload(job), status=202)
+
+    fh = report_cache.get_or_render(key, lambda output: documents.render_report(kind, obj, params, output))
+    return FileResponse(fh, as_attachment=True, filename=filename, content_type='application/pdf')
+
+
 @login_required
+def export_all_reports(request):
+    """
+    Выгружает PDF-отчёты по успеваемости и посещаемости всех классов одним ZIP-архивом.
+
+    Доступно только администратору (директору). Отчёты строятся в пуле из
+    REPORTS_EXPORT_PROCESSES процессов, архив отдаётся клиенту по мере готовности
+    отчётов; сводка по времени построения лежит в архиве в файле summary.txt.
+
+    Аргументы:
+        request (HttpRequest): HTTP-запрос.
+
+    Возвращает:
+        StreamingHttpResponse: ZIP-архив с отчётами.
+    """
+    if not request.user.is_admin():
+        return HttpResponseForbidden("Доступ запрещён")
+
+    date = _report_date()
+    response = StreamingHttpResponse(
+        export_archive(date, settings.REPORTS_EXPORT_PROCESSES),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="reports_{date}.zip"'
+    return response
+
+
+@login_required
+def table_export(request, dataset, file_format):
+    """
+    Выгружает оценки или посещаемость в CSV/XLSX потоковым ответом.
+
+    Параметры GET: classroom, subject, teacher, start_date, end_date (см. ExportFilterForm).
+    Учитель выгружает только записи своих уроков, администратор — все.
+
+    Аргументы:
+        request (HttpRequest): HTTP-запрос.
+        dataset (str): 'grades' или 'attendance'.
+        file_format (str): 'csv' или 'xlsx'.
+
+    Возвращает:
+        StreamingHttpResponse: файл выгрузки; 400 при некорректных фильтрах.
+    """
+    if not user_is_teacher_or_director(request.user):
+        return HttpResponseForbidden("Доступ запрещён")
+    if dataset not in TABLE_EXPORTS or file_format not in EXPORT_FORMATS:
+        raise Http404("Неизвестный формат выгрузки")
+
+    form = ExportFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+
+    filters = form.cleaned_data
+    if not request.user.is_admin():
+        filters['teacher'] = request.user.id
+    return export_response(TABLE_EXPORTS[dataset], file_format, filters)
+
+
+@login_required
+@condition_on_versions(_classroom_scopes)
 def class_report(request, class_id):
     """
     Отображает HTML-страницу с отчётом по успеваемости всего класса.
@@ -49,33 +162,11 @@ def class_report(request, class_id):
     if not user_is_teacher_or_director(request.user):
         return HttpResponseForbidden("Доступ запрещён")
 
-    enrollments = Enrollment.objects.filter(classroom=classroom).select_related('student')
-
     start_date = request.GET.get('start_date')
     end_date = request.GET.get('end_date')
     subject = request.GET.get('subject')
 
-    grades = GradeRecord.objects.filter(student__in=[e.student for e in enrollments])
-
-    if start_date:
-        grades = grades.filter(date__gte=start_date)
-    if end_date:
-        grades = grades.filter(date__lte=end_date)
-    if subject:
-        grades = grades.filter(lesson__subject__id=subject)
-
-    student_data = []
-    for enroll in enrollments:
-        student_grades = grades.filter(student=enroll.student)
-        avg = (
-            round(sum(g.value for g in student_grades) / student_grades.count(), 2)
-            if student_grades.exists() else '-'
-        )
-        student_data.append({
-            'student': enroll.student,
-            'average': avg,
-            'grades': student_grades
-        })
+    student_data = class_grade_stats(classroom, start_date, end_date, subject)
 
     context = {
         'classroom': classroom,
@@ -99,60 +190,14 @@ def class_report_pdf(request, class_id):
         HttpResponse: PDF-файл со списком учеников, средними баллами и комментариями.
     """
     classroom = get_object_or_404(ClassRoom, id=class_id)
-    enrollments = Enrollment.objects.filter(classroom=classroom).select_related('student')
-    grades = GradeRecord.objects.filter(student__in=[e.student for e in enrollments])
-
-    buffer = BytesIO()
-    font_path = os.path.join(os.path.dirname(__file__), "DejaVuSans.ttf")
-    pdfmetrics.registerFont(TTFont("DejaVuSans", font_path))
-
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=40, bottomMargin=30)
-
-    styles = getSampleStyleSheet()
-    normal_style = ParagraphStyle('Normal', parent=styles['Normal'], fontName='DejaVuSans', fontSize=10, leading=12)
-    elements = []
-
-  
-    title = Paragraph(f"<b>Отчёт по классу {classroom}</b>", ParagraphStyle('Title', fontName='DejaVuSans', fontSize=16))
-    date_info = Paragraph(f"Дата: {datetime.now().strftime('%d.%m.%Y')}", normal_style)
-    author_info = Paragraph(f"Сформировал: {request.user.get_full_name()}", normal_style)
-    elements += [title, Spacer(1, 12), date_info, author_info, Spacer(1, 20)]
-
-
-    data = [[
-        Paragraph("<b>Ученик</b>", normal_style),
-        Paragraph("<b>Средний балл</b>", normal_style),
-        Paragraph("<b>Кол-во оценок</b>", normal_style),
-        Paragraph("<b>Комментарий</b>", normal_style)
-    ]]
-
-    for enroll in enrollments:
-        student_grades = grades.filter(student=enroll.student)
-        avg = round(sum(g.value for g in student_grades) / student_grades.count(), 2) if student_grades.exists() else "-"
-        comment_text = ", ".join(g.note for g in student_grades if g.note) or "-"
-        data.append([
-            Paragraph(f"{enroll.student.last_name} {enroll.student.first_name}", normal_style),
-            Paragraph(str(avg), normal_style),
-            Paragraph(str(student_grades.count()), normal_style),
-            Paragraph(comment_text, normal_style),
-        ])
-
-    table = Table(data, colWidths=[130, 70, 80, 200])
-    table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, -1), 'DejaVuSans'),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-
-    elements.append(table)
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=\"class_report_{classroom}.pdf\"'
-    return response
+    filters = {key: request.GET.get(key) for key in ('start_date', 'end_date', 'subject')}
+
+    return _pdf_response(
+        request, ReportJob.Kind.CLASS, classroom,
+        scopes=[classroom_scope(classroom.id)],
+        params={**filters, 'date': _report_date()},
+        filename=f"class_report_{classroom}.pdf",
+    )
 
 
 @login_required
@@ -168,68 +213,20 @@ def student_report_pdf(request, student_id):
         HttpResponse: PDF-документ с таблицей оценок, средним баллом и комментариями.
     """
     student = get_object_or_404(User, id=student_id, role='STUDENT')
-    grades = GradeRecord.objects.filter(student=student).select_related('lesson__subject', 'lesson__classroom')
-
-    buffer = BytesIO()
-    font_path = os.path.join(os.path.dirname(__file__), "DejaVuSans.ttf")
-    pdfmetrics.registerFont(TTFont("DejaVuSans", font_path))
-
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=40, bottomMargin=30)
-    styles = getSampleStyleSheet()
-    normal_style = ParagraphStyle('Normal', parent=styles['Normal'], fontName='DejaVuSans', fontSize=10, leading=12)
-    elements = []
-
-    title = Paragraph(f"<b>Отчёт об успеваемости ученика</b>", ParagraphStyle('Title', fontName='DejaVuSans', fontSize=16))
-    elements += [title, Spacer(1, 12)]
-    elements.append(Paragraph(f"Дата формирования: {datetime.now().strftime('%d.%m.%Y')}", normal_style))
-    elements.append(Paragraph(f"Сформировал: {request.user.get_full_name()}", normal_style))
-    elements.append(Spacer(1, 20))
-
-    data = [[
-        Paragraph("<b>Предмет</b>", normal_style),
-        Paragraph("<b>Класс</b>", normal_style),
-        Paragraph("<b>Тема урока</b>", normal_style),
-        Paragraph("<b>Оценка</b>", normal_style),
-        Paragraph("<b>Макс. балл</b>", normal_style),
-        Paragraph("<b>Дата</b>", normal_style),
-        Paragraph("<b>Комментарий</b>", normal_style)
-    ]]
-
-    for g in grades:
-        data.append([
-            Paragraph(g.lesson.subject.name, normal_style),
-            Paragraph(str(g.lesson.classroom), normal_style),
-            Paragraph(g.lesson.topic or "-", normal_style),
-            Paragraph(str(g.value), normal_style),
-            Paragraph(str(g.max_value), normal_style),
-            Paragraph(g.date.strftime("%d.%m.%Y"), normal_style),
-            Paragraph(g.note or "-", normal_style)
-        ])
-
-    avg = round(sum(g.value for g in grades) / grades.count(), 2) if grades.exists() else "-"
-    data.append([Paragraph("<b>Средний балл</b>", normal_style), "", "", "", "", "", Paragraph(f"<b>{avg}</b>", normal_style)])
-
-    table = Table(data, colWidths=[70, 50, 100, 50, 50, 60, 120])
-    table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, -1), 'DejaVuSans'),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-
-    elements.append(table)
-    doc.build(elements)
-
-    pdf = buffer.getvalue()
-    buffer.close()
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=\"student_report_{student.last_name}.pdf\"'
-    return response
+
+    return _pdf_response(
+        request, ReportJob.Kind.STUDENT, student,
+        scopes=[student_scope(student.id)],
+        params={'date': _report_date()},
+        filename=f"student_report_{student.last_name}.pdf",
+    )
 
 
 @login_required
 def student_search(request):
     """
-    Позволяет искать ученика по имени, фамилии или логину.
+    Позволяет искать ученика по имени, фамилии или логину, в том числе
+    в транслитерации; результаты упорядочены по релевантности и разбиты на страницы.
 
     Аргументы:
         request (HttpRequest): HTTP-запрос.
@@ -238,27 +235,57 @@ def student_search(request):
         HttpResponse: HTML-страница с результатами поиска.
     """
     query = request.GET.get('q', '').strip()
-    results = []
+    page = None
     if query:
-        results = User.objects.filter(
-            role='STUDENT'
-        ).filter(
-            Q(first_name__icontains=query) |
-            Q(last_name__icontains=query) |
-            Q(username__icontains=query)
-        )
-    return render(request, 'reports/student_search.html', {'query': query, 'results': results})
+        page = Paginator(search_queryset(query), SEARCH_PAGE_SIZE).get_page(request.GET.get('page'))
+    return render(request, 'reports/student_search.html', {
+        'query': query,
+        'page': page,
+        'results': page.object_list if page else [],
+    })
 
 
 @login_required
+def student_autocomplete(request):
+    """
+    Возвращает подсказки для поиска ученика в формате JSON.
+
+    Параметры GET: q — запрос, limit — число подсказок (не больше AUTOCOMPLETE_MAX_LIMIT).
+
+    Аргументы:
+        request (HttpRequest): HTTP-запрос.
+
+    Возвращает:
+        JsonResponse: {'results': [{'id', 'name', 'username', 'url'}]}; 400 при некорректном limit.
+    """
+    try:
+        limit = min(int(request.GET.get('limit', AUTOCOMPLETE_LIMIT)), AUTOCOMPLETE_MAX_LIMIT)
+    except ValueError:
+        return HttpResponseBadRequest("limit должен быть числом")
+    results = autocomplete(request.GET.get('q', ''), max(limit, 0))
+    return JsonResponse({'results': [
+        {
+            'id': row['id'],
+            'name': row['name'],
+            'username': row['username'],
+            'url': reverse('reports:student_report', args=[row['id']]),
+        }
+        for row in results
+    ]})
+
+
+@login_required
+@condition_on_versions(_student_scopes)
 def student_report(request, student_id):
     """
     Отображает страницу отчёта об успеваемости конкретного ученика в HTML-формате.
     """
     student = get_object_or_404(User, id=student_id, role='STUDENT')
-    grades = GradeRecord.objects.filter(student=student).select_related('lesson__subject', 'lesson__classroom')
-    avg = round(sum(g.value for g in grades) / grades.count(), 2) if grades.exists() else None
-    classroom = grades.first().lesson.classroom if grades.exists() else None
+    grades = list(
+        GradeRecord.objects.filter(student=student).select_related('lesson__subject', 'lesson__classroom')
+    )
+    avg = student_grade_stats(student)['average']
+    classroom = grades[0].lesson.classroom if grades else None
 
     return render(request, 'reports/student_report.html', {
         'student': student,
@@ -268,6 +295,103 @@ def student_report(request, student_id):
     })
 
 
+@login_required
+@condition_on_versions(_classroom_scopes)
+def class_attendance(request, class_id):
+    """
+    Отображает сводку посещаемости класса за период: итоги, учеников и дни.
+
+    Данные читаются из дневных сводок посещаемости (reports.attendance),
+    а не из всех отметок класса.
+
+    Аргументы:
+        request (HttpRequest): HTTP-запрос.
+        class_id (int): идентификатор класса.
+
+    Возвращает:
+        HttpResponse: HTML-страница со статистикой посещаемости.
+    """
+    classroom = get_object_or_404(ClassRoom, id=class_id)
+
+    if not user_is_teacher_or_director(request.user):
+        return HttpResponseForbidden("Доступ запрещён")
+
+    form = PeriodForm(request.GET)
+    period = form.cleaned_data if form.is_valid() else {}
+
+    context = {
+        'classroom': classroom,
+        'form': form,
+        'totals': class_attendance_totals(classroom, **period),
+        'students': student_attendance_stats(classroom, **period),
+        'days': class_attendance_days(classroom, **period),
+    }
+    return render(request, 'reports/class_attendance.html', context)
+
+
+@login_required
+@condition_on_versions(_classroom_scopes)
+def class_attendance_matrix(request, class_id):
+    """
+    Отображает матрицу посещаемости класса: ученики × уроки, ячейки — коды P/A/L.
+
+    С параметром ?format=json возвращает матрицу в JSON: уроки, ученики
+    и по строке кодов на ученика.
+
+    Аргументы:
+        request (HttpRequest): HTTP-запрос.
+        class_id (int): идентификатор класса.
+
+    Возвращает:
+        HttpResponse: HTML-страница или JSON; 400 при некорректных фильтрах.
+    """
+    classroom = get_object_or_404(ClassRoom, id=class_id)
+
+    if not user_is_teacher_or_director(request.user):
+        return HttpResponseForbidden("Доступ запрещён")
+
+    form = MatrixFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    matrix = attendance_matrix(classroom, **form.cleaned_data)
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'classroom': classroom.id, **matrix.to_dict()})
+
+    return render(request, 'reports/class_attendance_matrix.html', {
+        'classroom': classroom,
+        'form': form,
+        'matrix': matrix,
+        'legend': STATUS_LEGEND,
+    })
+
+
+@login_required
+def class_attendance_matrix_pdf(request, class_id):
+    """
+    Генерирует PDF с матрицей посещаемости класса.
+
+    Аргументы:
+        request (HttpRequest): HTTP-запрос.
+        class_id (int): идентификатор класса.
+
+    Возвращает:
+        HttpResponse: PDF-файл; 400 при некорректных фильтрах.
+    """
+    classroom = get_object_or_404(ClassRoom, id=class_id)
+    form = MatrixFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+    filters = {key: request.GET.get(key) or None for key in form.fields}
+
+    return _pdf_response(
+        request, ReportJob.Kind.ATTENDANCE_MATRIX, classroom,
+        scopes=[classroom_scope(classroom.id)],
+        params={**filters, 'date': _report_date()},
+        filename=f"attendance_matrix_{classroom}.pdf",
+    )
+
+
 @login_required
 def class_attendance_report_pdf(request, class_id):
     """
@@ -280,54 +404,62 @@ def class_attendance_report_pdf(request, class_id):
     Возвращает:
         HttpResponse: PDF-файл с данными посещаемости.
     """
-    from journal.models import AttendanceRecord
     classroom = get_object_or_404(ClassRoom, id=class_id)
-    enrollments = Enrollment.objects.filter(classroom=classroom).select_related('student')
-    records = AttendanceRecord.objects.filter(student__in=[e.student for e in enrollments])
-
-    buffer = BytesIO()
-    font_path = os.path.join(os.path.dirname(__file__), "DejaVuSans.ttf")
-    pdfmetrics.registerFont(TTFont("DejaVuSans", font_path))
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=40, bottomMargin=30)
-
-    styles = getSampleStyleSheet()
-    normal_style = ParagraphStyle('Normal', parent=styles['Normal'], fontName='DejaVuSans', fontSize=10, leading=12)
-    elements = []
-
-    title = Paragraph(f"<b>Отчёт по посещаемости класса {classroom}</b>", ParagraphStyle('Title', fontName='DejaVuSans', fontSize=16))
-    date_info = Paragraph(f"Дата: {datetime.now().strftime('%d.%m.%Y')}", normal_style)
-    author_info = Paragraph(f"Сформировал: {request.user.get_full_name()}", normal_style)
-    elements += [title, Spacer(1, 12), date_info, author_info, Spacer(1, 20)]
-
-    data = [[
-        Paragraph("<b>Ученик</b>", normal_style),
-        Paragraph("<b>Дата</b>", normal_style),
-        Paragraph("<b>Предмет</b>", normal_style),
-        Paragraph("<b>Статус</b>", normal_style),
-        Paragraph("<b>Комментарий</b>", normal_style),
-    ]]
-
-    for record in records:
-        data.append([
-            Paragraph(f"{record.student.last_name} {record.student.first_name}", normal_style),
-            Paragraph(record.lesson.date.strftime('%d.%m.%Y'), normal_style),
-            Paragraph(str(record.lesson.subject), normal_style),
-            Paragraph(dict(record.Status.choices).get(record.status, '—'), normal_style),
-            Paragraph(record.comment or "-", normal_style),
-        ])
-
-    table = Table(data, colWidths=[120, 70, 100, 70, 150])
-    table.setStyle(TableStyle([
-        ('FONT', (0, 0), (-1, -1), 'DejaVuSans'),
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-
-    elements.append(table)
-    doc.build(elements)
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    response = HttpResponse(pdf, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=\"attendance_report_{classroom}.pdf\"'
-    return response
+
+    return _pdf_response(
+        request, ReportJob.Kind.ATTENDANCE, classroom,
+        scopes=[classroom_scope(classroom.id)],
+        params={'date': _report_date()},
+        filename=f"attendance_report_{classroom}.pdf",
+    )
+
+
+def _get_job_for_user(request, job_id):
+    """Возвращает задание, если пользователь его запросил или является учителем/директором."""
+    job = get_object_or_404(ReportJob, id=job_id)
+    if job.requested_by_id != request.user.id and not user_is_teacher_or_director(request.user):
+        return None
+    return job
+
+
+@login_required
+def job_status(request, job_id):
+    """
+    Возвращает состояние задания на построение отчёта в формате JSON.
+
+    Аргументы:
+        request (HttpRequest): HTTP-запрос.
+        job_id (int): идентификатор задания.
+
+    Возвращает:
+        JsonResponse: статус задания и ссылка на скачивание, когда отчёт готов.
+    """
+    job = _get_job_for_user(request, job_id)
+    if job is None:
+        return HttpResponseForbidden("Доступ запрещён")
+    return JsonResponse(job_payload(job))
+
+
+@login_required
+def job_download(request, job_id):
+    """
+    Отдаёт PDF-файл, построенный фоновым заданием.
+
+    Аргументы:
+        request (HttpRequest): HTTP-запрос.
+        job_id (int): идентификатор задания.
+
+    Возвращает:
+        FileResponse: PDF-файл; 409, если задание ещё не завершено;
+        410, если файл уже вытеснен из кэша.
+    """
+    job = _get_job_for_user(request, job_id)
+    if job is None:
+        return HttpResponseForbidden("Доступ запрещён")
+    if job.status != ReportJob.Status.DONE:
+        return JsonResponse(job_payload(job), status=409)
+
+    fh = get_report_cache().store.open(job.cache_key)
+    if fh is None:
+        return JsonResponse({'detail': "Файл отчёта больше недоступен, запросите отчёт заново."}, status=410)
+    return FileResponse(fh, as_attachment=True, filename=job.filename, content_type='application/pdf')
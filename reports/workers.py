@@ -0,0 +1,47 @@
+"""
+Функции, выполняемые в дочерних процессах пула.
+
+Модуль не импортирует модели на верхнем уровне: процессы запускаются методом
+'spawn' и настраивают Django в init_worker() уже после импорта этого модуля.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+
+
+def init_worker():
+    """Инициализирует Django в новом процессе пула."""
+    django.setup()
+
+
+def make_process_pool(processes):
+    """
+    Создаёт пул процессов для построения отчётов.
+
+    Процессы запускаются методом 'spawn', поэтому не наследуют открытые
+    соединения с базой данных родительского процесса.
+
+    Аргументы:
+        processes (int): количество процессов.
+
+    Возвращает:
+        ProcessPoolExecutor: пул процессов.
+    """
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+    )
+
+
+def run_report_job(job_id, worker):
+    """Выполняет задание ReportJob с указанным id от имени обработчика (см. reports.jobs.execute_job)."""
+    from .jobs import execute_job
+    return execute_job(job_id, worker)
+
+
+def run_export_report(kind, object_id, params):
+    """Строит отчёт класса для общей выгрузки (см. reports.export.render_cached_report)."""
+    from .export import render_cached_report
+    return render_cached_report(kind, object_id, params)
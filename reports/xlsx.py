@@ -0,0 +1,195 @@
+"""
+Потоковая запись XLSX (Office Open XML) без сторонних библиотек.
+
+Листы пишутся построчно прямо в ZIP-архив (reports.zipstream), строки
+хранятся как inline-строки, без общей таблицы строк sharedStrings.xml,
+поэтому память не зависит от объёма данных. Книга, описание листов и
+типы содержимого записываются в конец архива, когда известно число листов:
+порядок файлов внутри ZIP для XLSX не важен.
+"""
+import itertools
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape, quoteattr
+
+from .zipstream import StreamingZip
+
+# Строк данных на листе: предел Excel 1 048 576 минус строка заголовка.
+MAX_SHEET_ROWS = 1_048_575
+
+# Сколько строк XML собирается в одну запись в архив.
+WRITE_BATCH_ROWS = 500
+
+# Индексы стилей из STYLES_XML.
+DATE_STYLE = 1
+HEADER_STYLE = 2
+
+EXCEL_EPOCH = date(1899, 12, 30)
+
+# Управляющие символы, недопустимые в XML 1.0.
+_ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+CONTENT_TYPES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+    '{sheets}'
+    '</Types>'
+)
+
+SHEET_CONTENT_TYPE = (
+    '<Override PartName="/xl/worksheets/sheet{index}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+
+ROOT_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+
+WORKBOOK_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets>{sheets}</sheets>'
+    '</workbook>'
+)
+
+WORKBOOK_RELS_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '{sheets}'
+    '<Relationship Id="rIdStyles" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+STYLES_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+    '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+    '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+    '<fill><patternFill patternType="gray125"/></fill></fills>'
+    '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+    '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+    '<cellXfs count="3">'
+    '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+    '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+    '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/>'
+    '</cellXfs>'
+    '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+    '</styleSheet>'
+)
+
+SHEET_HEADER_XML = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetData>'
+)
+
+SHEET_FOOTER_XML = '</sheetData></worksheet>'
+
+
+def _cell(value, style=None):
+    """Возвращает XML ячейки; для пустого значения — пустую строку (ячейка пропускается)."""
+    style_attr = f' s="{style}"' if style is not None else ""
+    if value is None or value == "":
+        return ""
+    if isinstance(value, bool):
+        return f'<c t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f'<c{style_attr}><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return f'<c s="{DATE_STYLE}"><v>{(value - EXCEL_EPOCH).days}</v></c>'
+    text = escape(_ILLEGAL_XML_CHARS.sub("", str(value)))
+    return f'<c t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(values, style=None):
+    return "<row>" + "".join(_cell(value, style) for value in values) + "</row>"
+
+
+def _sheet_chunks(headers, rows):
+    """Генерирует XML листа блоками байтов по WRITE_BATCH_ROWS строк."""
+    yield (SHEET_HEADER_XML + _row(headers, HEADER_STYLE)).encode("utf-8")
+    rows = iter(rows)
+    while True:
+        batch = "".join(_row(values) for values in itertools.islice(rows, WRITE_BATCH_ROWS))
+        if not batch:
+            break
+        yield batch.encode("utf-8")
+    yield SHEET_FOOTER_XML.encode("utf-8")
+
+
+def _sheet_name(title, index):
+    """Имя листа: заголовок, а для продолжения — заголовок с номером (не длиннее 31 символа)."""
+    title = re.sub(r"[\[\]:*?/\\]", " ", title)[:31]
+    if index == 1:
+        return title
+    suffix = f" ({index})"
+    return title[:31 - len(suffix)] + suffix
+
+
+def iter_xlsx(headers, rows, title="Лист"):
+    """
+    Генерирует XLSX-файл из строк данных.
+
+    Если строк больше, чем помещается на лист Excel, они продолжаются
+    на следующих листах с тем же заголовком.
+
+    Аргументы:
+        headers (Sequence[str]): заголовки колонок.
+        rows (Iterable[Sequence]): строки; значения — str, числа, date или None.
+        title (str): имя первого листа.
+
+    Возвращает:
+        Iterator[bytes]: части файла.
+    """
+    archive = StreamingZip()
+    rows = iter(rows)
+    sheet_names = []
+    pending = []
+    while True:
+        sheet_names.append(_sheet_name(title, len(sheet_names) + 1))
+        sheet_rows = itertools.islice(itertools.chain(pending, rows), MAX_SHEET_ROWS)
+        yield from archive.write(f"xl/worksheets/sheet{len(sheet_names)}.xml", _sheet_chunks(headers, sheet_rows))
+        # Следующий лист нужен, только если строки ещё остались.
+        pending = list(itertools.islice(rows, 1))
+        if not pending:
+            break
+
+    indexes = range(1, len(sheet_names) + 1)
+    parts = {
+        "xl/workbook.xml": WORKBOOK_XML.format(sheets="".join(
+            f'<sheet name={quoteattr(name)} sheetId="{index}" r:id="rId{index}"/>'
+            for index, name in zip(indexes, sheet_names)
+        )),
+        "xl/_rels/workbook.xml.rels": WORKBOOK_RELS_XML.format(sheets="".join(
+            f'<Relationship Id="rId{index}" '
+            f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            f'Target="worksheets/sheet{index}.xml"/>'
+            for index in indexes
+        )),
+        "xl/styles.xml": STYLES_XML,
+        "_rels/.rels": ROOT_RELS_XML,
+        "[Content_Types].xml": CONTENT_TYPES_XML.format(
+            sheets="".join(SHEET_CONTENT_TYPE.format(index=index) for index in indexes)
+        ),
+    }
+    for name, content in parts.items():
+        yield from archive.write(name, [content.encode("utf-8")])
+    yield archive.close()
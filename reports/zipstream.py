@@ -0,0 +1,84 @@
+"""
+Потоковая запись ZIP-архива без буферизации всего архива в памяти.
+
+zipfile умеет писать в файловый объект без seek(): размеры и контрольные
+суммы файлов тогда записываются после их содержимого (data descriptor).
+StreamingZip пользуется этим и после каждой записи отдаёт накопленные байты,
+так что архив можно сразу передавать клиенту через StreamingHttpResponse
+или записывать в файл.
+"""
+import zipfile
+from functools import partial
+
+# Размер блока при копировании файла в архив.
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class _ZipOutput:
+    """Файловый объект только для записи: считает позицию и копит байты до выдачи."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Возвращает накопленные байты и очищает буфер."""
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class StreamingZip:
+    """
+    ZIP-архив, который собирается по частям.
+
+    Пример:
+        archive = StreamingZip()
+        yield from archive.write_file("report.pdf", fh)
+        yield archive.close()
+    """
+
+    def __init__(self, compression=zipfile.ZIP_DEFLATED):
+        self._output = _ZipOutput()
+        self._zip = zipfile.ZipFile(self._output, "w", compression=compression)
+
+    def write(self, arcname, chunks):
+        """
+        Добавляет в архив файл из последовательности блоков байтов.
+
+        Аргументы:
+            arcname (str): путь файла внутри архива.
+            chunks (Iterable[bytes]): содержимое файла.
+
+        Возвращает:
+            Iterator[bytes]: готовые части архива; пустые части пропускаются.
+        """
+        with self._zip.open(arcname, "w") as member:
+            for chunk in chunks:
+                member.write(chunk)
+                data = self._output.drain()
+                if data:
+                    yield data
+        data = self._output.drain()
+        if data:
+            yield data
+
+    def write_file(self, arcname, fh, chunk_size=COPY_CHUNK_SIZE):
+        """Добавляет в архив содержимое открытого файла, см. write()."""
+        return self.write(arcname, iter(partial(fh.read, chunk_size), b""))
+
+    def close(self):
+        """Завершает архив и возвращает его последние байты (центральный каталог)."""
+        self._zip.close()
+        return self._output.drain()
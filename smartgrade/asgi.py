@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'smartgrade.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Поток событий журнала /api/events/ обслуживается до обработчика Django, чтобы
+# открытое соединение не занимало поток (см. api.events).
+from api.events import EventStreamApplication  # noqa: E402
+
+application = EventStreamApplication(django_application)
@@ -54,6 +54,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'api.authentication.issued_tokens_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -146,6 +147,24 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 
+# PDF report cache
+# 'file' — каталог на диске с LRU-вытеснением, 'cache' — бэкенд кэша Django
+
+REPORTS_CACHE_BACKEND = os.getenv('REPORTS_CACHE_BACKEND', 'file')
+REPORTS_CACHE_DIR = Path(os.getenv('REPORTS_CACHE_DIR', BASE_DIR / 'var' / 'report_cache'))
+REPORTS_CACHE_MAX_BYTES = int(os.getenv('REPORTS_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+REPORTS_CACHE_ALIAS = 'default'
+# Сколько хранить в кэше REPORTS_CACHE_ALIAS журнал класса для API (секунды);
+# ключ зависит от версий класса, так что срок лишь ограничивает память.
+REPORTS_GRADEBOOK_CACHE_TTL = int(os.getenv('REPORTS_GRADEBOOK_CACHE_TTL', 3600))
+# Процессов в пуле при выгрузке отчётов всех классов из веб-интерфейса.
+REPORTS_EXPORT_PROCESSES = int(os.getenv('REPORTS_EXPORT_PROCESSES', 2))
+# Поиск учеников: держать ли в памяти процесса префиксный индекс и как часто
+# перечитывать его из базы, чтобы увидеть изменения из других процессов (секунды).
+REPORTS_SEARCH_PREFIX_INDEX = os.getenv('REPORTS_SEARCH_PREFIX_INDEX', 'False').lower() == 'true'
+REPORTS_SEARCH_INDEX_TTL = int(os.getenv('REPORTS_SEARCH_INDEX_TTL', 300))
+
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -157,9 +176,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework.authentication.SessionAuthentication',  
-        'rest_framework_simplejwt.authentication.JWTAuthentication', 
+        'api.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
+    'PAGE_SIZE': int(os.getenv('API_PAGE_SIZE', 50)),
+}
+# Наибольший размер страницы, который клиент может запросить через ?page_size=.
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+# Сколько секунд версия токенов пользователя хранится в кэше (см. api.authentication):
+# в пределах этого срока отзыв может быть ещё не виден другим процессам.
+API_AUTH_CACHE_TTL = int(os.getenv('API_AUTH_CACHE_TTL', 30))
+# Сколько секунд Basic-аутентификация принимает проверенные логин и пароль без PBKDF2.
+API_BASIC_AUTH_CACHE_TTL = int(os.getenv('API_BASIC_AUTH_CACHE_TTL', 300))
+# Что выдать после проверки пароля по Basic: '' — ничего, 'session' — сессию, 'jwt' — пару JWT.
+API_BASIC_AUTH_ISSUE = os.getenv('API_BASIC_AUTH_ISSUE', '')
+
+# Пакетные запросы /api/batch/: наибольшее число вложенных запросов и потоков
+# для их параллельного выполнения (каждый поток — отдельное соединение с базой).
+API_BATCH_MAX_REQUESTS = int(os.getenv('API_BATCH_MAX_REQUESTS', 20))
+API_BATCH_MAX_WORKERS = int(os.getenv('API_BATCH_MAX_WORKERS', 4))
+
+# Поток событий журнала /api/events/ (SSE, только под ASGI). Доставка: 'local' —
+# подписчикам своего процесса, 'postgres' — всем процессам через NOTIFY/LISTEN
+# в канале API_EVENTS_CHANNEL. Раз в API_EVENTS_HEARTBEAT секунд простаивающему
+# клиенту отправляется комментарий; клиент, отставший на API_EVENTS_QUEUE_SIZE
+# событий, получает reset и перечитывает данные.
+API_EVENTS_BACKPLANE = os.getenv('API_EVENTS_BACKPLANE', 'local')
+API_EVENTS_CHANNEL = os.getenv('API_EVENTS_CHANNEL', 'smartgrade_journal')
+API_EVENTS_HEARTBEAT = int(os.getenv('API_EVENTS_HEARTBEAT', 25))
+API_EVENTS_QUEUE_SIZE = int(os.getenv('API_EVENTS_QUEUE_SIZE', 100))
+
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'api.authentication.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'api.authentication.ClaimsTokenRefreshSerializer',
 }